@@ -0,0 +1,141 @@
+"""
+Accuracy and latency harness for ArrowClassifier on synthetic rune arrows.
+
+Each sample is a 477x123 mask with four arrows of random direction, size
+(--min-size..--max-size px) and rotation (+-(--jitter) degrees), degraded
+with random erosion/dilation, salt-and-pepper noise inside the arrow area
+and occasional bars across an arrow. Crops come from ArrowExtractor, as in
+the live pipeline; a sample where it does not find exactly four arrows is
+an extraction miss: its arrows cannot be matched to crops, so the whole
+sample fails end to end.
+
+Reported:
+- end-to-end accuracy over every sample (extraction misses count as four
+  wrong arrows): per arrow, and per sample (all four arrows right)
+- classifier-only accuracy over the samples with exactly four crops, with
+  per-direction recall and the confusion matrix
+- mean confidence of right / wrong answers
+- classify() latency per 4-arrow batch against the frame budget
+
+Run from the repository root:
+    python -m benchmarks.bench_arrow_classifier --samples 2000
+    python -m benchmarks.bench_arrow_classifier --save-npz configs/vision_configs/arrow_templates.npz
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.arrow_classifier import ArrowClassifier
+from components.vision.arrow_extractor import ArrowExtractor
+from components.vision.arrow_shapes import DIRECTIONS, draw_arrow
+
+
+def _make_sample(rng: np.random.Generator, args) -> Tuple[np.ndarray, List[int]]:
+    w, h = 477, 123
+    mask = np.zeros((h, w), dtype=np.uint8)
+    labels = []
+    for i in range(4):
+        label = int(rng.integers(0, 4))
+        size = float(rng.uniform(args.min_size, args.max_size))
+        center = (60 + i * 110 + rng.uniform(-8, 8), h / 2.0 + rng.uniform(-8, 8))
+        draw_arrow(mask, DIRECTIONS[label], size, center, 255, float(rng.uniform(-args.jitter, args.jitter)))
+        labels.append(label)
+
+        if rng.random() < 0.2:
+            # bar across the arrow (e.g. a UI element bleeding through the threshold)
+            y = int(center[1] + rng.uniform(-size / 3, size / 3))
+            cv.line(mask, (int(center[0] - size / 2), y), (int(center[0] + size / 2), y), 0, 2)
+
+    _, mask = cv.threshold(mask, 127, 255, cv.THRESH_BINARY)
+    op = rng.integers(0, 3)
+    if op == 1:
+        mask = cv.erode(mask, np.ones((3, 3), np.uint8))
+    elif op == 2:
+        mask = cv.dilate(mask, np.ones((3, 3), np.uint8))
+
+    flip = rng.random(mask.shape) < args.noise
+    flip &= cv.dilate(mask, np.ones((9, 9), np.uint8)) > 0
+    mask[flip] = 255 - mask[flip]
+    return mask, labels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--crop", type=int, default=32)
+    parser.add_argument("--min-size", type=float, default=22.0)
+    parser.add_argument("--max-size", type=float, default=48.0)
+    parser.add_argument("--jitter", type=float, default=15.0, help="max rotation in degrees")
+    parser.add_argument("--noise", type=float, default=0.05, help="pixel flip probability near arrows")
+    parser.add_argument("--budget-ms", type=float, default=1000.0 / 60.0)
+    parser.add_argument("--npz", default=None, help="load templates from this .npz instead of rendering")
+    parser.add_argument("--save-npz", default=None, help="write the rendered templates to this .npz")
+    args = parser.parse_args()
+
+    if args.npz:
+        classifier = ArrowClassifier.from_npz(args.npz)
+    else:
+        classifier = ArrowClassifier(crop_size=args.crop)
+    if args.save_npz:
+        classifier.save_npz(args.save_npz)
+    extractor = ArrowExtractor(crop_size=classifier.crop_size)
+
+    rng = np.random.default_rng(5)
+    confusion = np.zeros((4, 4), dtype=np.int64)
+    conf_right, conf_wrong, times = [], [], []
+    extraction_misses = 0
+    samples_right = 0
+
+    for _ in range(args.samples):
+        mask, labels = _make_sample(rng, args)
+        _, crops = extractor.extract(mask)
+        if len(crops) != 4:
+            extraction_misses += 1
+            continue
+
+        start = time.perf_counter()
+        predicted, confidence = classifier.classify(crops)
+        times.append(time.perf_counter() - start)
+
+        for truth, pred, conf in zip(labels, predicted.tolist(), confidence.tolist()):
+            confusion[truth, pred] += 1
+            (conf_right if truth == pred else conf_wrong).append(conf)
+        samples_right += int(predicted.tolist() == labels)
+
+    arrows = int(confusion.sum())
+    right = int(np.trace(confusion))
+    ms = np.asarray(times) * 1000.0
+    print(
+        f"{args.samples} samples x 4 arrows, size {args.min_size:.0f}-{args.max_size:.0f}px, "
+        f"rotation +-{args.jitter:.0f} deg, noise {args.noise}"
+    )
+    print(
+        f"extraction misses: {extraction_misses} of {args.samples} samples "
+        f"({extraction_misses / max(1, args.samples) * 100:.1f}%)"
+    )
+    print(
+        f"end-to-end accuracy: {right / max(1, 4 * args.samples) * 100:6.2f}% of {4 * args.samples} arrows, "
+        f"{samples_right / max(1, args.samples) * 100:6.2f}% of {args.samples} samples"
+    )
+    print(
+        f"classifier-only accuracy: {right / max(1, arrows) * 100:6.2f}% of {arrows} arrows "
+        f"({args.samples - extraction_misses} samples with four crops)"
+    )
+    for i, name in enumerate(DIRECTIONS):
+        row = confusion[i]
+        print(f"  {name:>5}: recall {row[i] / max(1, row.sum()) * 100:6.2f}%  predicted as {dict(zip(DIRECTIONS, row.tolist()))}")
+    print(
+        f"mean confidence: right {np.mean(conf_right) if conf_right else float('nan'):.3f}  "
+        f"wrong {np.mean(conf_wrong) if conf_wrong else float('nan'):.3f}"
+    )
+    print(
+        f"latency per 4-arrow batch: mean {ms.mean():.3f} ms  p99 {np.percentile(ms, 99):.3f} ms  "
+        f"max {ms.max():.3f} ms  ({ms.mean() / args.budget_ms * 100:.2f}% of a {args.budget_ms:.1f} ms frame)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Arrow candidate extraction: contour loop vs connected-components batch.
+
+- contours:   the original detect_arrow_contours (Canny + dilate +
+              findContours, per-contour contourArea / boundingRect / filters
+              in Python) followed by main.py's list of variable-size slices
+- components: ArrowExtractor (connectedComponentsWithStats, filters as NumPy
+              masks, (N, S, S) float32 crops written into a reused batch)
+
+Masks are 477x123 (the default arrow ROI) with 4-8 filled arrows plus noise:
+salt specks, small blobs and thin streaks. Reported: mean / p95 time per
+frame, arrow recall (box IoU >= 0.5 with a drawn arrow) and extra
+candidates per frame.
+
+Run from the repository root:
+    python -m benchmarks.bench_arrow_extraction --frames 500
+"""
+import argparse
+import time
+from typing import Callable, List, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.arrow_extractor import ArrowExtractor
+from components.vision.arrow_shapes import DIRECTIONS, draw_arrow
+
+
+def _legacy_extract(mask: np.ndarray) -> Tuple[List[Tuple[int, int, int, int]], List[np.ndarray]]:
+    edges = cv.Canny(mask, 50, 150)
+    edges = cv.dilate(edges, np.ones((3, 3), np.uint8), iterations=1)
+    contours, _ = cv.findContours(edges, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for cnt in contours:
+        if cv.contourArea(cnt) < 50:
+            continue
+        x, y, w, h = cv.boundingRect(cnt)
+        if not (0.5 <= w / float(h) <= 2.0):
+            continue
+        if not (10 <= w <= 200 and 10 <= h <= 200):
+            continue
+        boxes.append((x, y, w, h))
+    boxes.sort(key=lambda b: b[0])
+
+    crops = [mask[y:y + h, x:x + w] for (x, y, w, h) in boxes]
+    return boxes, crops
+
+
+def _make_masks(n: int, rng: np.random.Generator) -> List[Tuple[np.ndarray, np.ndarray]]:
+    w, h = 477, 123
+    masks = []
+    for _ in range(n):
+        mask = np.zeros((h, w), dtype=np.uint8)
+        count = int(rng.integers(4, 9))
+        slot = w // count
+        truth = []
+        for i in range(count):
+            size = float(rng.uniform(26, 44))
+            cx = slot * i + slot / 2.0 + rng.uniform(-slot * 0.1, slot * 0.1)
+            cy = h / 2.0 + rng.uniform(-10, 10)
+            direction = DIRECTIONS[int(rng.integers(0, 4))]
+            draw_arrow(mask, direction, size, (cx, cy), 255, float(rng.uniform(-8, 8)))
+            truth.append((cx - size / 2, cy - size / 2, size, size))
+
+        # noise: specks, small blobs, streaks
+        ys, xs = rng.integers(0, h, 150), rng.integers(0, w, 150)
+        mask[ys, xs] = 255
+        for _ in range(4):
+            cv.circle(mask, (int(rng.integers(0, w)), int(rng.integers(0, h))), int(rng.integers(1, 4)), 255, -1)
+        for _ in range(2):
+            x0, y0 = int(rng.integers(0, w)), int(rng.integers(0, h))
+            cv.line(mask, (x0, y0), (x0 + int(rng.integers(30, 90)), y0), 255, 2)
+        _, mask = cv.threshold(mask, 127, 255, cv.THRESH_BINARY)
+        masks.append((mask, np.asarray(truth, dtype=np.float32)))
+    return masks
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU matrix between (N, 4) and (M, 4) xywh boxes."""
+    ax1, ay1, ax2, ay2 = a[:, 0:1], a[:, 1:2], a[:, 0:1] + a[:, 2:3], a[:, 1:2] + a[:, 3:4]
+    bx1, by1, bx2, by2 = b[:, 0], b[:, 1], b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    return inter / (a[:, 2:3] * a[:, 3:4] + b[:, 2] * b[:, 3] - inter)
+
+
+def _evaluate(extract: Callable, masks) -> Tuple[float, float, float, float]:
+    for mask, _ in masks[:10]:
+        extract(mask)
+
+    times, found, total, extra = [], 0, 0, 0
+    for mask, truth in masks:
+        start = time.perf_counter()
+        boxes, _ = extract(mask)
+        times.append(time.perf_counter() - start)
+
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        total += len(truth)
+        if len(boxes):
+            matched = _iou(truth, boxes).max(axis=1) >= 0.5
+            found += int(matched.sum())
+            extra += max(0, len(boxes) - int(matched.sum()))
+
+    ms = np.asarray(times) * 1000.0
+    return float(ms.mean()), float(np.percentile(ms, 95)), found / max(1, total), extra / len(masks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--crop", type=int, default=32, help="crop side S")
+    args = parser.parse_args()
+
+    masks = _make_masks(args.frames, np.random.default_rng(11))
+    extractor = ArrowExtractor(crop_size=args.crop)
+
+    print(f"{args.frames} masks 477x123, 4-8 arrows + noise")
+    for name, extract in (("contours", _legacy_extract), ("components", extractor.extract)):
+        mean_ms, p95_ms, recall, extra = _evaluate(extract, masks)
+        print(f"{name:>10}: {mean_ms:6.3f} ms/frame (p95 {p95_ms:6.3f})  recall {recall * 100:5.1f}%  extra {extra:4.2f}/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Rune arrow sequences: single frame vs fixed wait vs early-commit voting.
+
+Each simulated prompt has 4 random arrows and streams per-frame classifier
+outputs at --fps. Clean frames give the right directions with confidence
+0.9-1.0. With probability --bad a frame has one wrong slot (confidence
+0.4-0.9), and with probability --split a frame has an arrow missing or an
+extra candidate (different sequence length).
+
+- single:  commit the first frame as-is
+- fixed:   majority over the first --wait frames (no early exit)
+- voter:   ArrowSequenceVoter, commits once every slot's share >= --threshold
+
+Reported: sequence accuracy, time-to-commit mean / p95 (ms), frames to
+commit and mean agreement.
+
+Run from the repository root:
+    python -m benchmarks.bench_arrow_voting --prompts 2000 --bad 0.2
+"""
+import argparse
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from components.vision.arrow_voter import ArrowSequence, ArrowSequenceVoter
+
+
+class _FixedWait:
+    """Baseline: always collect `wait` frames, then take the confidence-weighted majority."""
+
+    def __init__(self, wait: int) -> None:
+        self.wait = wait
+        self.voter = ArrowSequenceVoter(window=wait, min_frames=1, threshold=0.0)
+        self.frames: List[Tuple[np.ndarray, np.ndarray, float]] = []
+
+    def reset(self) -> None:
+        self.frames = []
+
+    def update(self, labels: np.ndarray, conf: np.ndarray, timestamp: float) -> Optional[ArrowSequence]:
+        self.frames.append((labels, conf, timestamp))
+        if len(self.frames) < self.wait:
+            return None
+        # replay the collected frames; with threshold 0 the voter commits on the last one
+        self.voter.reset()
+        committed = None
+        for i, (lb, cf, ts) in enumerate(self.frames):
+            self.voter.min_frames = 1 if i == len(self.frames) - 1 else self.wait + 1
+            committed = self.voter.update(lb, cf, ts)
+        return committed
+
+    def stats(self):
+        return self.voter.stats()
+
+
+def _frame(truth: np.ndarray, rng: np.random.Generator, args) -> Tuple[np.ndarray, np.ndarray]:
+    labels = truth.copy()
+    conf = rng.uniform(0.9, 1.0, size=len(truth)).astype(np.float32)
+    if rng.random() < args.bad:
+        slot = int(rng.integers(0, len(truth)))
+        labels[slot] = (labels[slot] + int(rng.integers(1, 4))) % 4
+        conf[slot] = rng.uniform(0.4, 0.9)
+    if rng.random() < args.split:
+        if rng.random() < 0.5:
+            drop = int(rng.integers(0, len(labels)))
+            labels, conf = np.delete(labels, drop), np.delete(conf, drop)
+        else:
+            at = int(rng.integers(0, len(labels) + 1))
+            labels = np.insert(labels, at, int(rng.integers(0, 4)))
+            conf = np.insert(conf, at, np.float32(rng.uniform(0.3, 0.7)))
+    return labels, conf
+
+
+def _run(voter: ArrowSequenceVoter, args, seed: int):
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / args.fps
+    correct = 0
+    for _ in range(args.prompts):
+        truth = rng.integers(0, 4, size=4)
+        voter.reset()
+        for i in range(args.max_frames):
+            labels, conf = _frame(truth, rng, args)
+            committed = voter.update(labels, conf, timestamp=i * dt)
+            if committed is not None:
+                correct += int(committed.labels == tuple(truth.tolist()))
+                break
+    return correct / args.prompts, voter.stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=2000)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--bad", type=float, default=0.2, help="probability of a frame with one wrong slot")
+    parser.add_argument("--split", type=float, default=0.05, help="probability of a missing/extra arrow")
+    parser.add_argument("--wait", type=int, default=10, help="frames for the fixed-wait baseline")
+    parser.add_argument("--window", type=int, default=8)
+    parser.add_argument("--min-frames", type=int, default=2)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--max-frames", type=int, default=90, help="give up on a prompt after this many frames")
+    args = parser.parse_args()
+
+    strategies = (
+        ("single", ArrowSequenceVoter(window=1, min_frames=1, threshold=0.0)),
+        (f"fixed {args.wait}", _FixedWait(args.wait)),
+        ("voter", ArrowSequenceVoter(window=args.window, min_frames=args.min_frames, threshold=args.threshold)),
+    )
+    print(f"{args.prompts} prompts @ {args.fps:.0f} fps, bad frames {args.bad}, split frames {args.split}")
+    for name, voter in strategies:
+        accuracy, stats = _run(voter, args, seed=9)
+        print(
+            f"{name:>9}: accuracy {accuracy * 100:6.2f}%  "
+            f"time-to-commit {stats['time_to_commit_ms_mean']:6.1f} ms (p95 {stats['time_to_commit_ms_p95']:6.1f})  "
+            f"frames {stats['frames_to_commit_mean']:5.2f}  agreement {stats['agreement_mean']:.3f}  "
+            f"uncommitted {args.prompts - stats['commits']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Frame change gating: vision stages with and without frame.change skipping.
+
+Frames come from a SyntheticFrameSource (with its ChangeDetector) drawing a
+static map with a minimap (rune + player icons) and the rune arrow prompt,
+cycling through phases of --phase frames each:
+
+- static:  nothing on screen changes (+-(--noise) gray levels of capture noise)
+- menu:    a window animates in the bottom-right corner, outside every stage's region
+- blank:   black loading screen
+- moving:  the player walks on the minimap and the arrow prompt flickers
+
+Stages, each run twice on the same frames (ungated / gated by frame.change):
+
+- detector:     MultiTemplateDetector (rune + player in the "minimap" region)
+- preprocessor: VisionPreprocessor mask of the "rune_arrows" region, gated
+                the way its worker loop is (change_gate on the resolved ROI)
+
+Reported per stage and phase: frames processed / reused / skipped as blank,
+mean stage cost per frame (ms) ungated vs gated, and how many gated results
+differ from the ungated ones on non-blank frames (detector boxes; arrow
+boxes extracted from the preprocessor mask). Should be 0. With --noise the
+default adaptive-threshold mask flickers on the noise itself, so ungated
+arrow boxes change from frame to frame and only the detector count stays
+meaningful; gating stays on (the noise is far below the change threshold).
+
+Arrow votes: the same scene replayed through RunTasks.replay() (real
+preprocessor and detector threads, update_arrows + ArrowSequenceVoter) with
+change detection off and on, once for a prompt that holds still (--phase
+static frames) and once for the full phase cycle. Commits, frames to commit
+and the committed sequence should match: a reused mask still votes for
+every frame it stands for.
+
+Run from the repository root:
+    python -m benchmarks.bench_change_gating --phase 100
+    python -m benchmarks.bench_change_gating --phase 100 --noise 3
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.arrow_voter import ArrowSequence
+from components.vision.change_detector import ChangeGate
+from components.vision.frame_source import SyntheticFrameSource
+from components.vision.multi_template_detector import MultiTemplateDetector
+from components.vision.region_registry import RegionRegistry
+from components.vision.vision_preprocessor import VisionPreprocessor
+from configs import constants
+from main import RunTasks
+
+PHASES: Tuple[str, ...] = ("static", "menu", "blank", "moving")
+
+
+class _Scene:
+    """Generator for SyntheticFrameSource: one phase of `phase` frames after another."""
+
+    def __init__(self, width: int, height: int, phase: int, noise: int) -> None:
+        rng = np.random.default_rng(18)
+        self.phase = phase
+        texture = rng.integers(40, 120, size=(height // 16, width // 16, 3), dtype=np.uint8)
+        self.background = cv.resize(texture, (width, height), interpolation=cv.INTER_CUBIC)
+        # minimap: flat frame with platforms
+        cv.rectangle(self.background, (0, 0), (319, 229), (60, 50, 40), -1)
+        for y in (60, 120, 180):
+            cv.line(self.background, (20, y), (300, y), (150, 150, 150), 2)
+        # dark panel behind the rune arrow prompt
+        cv.rectangle(self.background, (498, 257), (974, 379), (30, 30, 30), -1)
+        self.noise = rng.integers(-noise, noise + 1, size=(4, height, width, 1), dtype=np.int16)
+
+    def phase_of(self, index: int) -> str:
+        return PHASES[(index // self.phase) % len(PHASES)]
+
+    def player_x(self, index: int) -> int:
+        # only walks during the "moving" phases
+        cycle, offset = divmod(index, self.phase * len(PHASES))
+        walked = cycle * self.phase + max(0, offset - 3 * self.phase)
+        return 30 + (walked * 2) % 250
+
+    def __call__(self, index: int, out: np.ndarray) -> None:
+        phase = self.phase_of(index)
+        if phase == "blank":
+            out[:] = 0
+            return
+        noisy = self.background.astype(np.int16) + self.noise[index % len(self.noise)]
+        np.clip(noisy, 0, 255, out=noisy)
+        out[:] = noisy
+
+        cv.circle(out, (250, 52), 6, (200, 80, 220), -1)                              # rune icon
+        cv.circle(out, (self.player_x(index), 112), 5, (40, 230, 250), -1)            # player icon
+        if phase != "moving" or index % 6 < 3:
+            for i in range(4):                                                        # arrow prompt
+                x = 560 + i * 90
+                cv.fillConvexPoly(out, np.array([[x, 330], [x + 30, 290], [x + 60, 330]], np.int32), (20, 220, 240))
+        if phase == "menu":
+            h, w = out.shape[:2]
+            top = h - 40 - (index % self.phase) * 3
+            cv.rectangle(out, (w - 420, max(300, top)), (w - 20, h - 20), (230, 220, 200), -1)
+
+
+def _write_templates(scene: _Scene, size: Tuple[int, int], directory: str) -> List[Dict]:
+    canvas = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    scene(0, canvas)
+    rune, player = os.path.join(directory, "rune.png"), os.path.join(directory, "player.png")
+    cv.imwrite(rune, canvas[42:63, 240:261])
+    x = scene.player_x(0)
+    cv.imwrite(player, canvas[102:123, x - 10:x + 11])
+    return [
+        {"name": "rune", "path": rune, "threshold": 0.9, "region": "minimap"},
+        {"name": "player", "path": player, "threshold": 0.9, "region": "minimap"},
+    ]
+
+
+def _boxes(detections) -> Dict[str, List[Tuple[int, ...]]]:
+    return {name: sorted(map(tuple, d.boxes().tolist())) for name, d in detections.items()}
+
+
+def _replay_votes(
+    scene: _Scene, size: Tuple[int, int], templates: List[Dict], frames: int, detect_changes: bool
+) -> Tuple[Dict[str, float], Optional[ArrowSequence]]:
+    """Voter stats and last committed sequence of RunTasks.replay() over the scene's first `frames` frames."""
+    source = SyntheticFrameSource(size=size, generator=scene, detect_changes=detect_changes)
+    tasks = RunTasks(source=source)
+    tasks.template_config_list = templates
+    tasks.replay(max_frames=frames)
+    return tasks.arrow_voter.stats(), tasks.arrow_sequence
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phase", type=int, default=100, help="frames per phase")
+    parser.add_argument("--cycles", type=int, default=2, help="times the four phases are repeated")
+    parser.add_argument("--noise", type=int, default=0, help="capture noise amplitude in gray levels")
+    parser.add_argument("--width", type=int, default=1366)
+    parser.add_argument("--height", type=int, default=769)
+    args = parser.parse_args()
+
+    size = (args.width, args.height)
+    scene = _Scene(args.width, args.height, args.phase, args.noise)
+    regions = RegionRegistry.from_yaml(constants.REGION_CONFIG_PATH)
+    source = SyntheticFrameSource(size=size, generator=scene)
+
+    preprocessors: Dict[str, VisionPreprocessor] = {}
+    for mode in ("ungated", "gated"):
+        p = VisionPreprocessor()
+        p.bind_region(regions, "rune_arrows")
+        preprocessors[mode] = p
+
+    frames = args.phase * len(PHASES) * args.cycles
+    cost: Dict[Tuple[str, str, str], float] = {}
+    mismatches: Dict[str, int] = {"detector": 0, "preprocessor": 0}
+    phase_frames: Dict[str, int] = {phase: 0 for phase in PHASES}
+    phase_counts: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        templates = _write_templates(scene, size, tmp)
+        detectors = {mode: MultiTemplateDetector(templates, regions=regions) for mode in ("ungated", "gated")}
+        # arrow boxes extracted from each mode's current mask
+        arrows: Dict[str, List[Tuple[int, ...]]] = {}
+
+        for index in range(frames):
+            phase = scene.phase_of(index)
+            phase_frames[phase] += 1
+            source.capture_once()
+            frame = source.ring.latest()
+            try:
+                results = {}
+                for mode, detector in detectors.items():
+                    start = time.perf_counter()
+                    change = frame.change if mode == "gated" else None
+                    results[mode] = detector.detect(frame.derived.gray(), frame.seq, frame.derived, change)
+                    # detect() does not publish; keep the snapshot it reuses from
+                    detector._detections = results[mode]
+                    key = ("detector", mode, phase)
+                    cost[key] = cost.get(key, 0.0) + time.perf_counter() - start
+
+                for mode, p in preprocessors.items():
+                    start = time.perf_counter()
+                    if mode == "ungated":
+                        arrows[mode] = sorted(map(tuple, p.extract_arrows(p.process_frame(frame.image, frame.derived))[0].tolist()))
+                    else:
+                        decision = p.change_gate.check(frame.change, p._resolve_roi(frame.image))
+                        counts = phase_counts.setdefault(("preprocessor", phase), {})
+                        counts[decision] = counts.get(decision, 0) + 1
+                        if decision == ChangeGate.PROCESS:
+                            mask = p.process_frame(frame.image, frame.derived)
+                            arrows[mode] = sorted(map(tuple, p.extract_arrows(mask)[0].tolist()))
+                            p.change_gate.processed(frame.change)
+                        elif decision == ChangeGate.BLANK:
+                            arrows.pop(mode, None)
+                    key = ("preprocessor", mode, phase)
+                    cost[key] = cost.get(key, 0.0) + time.perf_counter() - start
+            finally:
+                frame.release()
+
+            if phase != "blank":
+                mismatches["detector"] += int(_boxes(results["gated"]) != _boxes(results["ungated"]))
+                mismatches["preprocessor"] += int(arrows.get("gated") != arrows["ungated"])
+
+        votes: Dict[Tuple[str, int, bool], Tuple[Dict[str, float], Optional[ArrowSequence]]] = {}
+        for case, n in (("static prompt", args.phase), ("all phases", frames)):
+            for detect_changes in (False, True):
+                votes[(case, n, detect_changes)] = _replay_votes(scene, size, templates, n, detect_changes)
+
+    change_stats = source.change_detector.stats()
+    print(f"{frames} frames {args.width}x{args.height}, {args.phase} per phase, noise +-{args.noise}; "
+          f"change detection {change_stats['ms_per_frame']:.3f} ms/frame "
+          f"({change_stats['changed']} changed, {change_stats['unchanged']} unchanged, {change_stats['blank']} blank)")
+    print(f"detector skip stats: {detectors['gated'].skip_stats()}")
+    print(f"preprocessor decisions per phase: "
+          f"{ {phase: phase_counts.get(('preprocessor', phase), {}) for phase in PHASES} }")
+    for stage in ("detector", "preprocessor"):
+        for phase in PHASES:
+            n = max(1, phase_frames[phase])
+            ungated = 1000.0 * cost.get((stage, "ungated", phase), 0.0) / n
+            gated = 1000.0 * cost.get((stage, "gated", phase), 0.0) / n
+            print(f"{stage:>12} {phase:>7}: ungated {ungated:7.3f} ms/frame  gated {gated:7.3f} ms/frame")
+        print(f"{stage:>12}: {mismatches[stage]} non-blank frames where gated results differ")
+
+    for (case, n, detect_changes), (stats, sequence) in votes.items():
+        print(f"{'votes':>12} {case} ({n} frames), change detection {'on ' if detect_changes else 'off'}: "
+              f"{stats['commits']} commits, {stats['frames_to_commit_mean']:.1f} frames to commit, "
+              f"last {None if sequence is None else sequence.directions}")
+
+
+if __name__ == "__main__":
+    main()
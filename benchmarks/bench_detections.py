@@ -0,0 +1,102 @@
+"""
+Detection result representation: legacy List[Dict] vs Detections snapshots.
+
+Per frame, both paths publish N matches (as produced by NMS) and the main
+loop reads them once:
+
+- dicts:      one dict of boxed ints per hit, reader copies the list
+              (the old ObjectDetector.get_coordinates behaviour)
+- detections: one read-only structured array, reader takes the reference
+
+Reported per frame: wall time, and the Python memory blocks / bytes that a
+published result keeps alive (measured with tracemalloc).
+
+Run from the repository root:
+    python -m benchmarks.bench_detections --hits 10 --frames 20000
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from components.vision.detections import Detections
+
+
+def _legacy_publish(boxes: np.ndarray, scores: np.ndarray, frame_seq: int) -> List[Dict[str, int]]:
+    coords: List[Dict[str, int]] = []
+    for (x, y, w, h), score in zip(boxes, scores):
+        coords.append(
+            {
+                "x": int(x),
+                "y": int(y),
+                "w": int(w),
+                "h": int(h),
+                "center_x": int(x + w // 2),
+                "center_y": int(y + h // 2),
+                "score": float(score),
+            }
+        )
+    return coords
+
+
+def _legacy_read(published: List[Dict[str, int]]) -> List[Dict[str, int]]:
+    return list(published)
+
+
+def _snapshot_publish(boxes: np.ndarray, scores: np.ndarray, frame_seq: int) -> Detections:
+    return Detections.from_boxes(boxes, scores, frame_seq)
+
+
+def _snapshot_read(published: Detections) -> Detections:
+    return published
+
+
+def _measure(
+    publish: Callable, read: Callable, boxes: np.ndarray, scores: np.ndarray, frames: int
+) -> Tuple[float, float, float]:
+    start = time.perf_counter()
+    for seq in range(frames):
+        read(publish(boxes, scores, seq))
+    per_frame_us = (time.perf_counter() - start) / frames * 1e6
+
+    # Retained cost of one published result per frame
+    kept = []
+    sample = min(frames, 2000)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for seq in range(sample):
+        kept.append(read(publish(boxes, scores, seq)))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    blocks = sum(s.count_diff for s in stats) / sample
+    size = sum(s.size_diff for s in stats) / sample
+    return per_frame_us, blocks, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=10, help="detections per frame")
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    boxes = np.empty((args.hits, 4), dtype=np.int32)
+    boxes[:, :2] = rng.integers(0, 1300, size=(args.hits, 2))
+    boxes[:, 2:] = 24
+    scores = np.sort(rng.uniform(0.8, 1.0, size=args.hits).astype(np.float32))[::-1]
+
+    print(f"{args.hits} hits per frame, {args.frames} frames")
+    for name, publish, read in (
+        ("dicts", _legacy_publish, _legacy_read),
+        ("detections", _snapshot_publish, _snapshot_read),
+    ):
+        us, blocks, size = _measure(publish, read, boxes, scores, args.frames)
+        print(f"{name:>11}: {us:8.2f} us/frame  {blocks:6.1f} blocks/frame  {size:8.0f} bytes/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+VisionPreprocessor pipeline: per-frame rebuild vs compiled FilterPlan.
+
+- legacy: the original process_frame body (bounds, kernel and clip math
+          rebuilt per frame, fresh arrays from every OpenCV call)
+- plan:   FilterPlan compiled once from the FilterConfig, dst= buffers reused,
+          brightness/contrast + equalizeHist fused into one LUT, and the
+          mask returned single-channel (no GRAY2BGR)
+
+Frames are synthetic arrow-prompt-like images (coloured blobs on a noisy
+background). Both paths are checked to produce identical masks. Reported per
+frame: mean / p95 time, and the peak memory allocated while processing one
+frame (tracemalloc; numpy-backed OpenCV outputs are included).
+
+Run from the repository root:
+    python -m benchmarks.bench_filter_plan --frames 300
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.filter_plan import FilterPlan
+from configs.filter_configs import FilterConfig
+
+
+def _legacy_process(img: np.ndarray, cfg: FilterConfig) -> np.ndarray:
+    hsv = cv.cvtColor(img, cv.COLOR_BGR2HSV)
+    h_ch, s_ch, v_ch = cv.split(hsv)
+
+    h_min = int(np.clip(cfg.h_min, 0, 179))
+    h_max = int(np.clip(cfg.h_max, 0, 179))
+    s_min = int(np.clip(cfg.s_min, 0, 255))
+    s_max = int(np.clip(cfg.s_max, 0, 255))
+    v_min = int(np.clip(cfg.v_min, 0, 255))
+    v_max = int(np.clip(cfg.v_max, 0, 255))
+    lower = np.array([h_min, s_min, v_min], dtype=np.uint8)
+    upper = np.array([h_max, s_max, v_max], dtype=np.uint8)
+    hsv_mask = cv.inRange(hsv, lower, upper)
+
+    mode = int(getattr(cfg, "hsv_channel", 2))
+    if mode == 0:
+        base_gray = h_ch
+    elif mode == 1:
+        base_gray = s_ch
+    elif mode == 2:
+        base_gray = v_ch
+    else:
+        base_gray = cv.addWeighted(s_ch, 0.4, v_ch, 0.6, 0)
+    gray = cv.bitwise_and(base_gray, base_gray, mask=hsv_mask)
+
+    k = max(1, cfg.gaussian)
+    if k % 2 == 0:
+        k += 1
+    if k >= 3:
+        gray = cv.medianBlur(gray, k)
+
+    brightness = int(np.clip(cfg.brightness, 0, 100))
+    alpha = 1.0 + (cfg.contrast / 50.0)
+    gray = cv.convertScaleAbs(gray, alpha=alpha, beta=brightness)
+    gray = cv.equalizeHist(gray)
+
+    if cfg.use_adaptive:
+        mask = cv.adaptiveThreshold(gray, 255, cv.ADAPTIVE_THRESH_GAUSSIAN_C, cv.THRESH_BINARY, 31, 2)
+    else:
+        _, mask = cv.threshold(gray, int(np.clip(cfg.thresh_min, 0, 255)), 255, cv.THRESH_BINARY)
+
+    ksz = max(1, cfg.kernel_size)
+    kernel = np.ones((ksz, ksz), np.uint8)
+    mask = cv.morphologyEx(mask, cv.MORPH_OPEN, kernel, iterations=max(1, cfg.erosion_iterations))
+    mask = cv.morphologyEx(mask, cv.MORPH_CLOSE, kernel, iterations=max(1, cfg.dilation_iterations))
+    return cv.cvtColor(mask, cv.COLOR_GRAY2BGR)
+
+
+def _make_frames(n: int, size: Tuple[int, int], rng: np.random.Generator) -> List[np.ndarray]:
+    w, h = size
+    frames = []
+    for _ in range(n):
+        img = rng.integers(0, 90, size=(h, w, 3), dtype=np.uint8)
+        for _ in range(6):
+            cx, cy = int(rng.integers(0, w)), int(rng.integers(0, h))
+            r = int(rng.integers(8, max(9, min(w, h) // 6)))
+            color = tuple(int(c) for c in rng.integers(120, 256, size=3))
+            cv.circle(img, (cx, cy), r, color, -1)
+        frames.append(img)
+    return frames
+
+
+def _configs() -> List[Tuple[str, FilterConfig]]:
+    # the control panel's defaults, plus a global-threshold / S+V variant
+    panel = FilterConfig(
+        hsv_channel=2, s_min=147, v_min=190, brightness=100, contrast=100,
+        gaussian=0, use_adaptive=False, thresh_min=0, kernel_size=0,
+        dilation_iterations=0, erosion_iterations=0,
+    )
+    tuned = FilterConfig(hsv_channel=3, s_min=60, v_min=120, brightness=20, contrast=30, gaussian=5)
+    return [("panel defaults", panel), ("adaptive/S+V/blur", tuned)]
+
+
+def _measure(fn: Callable[[np.ndarray], np.ndarray], frames: List[np.ndarray]) -> Tuple[float, float, float]:
+    for img in frames[:5]:
+        fn(img)
+
+    times = []
+    for img in frames:
+        start = time.perf_counter()
+        fn(img)
+        times.append(time.perf_counter() - start)
+
+    sample = frames[: min(len(frames), 50)]
+    peaks = []
+    tracemalloc.start()
+    for img in sample:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn(img)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+    tracemalloc.stop()
+
+    ms = np.asarray(times) * 1000.0
+    return float(ms.mean()), float(np.percentile(ms, 95)), float(np.mean(peaks))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    for size_name, size in (("default ROI 477x123", (477, 123)), ("full 1920x1080", (1920, 1080))):
+        frames = _make_frames(args.frames, size, rng)
+        for cfg_name, cfg in _configs():
+            plan = FilterPlan(cfg)
+            mismatched = sum(
+                int(np.count_nonzero(_legacy_process(img, cfg)[..., 0] != plan.run(img))) for img in frames[:20]
+            )
+            print(f"{size_name}, {cfg_name} (mismatched pixels vs legacy: {mismatched})")
+            for name, fn in (("legacy", lambda img: _legacy_process(img, cfg)), ("plan", plan.run)):
+                mean_ms, p95_ms, peak = _measure(fn, frames)
+                print(f"  {name:>6}: {mean_ms:7.3f} ms/frame (p95 {p95_ms:7.3f})  peak alloc {peak / 1024:9.1f} KiB/frame")
+
+
+if __name__ == "__main__":
+    main()
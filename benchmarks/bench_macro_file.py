@@ -0,0 +1,99 @@
+"""
+Macro files: load time and size of YAML vs the binary macro format.
+
+For each --sizes event count a macro (bench_macro_timeline's random key
+presses) is saved as YAML, converted to binary with convert_macro() (the
+CLI converter's code path), and loaded back with read_macro():
+
+- yaml:   libyaml parse + MacroTimeline.compile()
+- binary: header parse + memory-mapped records (read_macro)
+- binary (copy): records read into memory (read_binary_macro(mmap=False))
+
+Reported per size: file size, load time (best of --repeat), time until the
+first play() can start (load + converting its first chunk of events), and
+whether the binary round trip (YAML -> binary -> YAML) is exact. YAML is
+skipped above --yaml-max events (it grows to minutes); those sizes are
+written from the compiled timeline directly.
+
+Run from the repository root:
+    python -m benchmarks.bench_macro_file --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from benchmarks.bench_macro_timeline import _events
+from components.bot.macro_file import convert_macro, read_binary_macro, read_macro, write_macro
+from components.bot.macro_timeline import MacroTimeline
+
+
+def _best(load: Callable[[], Tuple[Dict, MacroTimeline]], repeat: int) -> Tuple[float, float, MacroTimeline]:
+    """Best load time and best load + first play chunk time (seconds), plus the last timeline."""
+    load_s, ready_s = float("inf"), float("inf")
+    timeline = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, timeline = load()
+        loaded = time.perf_counter()
+        next(timeline.chunks(), None)
+        ready = time.perf_counter()
+        load_s = min(load_s, loaded - start)
+        ready_s = min(ready_s, ready - start)
+    return load_s, ready_s, timeline
+
+
+def _same(a: MacroTimeline, b: MacroTimeline) -> bool:
+    return (
+        a.keys == b.keys
+        and np.array_equal(a.times, b.times)
+        and np.array_equal(a.key_ids, b.key_ids)
+        and np.array_equal(a.down, b.down)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--yaml-max", type=int, default=100_000, help="largest macro also measured as YAML")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    meta = {"description": "bench"}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            yaml_path = os.path.join(tmp, f"record_{size}.yaml")
+            bin_path = os.path.join(tmp, f"record_{size}.mbin")
+            rows = []
+            exact = "-"
+            if size <= args.yaml_max:
+                write_macro(yaml_path, MacroTimeline.compile(_events(size, 20.0)), meta)
+                convert_macro(yaml_path, bin_path)
+                load_s, ready_s, from_yaml = _best(lambda: read_macro(yaml_path), 1)
+                rows.append(("yaml", os.path.getsize(yaml_path), load_s, ready_s))
+
+                back = os.path.join(tmp, f"back_{size}.yaml")
+                convert_macro(bin_path, back)
+                exact = "yes" if _same(read_macro(back)[1], from_yaml) else "NO"
+            else:
+                write_macro(bin_path, MacroTimeline.compile(_events(size, 20.0)), meta)
+
+            load_s, ready_s, from_bin = _best(lambda: read_macro(bin_path), args.repeat)
+            rows.append(("binary", os.path.getsize(bin_path), load_s, ready_s))
+            load_s, ready_s, _ = _best(lambda: read_binary_macro(bin_path, mmap=False), args.repeat)
+            rows.append(("binary (copy)", os.path.getsize(bin_path), load_s, ready_s))
+            if size <= args.yaml_max and exact == "yes":
+                exact = "yes" if _same(from_bin, from_yaml) else "NO"
+
+            print(f"{size} events (round trip exact: {exact})")
+            for name, nbytes, load_s, ready_s in rows:
+                print(f"  {name:>13}: {nbytes / 2**20:8.2f} MB  load {load_s * 1000:10.2f} ms  "
+                      f"ready to play {ready_s * 1000:10.2f} ms")
+            del from_bin
+
+
+if __name__ == "__main__":
+    main()
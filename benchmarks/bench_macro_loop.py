@@ -0,0 +1,134 @@
+"""
+Macro looping: seamless loop vs release-all + clock restart per pass.
+
+A rotation macro of --events events per --pass-s seconds is looped --loops
+times against a recording input backend, two ways:
+
+- restart:  the previous MacroPlayer.run, one MacroTimeline.play() per pass,
+            releasing every held key and restarting the clock in between
+- seamless: one MacroTimeline.play(loops=N) on a single clock, releasing only
+            MacroTimeline.seam_releases() at the seams
+
+The macro holds "left" across its end (its first event is "left" up, so the
+hold is consistent and must survive the seam) and ends with "shift" still
+down (its first event is "shift" down, so it must be released at the seam).
+
+Reported per mode: cumulative drift after N loops (end of the last pass vs
+start + N x pass length), key-ups sent at the seams (all key-ups minus the
+macro's own), redundant key-downs (pressing a held key) and key-ups of keys
+that were not held (the first pass's "left" up is one in both modes).
+
+Clocks: "simulated" (PreciseScheduler on the bench_precise_scheduler virtual
+timer clock; long runs in no time) and "real" (perf_counter / sleep).
+
+Run from the repository root:
+    python -m benchmarks.bench_macro_loop --loops 20 --pass-s 0.5 --clocks real
+    python -m benchmarks.bench_macro_loop --loops 2000 --pass-s 60 --clocks simulated
+"""
+import argparse
+import time
+from typing import Any, Dict, List, Set
+
+import numpy as np
+
+from benchmarks.bench_precise_scheduler import _SimulatedClock
+from components.bot.macro_timeline import MacroTimeline
+from components.bot.precise_scheduler import PreciseScheduler
+
+TAP_KEYS = ("a", "s", "d", "f", "space")
+
+
+def _macro(events: int, length: float, seed: int = 23) -> List[Dict[str, Any]]:
+    """Taps of TAP_KEYS between a 'left' release at the start and 'left' + 'shift' presses at the end."""
+    rng = np.random.default_rng(seed)
+    taps = max(1, (events - 4) // 2)
+    starts, spacing = np.linspace(0.05 * length, 0.85 * length, taps, endpoint=False, retstep=True)
+    hold = 0.5 * spacing
+    out: List[Dict[str, Any]] = [
+        {"time": 0.0, "key": "left", "type": "up"},
+        {"time": 0.01 * length, "key": "shift", "type": "down"},
+        {"time": 0.02 * length, "key": "shift", "type": "up"},
+    ]
+    tap_events = []
+    for t in starts.tolist():
+        key = TAP_KEYS[int(rng.integers(len(TAP_KEYS)))]
+        tap_events.append((t, key, "down"))
+        tap_events.append((t + hold, key, "up"))
+    out += [{"time": round(t, 4), "key": k, "type": typ} for t, k, typ in tap_events]
+    out += [
+        {"time": 0.9 * length, "key": "left", "type": "down"},
+        {"time": length, "key": "shift", "type": "down"},
+    ]
+    return out
+
+
+class _Backend:
+    """Input backend that tracks held keys and counts key-ups and anomalies."""
+
+    def __init__(self) -> None:
+        self.held: Set[str] = set()
+        self.ups = 0
+        self.redundant_downs = 0
+        self.stray_ups = 0
+
+    def press(self, key: str) -> None:
+        if key in self.held:
+            self.redundant_downs += 1
+        self.held.add(key)
+
+    def release(self, key: str) -> None:
+        self.ups += 1
+        if key not in self.held:
+            self.stray_ups += 1
+        self.held.discard(key)
+
+
+def _run(mode: str, timeline: MacroTimeline, loops: int, clock, sleep) -> Dict[str, float]:
+    backend = _Backend()
+    scheduler = PreciseScheduler(clock=clock, sleep=sleep)
+    never = lambda: False
+    start = clock()
+    if mode == "restart":
+        for done in range(1, loops + 1):
+            timeline.play(backend.press, backend.release, never, scheduler)
+            if done < loops:
+                for key in list(backend.held):
+                    backend.release(key)
+    else:
+        timeline.play(backend.press, backend.release, never, scheduler, loops=loops)
+    end = clock()
+    macro_ups = loops * int((timeline.down == 0).sum())
+    return {
+        "drift_ms": (end - start - loops * timeline.duration) * 1000.0,
+        "seam_ups": backend.ups - macro_ups,
+        "redundant_downs": backend.redundant_downs,
+        "stray_ups": backend.stray_ups,
+        "p99_ms": scheduler.stats()["p99_ms"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=60, help="events per pass")
+    parser.add_argument("--pass-s", type=float, default=0.5, help="macro length in seconds")
+    parser.add_argument("--loops", type=int, default=20)
+    parser.add_argument("--clocks", nargs="+", default=["simulated", "real"], choices=["simulated", "real"])
+    args = parser.parse_args()
+
+    timeline = MacroTimeline.compile(_macro(args.events, args.pass_s))
+    seam = [timeline.keys[k] for k in timeline.seam_releases()]
+    print(f"{len(timeline)} events / {timeline.duration:g}s pass x {args.loops} loops; seam releases {seam}")
+    for kind in args.clocks:
+        for mode in ("restart", "seamless"):
+            if kind == "simulated":
+                sim = _SimulatedClock(0.001, 0.001, 2e-6)
+                r = _run(mode, timeline, args.loops, sim.clock, sim.sleep)
+            else:
+                r = _run(mode, timeline, args.loops, time.perf_counter, time.sleep)
+            print(f"{kind:>9} {mode:>8}: drift after {args.loops} loops {r['drift_ms']:8.3f} ms  "
+                  f"seam key-ups {r['seam_ups']:4d}  redundant downs {r['redundant_downs']:4d}  "
+                  f"stray ups {r['stray_ups']:4d}  lateness p99 {r['p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Macro recorder: hook callback cost, memory growth and crash safety.
+
+--events synthetic keyboard events (bench_macro_timeline's random presses,
+as keyboard.KeyboardEvent-like objects) are fed to the recorder's hook
+callback, --rate events per second (0 = as fast as possible), two ways:
+
+- dicts:     the previous MacroRecorder._callback, one dict appended to an
+             in-memory list per event, nothing on disk until save()
+- streaming: MacroRecorder._callback (packed arrays) with its background
+             journal writer flushing every --flush seconds
+
+Reported:
+- callback cost per event: mean / p99 / max microseconds (timed around
+  each call) and the recorder's own stats(), including how many callbacks
+  exceeded its callback_warn_us bound (those are logged as a warning);
+  on a loaded or single-core machine the max is dominated by the writer
+  thread holding the GIL or the OS descheduling the feeding thread, and the
+  dict recorder shows the same spikes
+- Python memory still allocated at the end of the recording (tracemalloc,
+  separate pass): grows per event for dicts, bounded for streaming
+- save(): time to finalize the journal into a .mbin file, and that the
+  saved macro equals the events fed
+- crash: the writer is abandoned mid-recording and recover() rebuilds the
+  macro from the journal; events lost should be at most one flush interval
+
+keyboard (the hook library) is not needed: the callback is driven directly.
+
+Run from the repository root:
+    python -m benchmarks.bench_macro_recorder --events 200000
+    python -m benchmarks.bench_macro_recorder --events 2000 --rate 200 --flush 0.5
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.bench_macro_timeline import _events
+from components.bot.macro_file import read_macro
+from components.bot.macro_recorder import JOURNAL_SUFFIX, MacroRecorder
+
+
+class _KeyEvent:
+    __slots__ = ("event_type", "name", "time")
+
+    def __init__(self, event_type: str, name: str, time: float) -> None:
+        self.event_type = event_type
+        self.name = name
+        self.time = time
+
+
+class _DictRecorder:
+    """The pre-streaming MacroRecorder callback."""
+
+    def __init__(self, keys: List[str]) -> None:
+        self.keys = keys
+        self.events: List[Dict[str, Any]] = []
+        self.start_time = None
+        self.is_recording = True
+
+    def _callback(self, event) -> None:
+        if not self.is_recording:
+            return
+        if event.event_type not in ("down", "up"):
+            return
+        name = event.name
+        if name in self.keys:
+            return
+        if name is None:
+            return
+        if self.start_time is None:
+            self.start_time = event.time
+        rel_time = event.time - self.start_time
+        self.events.append({"time": round(rel_time, 4), "key": str(name), "type": str(event.event_type)})
+
+
+def _streaming(directory: str, flush: float) -> MacroRecorder:
+    """A MacroRecorder recording into `directory` without installing the keyboard hook."""
+    recorder = MacroRecorder(directory, keys=["f7", "f8"], file_ext=".mbin", flush_interval=flush)
+    recorder.path = os.path.join(directory, f"record_bench_{time.perf_counter_ns()}.mbin")
+    recorder._open_journal()
+    recorder.is_recording = True
+    return recorder
+
+
+def _feed(callback, events: List[_KeyEvent], rate: float, stop_at: int = -1) -> np.ndarray:
+    """Call `callback` per event (paced at `rate`); returns per-call cost in microseconds."""
+    costs = np.empty(len(events))
+    interval = 1.0 / rate if rate > 0 else 0.0
+    next_at = time.perf_counter()
+    for i, event in enumerate(events):
+        if i == stop_at:
+            return costs[:i] * 1e6
+        start = time.perf_counter()
+        callback(event)
+        costs[i] = time.perf_counter() - start
+        if interval:
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    return costs * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--rate", type=float, default=0.0, help="events per second (0 = as fast as possible)")
+    parser.add_argument("--flush", type=float, default=0.5, help="journal flush interval (s)")
+    args = parser.parse_args()
+
+    recorded = _events(args.events, 20.0)
+    base = time.time()
+    events = [_KeyEvent(e["type"], e["key"], base + e["time"]) for e in recorded]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.events} events, rate {args.rate:g}/s, journal flush every {args.flush:g}s")
+
+        # callback cost
+        dict_costs = _feed(_DictRecorder(["f7", "f8"])._callback, events, args.rate)
+        recorder = _streaming(tmp, args.flush)
+        stream_costs = _feed(recorder._callback, events, args.rate)
+        for name, costs in (("dicts", dict_costs), ("streaming", stream_costs)):
+            print(f"{name:>9} callback: mean {costs.mean():6.3f} us  p99 {np.percentile(costs, 99):6.3f}  "
+                  f"max {costs.max():8.3f}")
+        recorder.is_recording = False
+        recorder._close_journal()
+        print(f"{'':>9} recorder stats: {recorder.stats()}")
+
+        # save
+        start = time.perf_counter()
+        path = recorder.save()
+        save_ms = (time.perf_counter() - start) * 1000.0
+        _, timeline = read_macro(path)
+        exact = timeline.events() == [{"time": round(e["time"] - recorded[0]["time"], 4), "key": e["key"], "type": e["type"]}
+                                      for e in recorded]
+        print(f"save: {save_ms:.1f} ms -> {os.path.getsize(path) / 2**20:.2f} MB, "
+              f"saved macro equals the events fed: {'yes' if exact else 'NO'}")
+
+        # memory still held at the end of the recording
+        for name in ("dicts", "streaming"):
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            target = _DictRecorder(["f7", "f8"]) if name == "dicts" else _streaming(tmp, args.flush)
+            _feed(target._callback, events, 0.0)
+            held = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+            print(f"{name:>9} memory held after {args.events} events: {held / 2**20:7.2f} MB "
+                  f"({held / args.events:6.1f} B/event)")
+            if name == "streaming":
+                target.is_recording = False
+                target._close_journal()
+
+        # crash mid-recording: the writer stops without a final flush
+        crash_at = args.events // 2
+        recorder = _streaming(tmp, args.flush)
+        _feed(recorder._callback, events, args.rate, stop_at=crash_at)
+        time.sleep(1.5 * args.flush)  # the writer flushed at least once since the last event
+        _feed(recorder._callback, events[crash_at:crash_at + 10], 0.0)
+        recorder._stop_event.set()
+        recorder._writer.join()
+        journal = recorder.path + JOURNAL_SUFFIX
+        _, timeline = read_macro(MacroRecorder.recover(journal))
+        print(f"crash after {crash_at + 10} events: recovered {len(timeline)} "
+              f"({crash_at + 10 - len(timeline)} lost, the unflushed tail)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Macro timeline: load time, memory footprint and dispatch overhead per event.
+
+A --events event macro (random keys pressed and released, --rate events per
+second) is written in the MacroRecorder YAML format and played two ways
+against a no-op input backend:
+
+- dicts:    the previous MacroPlayer path, a copy of the event dicts per
+            pass and float()/str() parsing plus string dispatch per event
+- timeline: MacroTimeline.compile() at load, MacroTimeline.play() per pass
+            (PreciseScheduler waits, recording every event's lateness)
+
+Reported:
+- load: YAML parse (read_yaml_file) and compile time
+- memory: the event dicts (tracemalloc) vs the timeline (its arrays are
+  all it keeps) and the peak extra memory during one play() (one chunk of
+  Python lists, plus the scheduler's 8-byte lateness record per event)
+- dispatch: per-event overhead in microseconds with the clock never waiting
+  (the time each path spends per event besides sending the key), and that
+  both paths send the same key sequence
+
+Run from the repository root:
+    python -m benchmarks.bench_macro_timeline --events 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from components.bot.macro_timeline import MacroTimeline
+from components.bot.precise_scheduler import PreciseScheduler
+from utils import read_yaml_file, write_yaml_file
+
+KEYS: Tuple[str, ...] = ("left", "right", "up", "down", "space", "alt", "ctrl", "shift", "a", "s", "d", "f", "z", "x")
+
+
+def _events(count: int, rate: float, seed: int = 21) -> List[Dict[str, Any]]:
+    """Press/release pairs of random keys, as MacroRecorder writes them."""
+    rng = np.random.default_rng(seed)
+    gaps = rng.exponential(1.0 / rate, size=count)
+    times = np.round(np.cumsum(gaps), 4).tolist()
+    keys = rng.integers(0, len(KEYS), size=count // 2 + 1).tolist()
+    return [
+        {"time": times[i], "key": KEYS[keys[i // 2]], "type": "down" if i % 2 == 0 else "up"}
+        for i in range(count)
+    ]
+
+
+class _LateClock:
+    """Reads 0 once (the playback start), then far past every event: no waiting, only per-event work."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        now, self.now = self.now, 1e12
+        return now
+
+
+def _play_dicts(events: List[Dict[str, Any]], press, release, stopped, clock) -> int:
+    """The pre-timeline MacroPlayer._play_once loop."""
+    events = list(events)
+    start_time = clock()
+    dispatched = 0
+    for event in events:
+        if stopped():
+            break
+        target_t = float(event["time"])
+        key = str(event["key"])
+        typ = str(event["type"])
+        while not stopped() and (clock() - start_time < target_t):
+            time.sleep(0.0005)
+        if stopped():
+            break
+        if typ == "down":
+            press(key)
+        elif typ == "up":
+            release(key)
+        dispatched += 1
+    return dispatched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--rate", type=float, default=20.0, help="recorded events per second")
+    parser.add_argument("--repeat", type=int, default=5, help="playback passes per path (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "record_bench.yaml")
+        write_yaml_file(path, {"meta": {"description": "bench"}, "events": _events(args.events, args.rate)})
+        size_mb = os.path.getsize(path) / 2**20
+
+        start = time.perf_counter()
+        events = read_yaml_file(path)["events"]
+        parse_s = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    copied = [dict(event) for event in events]
+    dicts_bytes = tracemalloc.get_traced_memory()[0] - before + 8 * len(copied)
+    tracemalloc.stop()
+    del copied
+
+    start = time.perf_counter()
+    timeline = MacroTimeline.compile(events)
+    compile_s = time.perf_counter() - start
+
+    timeline.seam_releases()  # computed once per timeline (transient sort), not per play
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    timeline.play(lambda key: None, lambda key: None, lambda: False, PreciseScheduler(clock=_LateClock()))
+    play_bytes = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    sent: Dict[str, List[Tuple[str, str]]] = {"dicts": [], "timeline": []}
+    best: Dict[str, float] = {}
+    for name in ("dicts", "timeline"):
+        for attempt in range(args.repeat):
+            log = sent[name] if attempt == 0 else None
+            press = (lambda key: log.append(("down", key))) if log is not None else (lambda key: None)
+            release = (lambda key: log.append(("up", key))) if log is not None else (lambda key: None)
+            never_stopped = lambda: False
+            clock = _LateClock()
+            start = time.perf_counter()
+            if name == "dicts":
+                played = _play_dicts(events, press, release, never_stopped, clock)
+            else:
+                played = timeline.play(press, release, never_stopped, PreciseScheduler(clock=clock))
+            elapsed = time.perf_counter() - start
+            assert played == len(events)
+            best[name] = min(best.get(name, float("inf")), elapsed)
+
+    print(f"{args.events} events ({len(timeline.keys)} keys, {timeline.duration:.0f}s of macro), YAML {size_mb:.1f} MB")
+    print(f"load: parse {parse_s * 1000:8.1f} ms  compile {compile_s * 1000:6.1f} ms "
+          f"({compile_s / len(events) * 1e6:.2f} us/event)")
+    print(f"memory: event dicts {dicts_bytes / 2**20:6.2f} MB  "
+          f"timeline {timeline.nbytes / 2**20:5.2f} MB  peak during play {play_bytes / 2**20:5.2f} MB")
+    for name in ("dicts", "timeline"):
+        print(f"dispatch {name:>8}: {best[name] / len(events) * 1e6:6.3f} us/event")
+    print(f"same key sequence: {'yes' if sent['dicts'] == sent['timeline'] else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Frame-to-coordinates latency: legacy sleep polling vs StageSignal wakeups.
+
+Both modes run the same template match on the same synthetic frames:
+
+- poll:  the pre-StageSignal design; the detector loop grabs whatever frame is
+         current, matches it and then sleeps a fixed 10 ms (re-matching frames
+         it has already seen).
+- event: ObjectDetector attached to the FrameRing; it wakes on the capture
+         signal and a listener wakes on the detector's result signal.
+
+Latency is measured from the capture timestamp of a frame to the moment the
+coordinates computed from that frame are available.
+
+CPU is process time over wall time, so a mode that keeps up with more frames
+uses more of it: when matching takes longer than the capture interval, event
+mode (no fixed sleep between matches) delivers more frames at a higher cpu%.
+cpu/frame (process time per frame delivered) is the comparable cost.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline_latency --seconds 5 --interval 0.1
+"""
+import argparse
+import os
+import tempfile
+import time
+from threading import Thread
+from typing import Dict, List, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.frame_source import SyntheticFrameSource
+from components.vision.object_detector import ObjectDetector
+
+
+def _write_template(source: SyntheticFrameSource, path: str) -> None:
+    """Crop the moving square (plus a little background) as the template."""
+    canvas = np.empty((source.h, source.w, 3), dtype=np.uint8)
+    source.generator(0, canvas)
+    y = source.h // 2 - 25
+    cv.imwrite(path, canvas[y:y + 50, 0:50])
+
+
+def _capture_loop(source: SyntheticFrameSource, seconds: float, interval: float, stamps: Dict[int, float]) -> None:
+    canvas = np.empty((source.h, source.w, 3), dtype=np.uint8)
+    end = time.perf_counter() + seconds
+    index = 0
+    while time.perf_counter() < end:
+        source.generator(index, canvas)
+        index += 1
+        captured_at = time.perf_counter()
+        # single writer: the next sequence id is known before the frame is published
+        stamps[source.ring.latest_seq + 1] = captured_at
+        source.ring.write(canvas, timestamp=captured_at)
+        time.sleep(interval)
+
+
+def _summary(name: str, latencies: List[float], matches: int, cpu: float, wall: float) -> str:
+    if not latencies:
+        return f"{name:>6}: no results"
+    lat = np.array(latencies) * 1000.0
+    return (
+        f"{name:>6}: frames={len(lat):5d} matches={matches:5d} "
+        f"mean={lat.mean():6.2f}ms p50={np.percentile(lat, 50):6.2f}ms "
+        f"p95={np.percentile(lat, 95):6.2f}ms cpu={100.0 * cpu / wall:5.1f}% "
+        f"cpu/frame={1000.0 * cpu / len(lat):6.2f}ms"
+    )
+
+
+def run_poll(template: str, seconds: float, interval: float) -> Tuple[List[float], int, float, float]:
+    source = SyntheticFrameSource()
+    detector = ObjectDetector(template_path=template, threshold=0.9)
+    latencies: Dict[int, float] = {}
+    matches = 0
+    stamps: Dict[int, float] = {}
+
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    capture = Thread(target=_capture_loop, args=(source, seconds, interval, stamps), daemon=True)
+    capture.start()
+    while capture.is_alive():
+        frame = source.ring.latest()
+        if frame is not None:
+            with frame:
+                detector._match_template(detector.preprocess_image(frame.image))
+                matches += 1
+                latencies.setdefault(frame.seq, time.perf_counter() - frame.timestamp)
+        time.sleep(0.01)
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    return list(latencies.values()), matches, cpu, wall
+
+
+def run_event(template: str, seconds: float, interval: float) -> Tuple[List[float], int, float, float]:
+    source = SyntheticFrameSource()
+    detector = ObjectDetector(template_path=template, threshold=0.9)
+    detector.attach(source.ring)
+    detector.start()
+    latencies: Dict[int, float] = {}
+    stamps: Dict[int, float] = {}
+
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    capture = Thread(target=_capture_loop, args=(source, seconds, interval, stamps), daemon=True)
+    capture.start()
+    seen = 0
+    while capture.is_alive():
+        seq = detector.result_signal.wait_for(seen, timeout=0.1)
+        if seq > seen:
+            latencies[seq] = time.perf_counter() - stamps[seq]
+            seen = seq
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    detector.stop()
+    # let the worker finish its current match before the interpreter tears down
+    time.sleep(0.3)
+    return list(latencies.values()), len(latencies), cpu, wall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.1, help="capture interval in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.png")
+        _write_template(SyntheticFrameSource(), template)
+
+        print(f"capture interval {args.interval * 1000:.1f} ms, {args.seconds:.1f} s per mode")
+        print(_summary("poll", *run_poll(template, args.seconds, args.interval)))
+        print(_summary("event", *run_event(template, args.seconds, args.interval)))
+
+
+if __name__ == "__main__":
+    main()
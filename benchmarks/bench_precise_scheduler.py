@@ -0,0 +1,125 @@
+"""
+Precise scheduler: event lateness and CPU cost vs the old polling loop.
+
+Waits for --events deadlines spaced like a recorded macro (exponential gaps,
+--rate events per second) two ways:
+
+- poll:      the previous MacroPlayer wait, `time.sleep(0.0005)` until the
+             deadline has passed
+- scheduler: PreciseScheduler.wait_until (coarse sleep to --margin before
+             the deadline, then a yielding spin)
+
+Two clocks:
+- simulated: a virtual clock whose sleep() overshoots like an OS timer
+  (rounded up to --timer-ms, plus up to --overshoot-ms of random wake-up
+  delay; sleep(0) and every clock read cost --tick-us). Deterministic, so it
+  checks the scheduler never dispatches early and stays within the spin
+  granularity of every deadline whatever the timer does.
+- real: time.perf_counter / time.sleep on this machine, with CPU time
+  (process_time) per second of playback
+
+Reported: lateness p50 / p99 / max (ms), early dispatches (must be 0), and
+sleep / spin / clock-read counts or CPU share.
+
+Run from the repository root:
+    python -m benchmarks.bench_precise_scheduler --events 2000
+    python -m benchmarks.bench_precise_scheduler --timer-ms 15.6 --clocks simulated
+"""
+import argparse
+import time
+from typing import Callable, Dict
+
+import numpy as np
+
+from components.bot.precise_scheduler import PreciseScheduler
+
+
+class _SimulatedClock:
+    """Virtual time: sleep(s) wakes at the next timer tick after s plus a random delay."""
+
+    def __init__(self, timer: float, overshoot: float, tick: float, seed: int = 22) -> None:
+        self.now = 0.0
+        self.timer = timer
+        self.overshoot = overshoot
+        self.tick = tick
+        self.reads = 0
+        self.rng = np.random.default_rng(seed)
+
+    def clock(self) -> float:
+        self.reads += 1
+        self.now += self.tick
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            self.now += self.tick
+            return
+        wake = self.now + seconds
+        if self.timer > 0:
+            wake = np.ceil(wake / self.timer) * self.timer
+        self.now = wake + self.rng.uniform(0.0, self.overshoot)
+
+
+def _poll_wait(deadline: float, clock: Callable[[], float], sleep: Callable[[float], None]) -> float:
+    """The pre-scheduler MacroPlayer wait; returns the dispatch time."""
+    while clock() < deadline:
+        sleep(0.0005)
+    return clock()
+
+
+def _run(name: str, offsets: np.ndarray, clock: Callable[[], float], sleep: Callable[[float], None], margin: float) -> Dict:
+    lateness = np.empty(len(offsets))
+    scheduler = PreciseScheduler(spin_margin=margin, clock=clock, sleep=sleep)
+    cpu = time.process_time()
+    start = clock()
+    for i, offset in enumerate(offsets.tolist()):
+        if name == "poll":
+            lateness[i] = _poll_wait(start + offset, clock, sleep) - (start + offset)
+        else:
+            scheduler.wait_until(start + offset)
+    if name == "scheduler":
+        lateness = scheduler.lateness()
+    late = lateness * 1000.0
+    return {
+        "p50": float(np.percentile(late, 50)),
+        "p99": float(np.percentile(late, 99)),
+        "max": float(late.max()),
+        "early": int((late < 0).sum()),
+        "cpu": time.process_time() - cpu,
+        "stats": scheduler.stats(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=100.0, help="events per second")
+    parser.add_argument("--margin", type=float, default=0.002, help="scheduler spin margin (s)")
+    parser.add_argument("--timer-ms", type=float, default=1.0, help="simulated OS timer resolution")
+    parser.add_argument("--overshoot-ms", type=float, default=1.0, help="simulated random wake-up delay")
+    parser.add_argument("--tick-us", type=float, default=2.0, help="simulated cost of a clock read / yield")
+    parser.add_argument("--clocks", nargs="+", default=["simulated", "real"], choices=["simulated", "real"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(22)
+    offsets = np.cumsum(rng.exponential(1.0 / args.rate, size=args.events))
+    print(f"{args.events} events at {args.rate:g}/s ({offsets[-1]:.1f}s), spin margin {args.margin * 1000:g} ms")
+
+    for kind in args.clocks:
+        for name in ("poll", "scheduler"):
+            if kind == "simulated":
+                sim = _SimulatedClock(args.timer_ms / 1000.0, args.overshoot_ms / 1000.0, args.tick_us / 1e6)
+                r = _run(name, offsets, sim.clock, sim.sleep, args.margin)
+                cost = f"clock reads {sim.reads / args.events:7.1f}/event"
+            else:
+                r = _run(name, offsets, time.perf_counter, time.sleep, args.margin)
+                cost = f"CPU {100.0 * r['cpu'] / offsets[-1]:5.1f}% of playback"
+            extra = ""
+            if name == "scheduler":
+                extra = f"  sleeps {r['stats']['sleeps'] / args.events:5.2f}/event  spins {r['stats']['spins'] / args.events:7.1f}/event"
+            print(f"{kind:>9} {name:>9}: lateness p50 {r['p50']:7.3f} ms  p99 {r['p99']:7.3f}  max {r['max']:7.3f}  "
+                  f"early {r['early']}  {cost}{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Exhaustive vs coarse-to-fine (pyramid) template matching on synthetic frames.
+
+Each frame is a 1366x769 textured background with the template pasted at a
+random position plus Gaussian noise. For every mode we report the hit rate
+(best detection within --tolerance px of the true position), the mean
+localisation error of hits, and the mean time per frame.
+
+Run from the repository root:
+    python -m benchmarks.bench_pyramid_matching --frames 50 --levels 1 2 3
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import List, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.template_matcher import TemplateMatcher
+
+
+def _make_frames(
+    n: int, size: Tuple[int, int], tpl: np.ndarray, noise: float, rng: np.random.Generator
+) -> List[Tuple[np.ndarray, int, int]]:
+    w, h = size
+    th, tw = tpl.shape[:2]
+    frames = []
+    for _ in range(n):
+        bg = rng.integers(0, 255, size=(h // 8, w // 8), dtype=np.uint8)
+        frame = cv.resize(bg, (w, h), interpolation=cv.INTER_LINEAR)
+        x, y = int(rng.integers(0, w - tw)), int(rng.integers(0, h - th))
+        frame[y:y + th, x:x + tw] = tpl
+        noisy = frame.astype(np.float32) + rng.normal(0, noise, size=frame.shape)
+        frames.append((np.clip(noisy, 0, 255).astype(np.uint8), x, y))
+    return frames
+
+
+def _evaluate(matcher: TemplateMatcher, frames, tolerance: float) -> Tuple[float, float, float]:
+    hits, errors = 0, []
+    start = time.perf_counter()
+    results = [matcher.match(img) for img, _, _ in frames]
+    ms = (time.perf_counter() - start) / len(frames) * 1000.0
+
+    for dets, (_, x, y) in zip(results, frames):
+        best = dets.best()
+        if best is None:
+            continue
+        err = float(np.hypot(int(best["x"]) - x, int(best["y"]) - y))
+        if err <= tolerance:
+            hits += 1
+            errors.append(err)
+    return hits / len(frames), (float(np.mean(errors)) if errors else float("nan")), ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--template", type=int, default=32, help="template side in px")
+    parser.add_argument("--noise", type=float, default=8.0, help="Gaussian noise sigma")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--refine", type=int, default=8, help="refine window in px")
+    parser.add_argument("--candidates", type=int, default=5, help="coarse candidates refined per frame")
+    parser.add_argument("--slack", type=float, default=0.2, help="coarse threshold = threshold - slack")
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    side = args.template
+    tpl = cv.GaussianBlur(rng.integers(0, 255, size=(side, side), dtype=np.uint8), (5, 5), 0)
+    frames = _make_frames(args.frames, (1366, 769), tpl, args.noise, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "template.png")
+        cv.imwrite(path, tpl)
+
+        print(f"{args.frames} frames 1366x769, template {side}x{side}, noise sigma {args.noise}")
+        modes = [("exhaustive", 0)] + [(f"pyramid L={lv}", lv) for lv in args.levels]
+        for name, levels in modes:
+            matcher = TemplateMatcher(
+                name="bench",
+                template_path=path,
+                threshold=0.8,
+                pyramid_levels=levels,
+                refine_window=args.refine,
+                pyramid_candidates=args.candidates,
+                pyramid_slack=args.slack,
+            )
+            hit_rate, err, ms = _evaluate(matcher, frames, args.tolerance)
+            print(f"{name:>14}: hit rate {hit_rate * 100:6.1f}%  mean err {err:4.2f}px  {ms:7.2f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
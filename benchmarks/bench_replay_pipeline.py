@@ -0,0 +1,153 @@
+"""
+Replay pipeline: the vision stages driven by ReplayFrameSource + ReplayRunner.
+
+A synthetic session (the bench_change_gating scene: static map, menu, loading
+screen and moving phases) is recorded at --fps with SessionRecorder, then
+replayed through a VisionPreprocessor ("rune_arrows" region) and a
+MultiTemplateDetector (rune + player in the "minimap" region), each on its
+own thread as in RunTasks, with a consumer step that extracts the arrow
+boxes of every new mask.
+
+Reported per source kind (session directory, image folder, video file) and
+mode:
+- lockstep: every stage sees every frame, as fast as the pipeline allows
+  (the speed-up over the recorded frame rate is the offline headroom)
+- realtime: frames on the original timeline (x --speed), like live capture
+Throughput (fps), frames dropped, and per-stage latency from ring write to
+the stage publishing the frame (mean / p50 / p95 / max ms, timeouts).
+
+Run from the repository root:
+    python -m benchmarks.bench_replay_pipeline --phase 60 --fps 30
+    python -m benchmarks.bench_replay_pipeline --kinds session --speed 4
+"""
+import argparse
+import os
+import tempfile
+from typing import Dict, List
+
+import cv2 as cv
+import numpy as np
+
+from benchmarks.bench_change_gating import PHASES, _Scene, _write_templates
+from components.vision.frame_source import SyntheticFrameSource
+from components.vision.multi_template_detector import MultiTemplateDetector
+from components.vision.region_registry import RegionRegistry
+from components.vision.replay_runner import ReplayRunner
+from components.vision.replay_source import ReplayFrameSource
+from components.vision.session_recorder import SessionRecorder
+from components.vision.vision_preprocessor import VisionPreprocessor
+from configs import constants
+
+KINDS = ("session", "images", "video")
+
+
+def _record(scene: _Scene, size, frames: int, fps: float, directory: str) -> None:
+    """Record `frames` scene frames with timestamps `fps` apart (no real waiting)."""
+    source = SyntheticFrameSource(size=size, generator=scene, detect_changes=False)
+    recorder = SessionRecorder(codec="raw", queue_size=frames + 1)
+    recorder.start(directory)
+    canvas = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    for index in range(frames):
+        scene(index, canvas)
+        recorder.submit(canvas, index + 1, index / fps)
+    recorder.stop()
+
+
+def _export(session_dir: str, images_dir: str, video_path: str, fps: float) -> None:
+    """Write the session's frames as a PNG folder and an MJPG video."""
+    source = ReplayFrameSource(session_dir, detect_changes=False)
+    os.makedirs(images_dir)
+    writer = None
+    index = 0
+    while True:
+        img = source._read()
+        if img is None:
+            break
+        cv.imwrite(os.path.join(images_dir, f"{index:06d}.png"), img)
+        if writer is None:
+            writer = cv.VideoWriter(video_path, cv.VideoWriter_fourcc(*"MJPG"), fps, (img.shape[1], img.shape[0]))
+        writer.write(np.ascontiguousarray(img))
+        source.index += 1
+        index += 1
+    if writer is not None:
+        writer.release()
+
+
+def _replay(path: str, templates: List[Dict], regions: RegionRegistry, realtime: bool, speed: float, fps: float) -> Dict:
+    source = ReplayFrameSource(path, fps=fps)
+    p = VisionPreprocessor()
+    p.bind_region(regions, "rune_arrows")
+    p.attach(source.ring)
+    detector = MultiTemplateDetector(templates, regions=regions)
+    detector.attach(source.ring)
+    p.start()
+    detector.start()
+
+    arrows: Dict[str, int] = {"masks": 0, "boxes": 0}
+
+    def step(frame) -> None:
+        mask = p.get_mask()
+        if mask is None:
+            return
+        try:
+            boxes, _ = p.extract_arrows(mask.image)
+            arrows["masks"] += 1
+            arrows["boxes"] += len(boxes)
+        finally:
+            mask.release()
+
+    try:
+        runner = ReplayRunner(
+            source,
+            {"preprocessor": p.done_signal, "detector": detector.result_signal},
+            on_frame=step,
+            realtime=realtime,
+            speed=speed,
+        )
+        report = runner.run()
+    finally:
+        p.stop()
+        detector.stop()
+    report["arrows"] = arrows
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phase", type=int, default=60, help="frames per phase")
+    parser.add_argument("--fps", type=float, default=30.0, help="recorded frame rate")
+    parser.add_argument("--speed", type=float, default=1.0, help="realtime replay speed factor")
+    parser.add_argument("--width", type=int, default=1366)
+    parser.add_argument("--height", type=int, default=769)
+    parser.add_argument("--kinds", nargs="+", default=list(KINDS), choices=KINDS)
+    parser.add_argument("--modes", nargs="+", default=["lockstep", "realtime"], choices=["lockstep", "realtime"])
+    args = parser.parse_args()
+
+    size = (args.width, args.height)
+    frames = args.phase * len(PHASES)
+    scene = _Scene(args.width, args.height, args.phase, 0)
+    regions = RegionRegistry.from_yaml(constants.REGION_CONFIG_PATH)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        templates = _write_templates(scene, size, tmp)
+        paths = {
+            "session": os.path.join(tmp, "session"),
+            "images": os.path.join(tmp, "images"),
+            "video": os.path.join(tmp, "replay.avi"),
+        }
+        _record(scene, size, frames, args.fps, paths["session"])
+        if set(args.kinds) - {"session"}:
+            _export(paths["session"], paths["images"], paths["video"], args.fps)
+
+        print(f"{frames} frames {args.width}x{args.height} recorded at {args.fps:g} fps "
+              f"({frames / args.fps:.1f}s of capture)")
+        for kind in args.kinds:
+            for mode in args.modes:
+                report = _replay(paths[kind], templates, regions, mode == "realtime", args.speed, args.fps)
+                print(f"[{kind}] {ReplayRunner.format_report(report)}")
+                print(f"  {'':>12}  x{report['fps'] / args.fps:.1f} recorded rate, "
+                      f"{report['arrows']['masks']} masks / {report['arrows']['boxes']} arrow boxes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Session recorder: capture-thread cost, write throughput and replay speed per codec.
+
+Frames come from a SyntheticFrameSource drawing the bench_change_gating scene
+(static map, menu, loading screen and moving phases) at --width x --height;
+the capture loop writes them into its FrameRing at --fps (0 = as fast as
+possible) with a SessionRecorder attached, and records detector-shaped
+results for every frame.
+
+Reported per codec:
+- capture: FrameRing.write() cost per frame (mean / p99 ms) with the recorder
+  attached vs without (the recorder's share is its one copy into the pool)
+- dropped frames (writer behind, pool exhausted) and peak queue depth
+- writer cost per frame (ms), stored size and compression ratio
+- replay: sequential and random SessionReader.read() cost (ms / frame),
+  whether raw reads are views of the chunk mapping, and that every frame
+  read back equals the frame captured
+
+Run from the repository root:
+    python -m benchmarks.bench_session_recorder --frames 300 --fps 60
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.bench_change_gating import _Scene
+from components.vision.detections import Detections
+from components.vision.frame_source import SyntheticFrameSource
+from components.vision.session_reader import SessionReader
+from components.vision.session_recorder import CODECS, SessionRecorder
+
+
+def _capture(source: SyntheticFrameSource, frames: int, fps: float, recorder=None) -> Dict[int, np.ndarray]:
+    """Capture `frames` frames; returns per-frame write() costs and (if recording) the captured frames by seq."""
+    canvas = np.empty((source.h, source.w, 3), dtype=np.uint8)
+    costs: List[float] = []
+    captured: Dict[int, np.ndarray] = {}
+    interval = 1.0 / fps if fps > 0 else 0.0
+    next_at = time.perf_counter()
+    for index in range(frames):
+        source.generator(index, canvas)
+        start = time.perf_counter()
+        seq = source.ring.write(canvas)
+        costs.append(time.perf_counter() - start)
+        if recorder is not None:
+            captured[seq] = canvas.copy()
+            dets = Detections.from_boxes(np.array([[index % 300, 100, 21, 21]]), np.array([0.97]), seq)
+            recorder.record_detections("detector", seq, {"player": dets, "rune": Detections.empty()})
+        if interval:
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    return {"costs": np.array(costs) * 1000.0, "captured": captured}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=60.0, help="capture rate (0 = as fast as possible)")
+    parser.add_argument("--width", type=int, default=1366)
+    parser.add_argument("--height", type=int, default=769)
+    parser.add_argument("--noise", type=int, default=0, help="capture noise amplitude in gray levels")
+    parser.add_argument("--queue", type=int, default=32, help="recorder queue / buffer pool size")
+    parser.add_argument("--codecs", nargs="+", default=list(CODECS), choices=CODECS)
+    args = parser.parse_args()
+
+    size = (args.width, args.height)
+    scene = _Scene(args.width, args.height, max(1, args.frames // 4), args.noise)
+    baseline = _capture(SyntheticFrameSource(size=size, generator=scene, detect_changes=False), args.frames, args.fps)
+    b = baseline["costs"]
+    print(f"{args.frames} frames {args.width}x{args.height} at {args.fps:g} fps")
+    print(f"{'no recorder':>11}: write {b.mean():6.3f} ms (p99 {np.percentile(b, 99):6.3f})")
+
+    rng = np.random.default_rng(19)
+    for codec in args.codecs:
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, "session")
+            source = SyntheticFrameSource(size=size, generator=scene, detect_changes=False)
+            recorder = SessionRecorder(codec=codec, queue_size=args.queue)
+            recorder.start(directory)
+            recorder.attach(source.ring)
+            run = _capture(source, args.frames, args.fps, recorder)
+            recorder.detach()
+            recorder.stop()
+            s = recorder.stats()
+
+            reader = SessionReader(directory)
+            start = time.perf_counter()
+            for i in range(len(reader)):
+                reader.read(i)
+            sequential = 1000.0 * (time.perf_counter() - start) / max(1, len(reader))
+
+            order = rng.permutation(len(reader))
+            start = time.perf_counter()
+            for i in order:
+                reader.read(int(i))
+            random_ms = 1000.0 * (time.perf_counter() - start) / max(1, len(reader))
+
+            exact = all(
+                np.array_equal(reader.read(i), run["captured"][int(reader.records[i]["seq"])]) for i in range(len(reader))
+            )
+            view = len(reader) > 0 and isinstance(reader.read(0).base, np.memmap)
+            reader.close()
+
+            c = run["costs"]
+            print(
+                f"{codec:>11}: write {c.mean():6.3f} ms (p99 {np.percentile(c, 99):6.3f})  "
+                f"dropped {s['dropped']:3d}  queue peak {s['queue_peak']:2d}  "
+                f"writer {s['write_ms']:6.2f} ms/frame  {s['stored_mb']:8.1f} MB (x{s['ratio']:.1f})  "
+                f"replay seq {sequential:6.3f} / random {random_ms:6.3f} ms  "
+                f"view {'yes' if view else 'no '}  exact {'yes' if exact else 'NO'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
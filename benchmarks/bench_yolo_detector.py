@@ -0,0 +1,325 @@
+"""
+CPU latency of the YOLO detector: Junk_Remove's ImageProcessor vs YoloDetector.
+
+A tiny two-head Darknet model (yolov4-tiny layout: 13x13 and 26x26 heads at
+416, 3 anchors each, --classes classes) is generated locally with random
+weights into a temporary directory, so no trained model is needed. Frames are
+--width x --height BGR images with a few bright shapes.
+
+- legacy:  blobFromImage at a fixed 416x416 (new blob per frame), np.vstack of
+           the head outputs, per-row Python loop (argmax, scale, list appends)
+           and class-agnostic cv.dnn.NMSBoxes
+- yolo:    YoloDetector.detect() at --sizes (resize into a reused blob,
+           vectorized score filter / decode / class-wise NMS)
+
+Reported per stage: blob, forward and post-processing mean ms. Post-processing
+alone is also timed on stub head outputs with --candidates rows above the
+score threshold, and the decoded boxes are checked against the legacy loop.
+
+Run from the repository root:
+    python -m benchmarks.bench_yolo_detector --frames 200 --sizes 416 320 256
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.postprocess import decode_yolo, nms_boxes_batched
+from components.vision.yolo_detector import YoloDetector
+
+
+_ANCHORS = "10,14, 23,27, 37,58, 81,82, 135,169, 344,319"
+
+
+def _write_tiny_yolo(
+    directory: str, classes: int, rng: np.random.Generator, head_bias: float = -0.5, head_gain: float = 0.3
+) -> Tuple[str, str]:
+    """
+    Darknet cfg + random weights for a minimal two-head YOLO; returns (cfg, weights) paths.
+    The heads get negative biases (`head_bias`) and damped weights (`head_gain`), so only
+    a few boxes per frame pass the score threshold.
+    """
+    head = 3 * (5 + classes)
+    # (input channels, filters, size, batch_normalize) of every convolutional layer in cfg order;
+    # the second head routes back to layer 3 (64 channels, stride 16)
+    convs = [(3, 16, 3, 1), (16, 32, 3, 1), (32, 64, 3, 1), (64, 64, 3, 1), (64, 128, 3, 1), (128, head, 1, 0), (64, head, 1, 0)]
+    cfg = f"""[net]
+width=416
+height=416
+channels=3
+
+[convolutional]
+batch_normalize=1
+filters=16
+size=3
+stride=2
+pad=1
+activation=leaky
+
+[convolutional]
+batch_normalize=1
+filters=32
+size=3
+stride=2
+pad=1
+activation=leaky
+
+[convolutional]
+batch_normalize=1
+filters=64
+size=3
+stride=2
+pad=1
+activation=leaky
+
+[convolutional]
+batch_normalize=1
+filters=64
+size=3
+stride=2
+pad=1
+activation=leaky
+
+[convolutional]
+batch_normalize=1
+filters=128
+size=3
+stride=2
+pad=1
+activation=leaky
+
+[convolutional]
+size=1
+stride=1
+pad=1
+filters={head}
+activation=linear
+
+[yolo]
+mask=3,4,5
+anchors={_ANCHORS}
+classes={classes}
+num=6
+
+[route]
+layers=3
+
+[convolutional]
+size=1
+stride=1
+pad=1
+filters={head}
+activation=linear
+
+[yolo]
+mask=0,1,2
+anchors={_ANCHORS}
+classes={classes}
+num=6
+"""
+    cfg_path = os.path.join(directory, "tiny.cfg")
+    weights_path = os.path.join(directory, "tiny.weights")
+    with open(cfg_path, "w") as file:
+        file.write(cfg)
+
+    parts = [np.array([0, 2, 0], dtype=np.int32).tobytes(), np.array([0], dtype=np.uint64).tobytes()]
+    for channels, filters, size, bn in convs:
+        parts.append(rng.normal(head_bias if filters == head else 0.0, 0.3, filters).astype(np.float32).tobytes())  # biases
+        if bn:
+            parts.append(np.ones(filters, dtype=np.float32).tobytes())              # scales
+            parts.append(np.zeros(filters, dtype=np.float32).tobytes())             # rolling mean
+            parts.append(np.ones(filters, dtype=np.float32).tobytes())              # rolling variance
+        std = np.sqrt(2.0 / (channels * size * size)) * (head_gain if filters == head else 1.0)
+        parts.append(rng.normal(0.0, std, filters * channels * size * size).astype(np.float32).tobytes())
+    with open(weights_path, "wb") as file:
+        file.write(b"".join(parts))
+    return cfg_path, weights_path
+
+
+def _legacy_detect(net, out_names: List[str], img: np.ndarray, conf: float) -> Tuple[Dict[str, float], list]:
+    """ImageProcessor.process_image minus the color preprocess, with per-stage timing."""
+    t0 = time.perf_counter()
+    blob = cv.dnn.blobFromImage(img, 1 / 255.0, (416, 416), swapRB=True, crop=False)
+    t1 = time.perf_counter()
+    net.setInput(blob)
+    outputs = np.vstack(net.forward(out_names))
+    t2 = time.perf_counter()
+    coordinates = _legacy_get_coordinates(outputs, conf, img.shape[1], img.shape[0])
+    t3 = time.perf_counter()
+    return {"blob": t1 - t0, "forward": t2 - t1, "post": t3 - t2, "kept": len(coordinates)}, coordinates
+
+
+def _legacy_get_coordinates(outputs: np.ndarray, conf: float, W: int, H: int, nms: bool = True):
+    boxes, confidences, classIDs = [], [], []
+    for output in outputs:
+        scores = output[5:]
+        classID = np.argmax(scores)
+        confidence = scores[classID]
+        if confidence > conf:
+            x, y, w, h = output[:4] * np.array([W, H, W, H])
+            p0 = int(x - w // 2), int(y - h // 2)
+            boxes.append([*p0, int(w), int(h)])
+            confidences.append(float(confidence))
+            classIDs.append(classID)
+    if not nms:
+        return boxes, confidences, classIDs
+
+    indices = cv.dnn.NMSBoxes(boxes, confidences, conf, conf - 0.1)
+    if len(indices) == 0:
+        return []
+    return [
+        {"x": boxes[i][0], "y": boxes[i][1], "w": boxes[i][2], "h": boxes[i][3], "class": classIDs[i]}
+        for i in np.asarray(indices).flatten()
+    ]
+
+
+def _yolo_detect(detector: YoloDetector, img: np.ndarray) -> Dict[str, float]:
+    """YoloDetector.detect() split into the same stages."""
+    t0 = time.perf_counter()
+    blob = detector._fill_blob(img)
+    t1 = time.perf_counter()
+    detector.net.setInput(blob)
+    outputs = detector.net.forward(detector.out_names)
+    t2 = time.perf_counter()
+    boxes, scores, class_ids = decode_yolo(outputs, detector.score_threshold, img.shape[1], img.shape[0])
+    keep = nms_boxes_batched(boxes, scores, class_ids, detector.nms_iou)
+    t3 = time.perf_counter()
+    return {"blob": t1 - t0, "forward": t2 - t1, "post": t3 - t2, "candidates": len(boxes), "kept": len(keep)}
+
+
+def _make_frames(n: int, width: int, height: int, rng: np.random.Generator) -> List[np.ndarray]:
+    frames = []
+    for _ in range(n):
+        img = rng.integers(0, 60, size=(height, width, 3), dtype=np.uint8)
+        for _ in range(6):
+            center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+            color = tuple(int(c) for c in rng.integers(100, 256, 3))
+            cv.circle(img, center, int(rng.integers(10, 60)), color, -1)
+        frames.append(img)
+    return frames
+
+
+def _stub_outputs(rng: np.random.Generator, classes: int, size: int, candidates: int, threshold: float) -> List[np.ndarray]:
+    """Head outputs shaped like the tiny model's at `size`, `candidates` rows above threshold in clusters."""
+    outputs = []
+    for grid in (size // 32, size // 16):
+        rows = grid * grid * 3
+        out = np.zeros((rows, 5 + classes), dtype=np.float32)
+        out[:, :2] = rng.random((rows, 2))
+        out[:, 2:4] = rng.uniform(0.02, 0.2, (rows, 2))
+        out[:, 5:] = rng.uniform(0.0, threshold * 0.9, (rows, classes))
+        outputs.append(out)
+    for k in range(candidates):
+        out = outputs[k % 2]
+        row = int(rng.integers(0, len(out)))
+        cluster = k // 4
+        out[row, :2] = (cluster * 0.137) % 1.0 + rng.normal(0.0, 0.005, 2)
+        out[row, 2:4] = 0.08
+        out[row, 5 + cluster % classes] = rng.uniform(threshold + 0.05, 1.0)
+    return outputs
+
+
+def _summary(name: str, stages: List[Dict[str, float]]) -> str:
+    mean = {k: np.mean([s[k] for s in stages]) * 1000.0 for k in ("blob", "forward", "post")}
+    total = sum(mean.values())
+    kept = np.mean([s["kept"] for s in stages])
+    return (
+        f"{name:>12}: blob {mean['blob']:6.3f}  forward {mean['forward']:7.3f}  "
+        f"post {mean['post']:6.3f}  total {total:7.3f} ms  ({kept:.1f} boxes/frame)"
+    )
+
+
+def _run_model(args, frames: List[np.ndarray], legacy_net, cfg: str, weights: str) -> None:
+    names = [f"class{i}" for i in range(args.classes)]
+    legacy_net.setPreferableBackend(cv.dnn.DNN_BACKEND_OPENCV)
+    layer_names = legacy_net.getLayerNames()
+    legacy_out = [layer_names[i - 1] for i in np.asarray(legacy_net.getUnconnectedOutLayers()).flatten()]
+
+    print(f"{args.frames} frames {args.width}x{args.height}, tiny 2-head YOLO, {args.classes} classes, "
+          f"{cv.getNumThreads()} OpenCV threads")
+    for img in frames[:5]:
+        _legacy_detect(legacy_net, legacy_out, img, args.threshold)
+    print(_summary("legacy 416", [_legacy_detect(legacy_net, legacy_out, img, args.threshold)[0] for img in frames]))
+
+    for size in args.sizes:
+        detector = YoloDetector(weights, cfg, class_names=names, input_size=(size, size),
+                                score_threshold=args.threshold, nms_iou=args.threshold - 0.1)
+        for img in frames[:5]:
+            detector.detect(img)
+        print(_summary(f"yolo {size}", [_yolo_detect(detector, img) for img in frames]))
+
+    # blob equivalence with cv.dnn.blobFromImage at 416
+    detector = YoloDetector(weights, cfg, class_names=names, input_size=(416, 416))
+    reference = cv.dnn.blobFromImage(frames[0], 1 / 255.0, (416, 416), swapRB=True, crop=False)
+    print(f"blob max abs diff vs blobFromImage: {np.abs(detector._fill_blob(frames[0]) - reference).max():.2e}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1366)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--classes", type=int, default=6)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[416, 320, 256])
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--candidates", type=int, default=60, help="rows above threshold in the stub outputs")
+    parser.add_argument("--stub-runs", type=int, default=500)
+    args = parser.parse_args()
+
+    cv.setNumThreads(max(1, cv.getNumberOfCPUs()))
+    rng = np.random.default_rng(16)
+    frames = _make_frames(args.frames, args.width, args.height, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg, weights = _write_tiny_yolo(tmp, args.classes, rng)
+        try:
+            legacy_net = cv.dnn.readNet(weights, cfg)
+        except cv.error:
+            # OpenCV 5 dropped the Darknet importer; only the stub section can run
+            print(f"OpenCV {cv.__version__} cannot load Darknet models (needs opencv-python<5, as pinned "
+                  f"in requirements.txt), skipping the end-to-end section")
+        else:
+            _run_model(args, frames, legacy_net, cfg, weights)
+
+    # post-processing alone on stub outputs (controlled candidate count)
+    outputs = _stub_outputs(rng, args.classes, 416, args.candidates, args.threshold)
+    stacked = np.vstack(outputs)
+    legacy_boxes, legacy_scores, legacy_ids = _legacy_get_coordinates(stacked, args.threshold, args.width, args.height, nms=False)
+    boxes, scores, class_ids = decode_yolo(outputs, args.threshold, args.width, args.height)
+    exact = (
+        np.array_equal(np.asarray(legacy_boxes, dtype=np.int32).reshape(-1, 4), boxes)
+        and np.array_equal(np.asarray(legacy_ids), class_ids)
+        and np.allclose(legacy_scores, scores)
+    )
+
+    def legacy_post():
+        _legacy_get_coordinates(np.vstack(outputs), args.threshold, args.width, args.height)
+
+    def vector_post():
+        b, s, c = decode_yolo(outputs, args.threshold, args.width, args.height)
+        nms_boxes_batched(b, s, c, args.threshold - 0.1)
+
+    print(f"stub post-processing: {len(stacked)} rows, {len(boxes)} above threshold, decode identical to legacy: {exact}")
+    for name, fn in (("legacy loop", legacy_post), ("vectorized", vector_post)):
+        for _ in range(10):
+            fn()
+        times = []
+        for _ in range(args.stub_runs):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        ms = np.asarray(times) * 1000.0
+        print(f"{name:>12}: mean {ms.mean():6.3f} ms  p95 {np.percentile(ms, 95):6.3f} ms")
+
+    keep = nms_boxes_batched(boxes, scores, class_ids, args.threshold - 0.1)
+    reference = np.asarray(cv.dnn.NMSBoxesBatched(boxes.tolist(), scores.tolist(), class_ids.tolist(),
+                                                  args.threshold, args.threshold - 0.1)).flatten()
+    print(f"class-wise NMS kept {len(keep)}; same set as cv.dnn.NMSBoxesBatched: {set(keep.tolist()) == set(reference.tolist())}")
+
+
+if __name__ == "__main__":
+    main()
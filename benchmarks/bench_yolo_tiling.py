@@ -0,0 +1,246 @@
+"""
+Tiled, change-driven YOLO inference vs whole-window and all-tiles inference.
+
+Frames come from a SyntheticFrameSource: a static dark textured map (--width x
+--height) with --mobs sprites walking along a band of the screen, optional +-(--noise)
+gray levels of capture noise, and a new map every --scene-every frames.
+
+Network (--net):
+- darknet: the tiny random-weight Darknet model from bench_yolo_detector,
+           generated locally (OpenCV 4.x only: OpenCV 5 has no Darknet importer)
+- stub:    a cv.dnn.Net stand-in computing Darknet-style head outputs from
+           the input blob (cells with bright pixels fire), so detections
+           follow the frame content; --stub-forward-ms adds an assumed fixed
+           cost per forward pass (default 0: overhead only)
+- auto:    darknet when the build can load it, else stub
+Either way the net is timed, so change detection, tile bookkeeping, decode
+and merge/NMS (everything but the forward pass) are measured on any build.
+
+- window:   YoloDetector on the whole window, squeezed into one 416x416 input
+- tiles:    416x416 tiles, every tile inferred every frame
+- changed:  416x416 tiles, only tiles whose thumbnail changed are inferred
+
+Reported per mode: frame cost mean / p95 (ms), of which forward pass and
+the rest, tiles inferred per frame, reuse ratio and change-detection cost
+(from inference_stats(); `changed` runs first on each frame and pays for
+the shared thumbnail). Accuracy: the
+share of `tiles` detections that `changed` reproduces on the same frame
+(same class, IoU >= 0.5); anything below 100% is a stale cached tile.
+
+Run from the repository root:
+    python -m benchmarks.bench_yolo_tiling --frames 300 --mobs 4
+    python -m benchmarks.bench_yolo_tiling --net stub --stub-forward-ms 15
+"""
+import argparse
+import tempfile
+import time
+from typing import Any, List, Mapping, Sequence
+
+import cv2 as cv
+import numpy as np
+
+from benchmarks.bench_yolo_detector import _write_tiny_yolo
+from components.vision.detections import Detections
+from components.vision.frame_source import SyntheticFrameSource
+from components.vision.yolo_detector import YoloDetector
+
+
+class _Scene:
+    """Generator for SyntheticFrameSource: static map, walking mobs, periodic map changes."""
+
+    def __init__(self, width: int, height: int, args) -> None:
+        self.rng = np.random.default_rng(17)
+        self.width, self.height = width, height
+        self.scene_every = args.scene_every
+        self.mobs = [
+            (int(self.rng.integers(0, width)), int(self.rng.uniform(0.55, 0.75) * height), int(self.rng.choice([-6, 6])))
+            for _ in range(args.mobs)
+        ]
+        self.noise = self.rng.integers(-args.noise, args.noise + 1, size=(8, height, width, 1), dtype=np.int16)
+        self.background = self._map()
+
+    def _map(self) -> np.ndarray:
+        # dark, low-contrast terrain: the random-weight model fires on bright blobs (the mobs)
+        texture = self.rng.integers(0, 60, size=(self.height // 16, self.width // 16, 3), dtype=np.uint8)
+        return cv.resize(texture, (self.width, self.height), interpolation=cv.INTER_CUBIC)
+
+    def __call__(self, index: int, out: np.ndarray) -> None:
+        if index and self.scene_every and index % self.scene_every == 0:
+            self.background = self._map()
+        noisy = self.background.astype(np.int16) + self.noise[index % len(self.noise)]
+        np.clip(noisy, 0, 255, out=noisy)
+        out[:] = noisy
+        for x0, y, dx in self.mobs:
+            x = (x0 + dx * index) % self.width
+            cv.circle(out, (x, y), 22, (40, 220, 250), -1)
+            cv.rectangle(out, (x - 12, y - 40), (x + 12, y - 20), (30, 30, 200), -1)
+
+
+class _StubNet:
+    """
+    cv.dnn.Net stand-in: two Darknet-style heads (stride 32 and 16) whose
+    objectness and class score is the share of bright pixels (> 0.5) in
+    each cell, class = the cell's dominant channel. `forward_ms` spins for
+    an assumed network cost on top.
+    """
+
+    def __init__(self, classes: int, forward_ms: float = 0.0) -> None:
+        self.classes = classes
+        self.forward_ms = forward_ms
+        self._blob = None
+
+    def getUnconnectedOutLayersNames(self) -> Sequence[str]:
+        return ("yolo_stride32", "yolo_stride16")
+
+    def setInput(self, blob: np.ndarray) -> None:
+        self._blob = blob
+
+    def forward(self, names: Sequence[str]) -> List[np.ndarray]:
+        start = time.perf_counter()
+        planes = self._blob[0]
+        _, h, w = planes.shape
+        bright = (planes.max(axis=0) > 0.5).astype(np.float32)
+        outputs = []
+        for stride in (32, 16):
+            gh, gw = h // stride, w // stride
+            score = bright[:gh * stride, :gw * stride].reshape(gh, stride, gw, stride).mean(axis=(1, 3))
+            channel = planes[:, :gh * stride, :gw * stride].reshape(3, gh, stride, gw, stride).mean(axis=(2, 4))
+            ys, xs = np.mgrid[0:gh, 0:gw]
+            out = np.zeros((gh * gw, 5 + self.classes), dtype=np.float32)
+            out[:, 0] = ((xs + 0.5) / gw).ravel()
+            out[:, 1] = ((ys + 0.5) / gh).ravel()
+            out[:, 2] = 1.5 / gw
+            out[:, 3] = 1.5 / gh
+            out[:, 4] = score.ravel()
+            out[np.arange(gh * gw), 5 + channel.argmax(axis=0).ravel() % self.classes] = score.ravel()
+            outputs.append(out)
+        while time.perf_counter() - start < self.forward_ms / 1000.0:
+            pass
+        return outputs
+
+
+class _TimedNet:
+    """Delegates to a net and accumulates the time spent in forward()."""
+
+    def __init__(self, net: Any) -> None:
+        self.net = net
+        self.forward_time = 0.0
+
+    def getUnconnectedOutLayersNames(self) -> Sequence[str]:
+        return self.net.getUnconnectedOutLayersNames()
+
+    def setInput(self, blob: np.ndarray) -> None:
+        self.net.setInput(blob)
+
+    def forward(self, names: Sequence[str]) -> List[np.ndarray]:
+        start = time.perf_counter()
+        try:
+            return self.net.forward(names)
+        finally:
+            self.forward_time += time.perf_counter() - start
+
+
+def _darknet_loads(weights: str, cfg: str) -> bool:
+    try:
+        cv.dnn.readNet(weights, cfg)
+        return True
+    except cv.error:
+        return False
+
+
+def _agreement(reference: Mapping[str, Detections], candidate: Mapping[str, Detections]) -> float:
+    """Share of reference boxes matched by a candidate box of the same class with IoU >= 0.5."""
+    total, matched = 0, 0
+    for name, ref in reference.items():
+        if not ref:
+            continue
+        total += len(ref)
+        cand = candidate.get(name)
+        if not cand:
+            continue
+        a, b = ref.boxes().astype(np.float32), cand.boxes().astype(np.float32)
+        iw = np.clip(np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2])
+                     - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+        ih = np.clip(np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3])
+                     - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+        inter = iw * ih
+        with np.errstate(invalid="ignore", divide="ignore"):
+            iou = inter / (a[:, None, 2] * a[:, None, 3] + b[None, :, 2] * b[None, :, 3] - inter)
+        # the random model also emits zero-area boxes; those only match exactly
+        hit = (iou >= 0.5) | (a[:, None, :] == b[None, :, :]).all(axis=2)
+        matched += int(hit.any(axis=1).sum())
+    return matched / total if total else 1.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1366)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--mobs", type=int, default=4)
+    parser.add_argument("--scene-every", type=int, default=150, help="new map every N frames (0 = never)")
+    parser.add_argument("--noise", type=int, default=0, help="capture noise amplitude in gray levels")
+    parser.add_argument("--classes", type=int, default=6)
+    parser.add_argument("--tile", type=int, default=416)
+    parser.add_argument("--change-threshold", type=float, default=0.002)
+    parser.add_argument("--net", default="auto", choices=["auto", "darknet", "stub"])
+    parser.add_argument("--stub-forward-ms", type=float, default=0.0, help="assumed cost per stub forward pass")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg, weights = _write_tiny_yolo(tmp, args.classes, np.random.default_rng(16), head_bias=-3.0, head_gain=2.0)
+        kind = args.net
+        if kind == "auto":
+            kind = "darknet" if _darknet_loads(weights, cfg) else "stub"
+        if kind == "darknet" and not _darknet_loads(weights, cfg):
+            print(f"OpenCV {cv.__version__} cannot load Darknet models (needs opencv-python<5); use --net stub")
+            return
+
+        def make_net() -> _TimedNet:
+            if kind == "stub":
+                return _TimedNet(_StubNet(args.classes, args.stub_forward_ms))
+            net = cv.dnn.readNet(weights, cfg)
+            net.setPreferableBackend(cv.dnn.DNN_BACKEND_OPENCV)
+            net.setPreferableTarget(cv.dnn.DNN_TARGET_CPU)
+            return _TimedNet(net)
+
+        names = [f"class{i}" for i in range(args.classes)]
+        common = dict(class_names=names, input_size=(416, 416))
+        tile = (args.tile, args.tile)
+        nets = {name: make_net() for name in ("changed", "tiles", "window")}
+        modes = {
+            "changed": YoloDetector(weights, cfg, tile_size=tile, change_threshold=args.change_threshold,
+                                    net=nets["changed"], **common),
+            "tiles": YoloDetector(weights, cfg, tile_size=tile, change_threshold=-1.0, net=nets["tiles"], **common),
+            "window": YoloDetector(weights, cfg, net=nets["window"], **common),
+        }
+
+        source = SyntheticFrameSource(size=(args.width, args.height), generator=_Scene(args.width, args.height, args))
+        agreements: List[float] = []
+        for _ in range(args.frames):
+            source.capture_once()
+            frame = source.ring.latest()
+            try:
+                results = {
+                    name: detector.detect(frame.image, frame.seq, frame.derived) for name, detector in modes.items()
+                }
+            finally:
+                frame.release()
+            agreements.append(_agreement(results["tiles"], results["changed"]))
+
+    net_name = "darknet" if kind == "darknet" else f"stub (forward +{args.stub_forward_ms:g} ms)"
+    print(f"{args.frames} frames {args.width}x{args.height}, {args.mobs} mobs, new map every {args.scene_every} frames, "
+          f"{len(modes['tiles'].tiles)} tiles of {args.tile}x{args.tile}, net {net_name}")
+    for name in ("window", "tiles", "changed"):
+        s = modes[name].inference_stats()
+        forward_ms = 1000.0 * nets[name].forward_time / max(1, s["frames"])
+        print(
+            f"{name:>8}: {s['frame_ms']:7.2f} ms/frame (p95 {s['frame_ms_p95']:7.2f}; forward {forward_ms:7.2f}, "
+            f"rest {s['frame_ms'] - forward_ms:6.3f})  tiles inferred {s['tiles_inferred_per_frame']:4.2f}/{s['tiles_per_frame']:.0f}  "
+            f"reuse {s['reuse_ratio'] * 100:5.1f}%  change detection {s['change_ms']:.3f} ms"
+        )
+    print(f"changed vs tiles: {np.mean(agreements) * 100:.1f}% of detections reproduced (worst frame {np.min(agreements) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Macro files: YAML (MacroRecorder's original format) or a compact binary
+format, chosen by extension.
+
+Binary layout (little-endian):
+    MACRO_MAGIC                 8 bytes
+    MACRO_HEADER_DTYPE          version, header_bytes, count, records_offset
+    header JSON                 {"meta": {...}, "keys": [key names]} (utf-8)
+    zero padding                up to records_offset (8-byte aligned)
+    MACRO_RECORD_DTYPE * count  packed (time, key_id, type) records
+
+read_macro() memory-maps the records, so loading a binary macro costs the
+header parse and one vectorized validation pass over the records (key ids
+within the key table, known event types, finite times: a bad file fails at
+load, not in the middle of playback with keys held); the timeline's arrays
+are views of the mapping.
+
+Convert between formats from the repository root:
+    python -m components.bot.macro_file artifacts/macros/record_x.yaml artifacts/macros/record_x.mbin
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from components.bot.macro_timeline import EVENT_TYPES, MacroTimeline
+from exception import CustomException
+from logger import logging
+from utils import read_yaml_file, write_yaml_file
+
+
+MACRO_VERSION: int = 1
+MACRO_MAGIC: bytes = b"MSMACRO\x00"
+BINARY_EXTENSIONS: Tuple[str, ...] = (".mbin",)
+YAML_EXTENSIONS: Tuple[str, ...] = (".yaml", ".yml")
+
+MACRO_HEADER_DTYPE: np.dtype = np.dtype(
+    [
+        ("version", "<u4"),
+        ("header_bytes", "<u4"),
+        ("count", "<u8"),
+        ("records_offset", "<u8"),
+    ]
+)
+
+# type is EVENT_DOWN / EVENT_UP; key_id indexes the header's "keys"
+MACRO_RECORD_DTYPE: np.dtype = np.dtype(
+    [
+        ("time", "<f8"),
+        ("key_id", "<i2"),
+        ("type", "u1"),
+    ]
+)
+
+
+def is_binary_macro(path: str) -> bool:
+    """True for binary macro extensions, False for YAML; other extensions are an error."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in BINARY_EXTENSIONS:
+        return True
+    if ext in YAML_EXTENSIONS:
+        return False
+    raise ValueError(f"Unknown macro file extension '{ext}' ({path}); use one of {BINARY_EXTENSIONS + YAML_EXTENSIONS}")
+
+
+def _records_offset(header_bytes: int) -> int:
+    start = len(MACRO_MAGIC) + MACRO_HEADER_DTYPE.itemsize + header_bytes
+    return (start + 7) // 8 * 8
+
+
+def write_binary_macro(path: str, timeline: MacroTimeline, meta: Optional[Dict[str, Any]] = None) -> None:
+    """Write `timeline` as a binary macro (atomically, via a temporary file)."""
+    try:
+        header = json.dumps({"meta": meta or {}, "keys": list(timeline.keys)}).encode("utf-8")
+        records = np.empty(len(timeline), dtype=MACRO_RECORD_DTYPE)
+        records["time"] = timeline.times
+        records["key_id"] = timeline.key_ids
+        records["type"] = timeline.down
+
+        fixed = np.zeros(1, dtype=MACRO_HEADER_DTYPE)
+        fixed["version"] = MACRO_VERSION
+        fixed["header_bytes"] = len(header)
+        fixed["count"] = len(records)
+        fixed["records_offset"] = _records_offset(len(header))
+
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as file:
+            file.write(MACRO_MAGIC)
+            file.write(fixed.tobytes())
+            file.write(header)
+            file.write(b"\x00" * (int(fixed["records_offset"][0]) - file.tell()))
+            file.write(records.tobytes())
+        os.replace(tmp, path)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def _validate_records(records: np.ndarray, key_count: int, path: str) -> None:
+    """Reject records MacroTimeline.play() could not dispatch (checked once, vectorized)."""
+    if not len(records):
+        return
+    key_ids = records["key_id"]
+    if int(key_ids.min()) < 0 or int(key_ids.max()) >= key_count:
+        raise ValueError(f"Corrupt macro file {path}: key ids outside the {key_count}-key table")
+    if int(records["type"].max()) > max(EVENT_TYPES.values()):
+        raise ValueError(f"Corrupt macro file {path}: unknown event type")
+    if not np.all(np.isfinite(records["time"])):
+        raise ValueError(f"Corrupt macro file {path}: event times must be finite numbers")
+
+
+def read_binary_macro(
+    path: str,
+    resolve: Optional[Callable[[str], Any]] = None,
+    mmap: bool = True,
+) -> Tuple[Dict[str, Any], MacroTimeline]:
+    """(meta, timeline) of a binary macro; records are memory-mapped unless `mmap` is False."""
+    try:
+        with open(path, "rb") as file:
+            magic = file.read(len(MACRO_MAGIC))
+            if magic != MACRO_MAGIC:
+                raise ValueError(f"Not a binary macro file: {path}")
+            fixed = np.frombuffer(file.read(MACRO_HEADER_DTYPE.itemsize), dtype=MACRO_HEADER_DTYPE)[0]
+            if int(fixed["version"]) != MACRO_VERSION:
+                raise ValueError(f"Unsupported macro version {int(fixed['version'])} in {path}")
+            header = json.loads(file.read(int(fixed["header_bytes"])).decode("utf-8"))
+
+        count, offset = int(fixed["count"]), int(fixed["records_offset"])
+        if os.path.getsize(path) < offset + count * MACRO_RECORD_DTYPE.itemsize:
+            raise ValueError(f"Truncated macro file: {path}")
+        if count == 0:
+            records = np.zeros(0, dtype=MACRO_RECORD_DTYPE)
+        elif mmap:
+            records = np.memmap(path, dtype=MACRO_RECORD_DTYPE, mode="r", offset=offset, shape=(count,))
+        else:
+            records = np.fromfile(path, dtype=MACRO_RECORD_DTYPE, count=count, offset=offset)
+
+        keys = header["keys"]
+        _validate_records(records, len(keys), path)
+        codes = [resolve(key) for key in keys] if resolve is not None else None
+        timeline = MacroTimeline(records["time"], records["key_id"], records["type"], keys, codes)
+        return header.get("meta", {}), timeline
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def read_macro(
+    path: str,
+    resolve: Optional[Callable[[str], Any]] = None,
+) -> Tuple[Dict[str, Any], MacroTimeline]:
+    """(meta, timeline) of a YAML or binary macro file, by extension."""
+    try:
+        if is_binary_macro(path):
+            return read_binary_macro(path, resolve)
+
+        macro = read_yaml_file(path)
+        events = macro.get("events") if isinstance(macro, dict) else None
+        if not isinstance(events, list):
+            raise ValueError(f"Invalid macro file (missing 'events'): {path}")
+        return macro.get("meta") or {}, MacroTimeline.compile(events, resolve)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def write_macro(path: str, timeline: MacroTimeline, meta: Optional[Dict[str, Any]] = None) -> None:
+    """Write a YAML or binary macro file, by extension."""
+    try:
+        if is_binary_macro(path):
+            write_binary_macro(path, timeline, meta)
+        else:
+            write_yaml_file(path, {"meta": meta or {}, "events": timeline.events()}, replace=True)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def convert_macro(src: str, dst: str) -> int:
+    """Convert between macro formats (by extension). Returns the number of events."""
+    try:
+        meta, timeline = read_macro(src)
+        write_macro(dst, timeline, meta)
+        logging.info(f"Converted macro '{src}' -> '{dst}' ({len(timeline)} events).")
+        return len(timeline)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("src", help="macro to read (.yaml / .yml / .mbin)")
+    parser.add_argument("dst", help="macro to write; the format follows the extension")
+    args = parser.parse_args()
+    count = convert_macro(args.src, args.dst)
+    print(f"{args.src} -> {args.dst}: {count} events")
+
+
+if __name__ == "__main__":
+    main()
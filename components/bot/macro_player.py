@@ -2,16 +2,19 @@ import os
 import sys
 import time
 from threading import Thread, Lock
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, Optional, Set
 
 import pydirectinput
 import win32gui   # type: ignore
 import win32con   # type: ignore
 import pywintypes # type: ignore
 
+from components.bot.macro_file import read_macro
+from components.bot.macro_timeline import MacroTimeline
+from components.bot.precise_scheduler import PreciseScheduler
 from exception import CustomException
 from logger import logging
-from utils import read_yaml_file, find_window_by_title
+from utils import find_window_by_title
 
 
 class MacroPlayer:
@@ -23,7 +26,19 @@ class MacroPlayer:
     - Class-level flags: stopped, lock, buffer_time
     - start()  -> spawn thread(target=self.run)
     - stop()   -> request playback stop via `stopped` and release all keys
-    - run()    -> playback loop (currently repeats until stopped)
+    - run()    -> playback loop (repeats until stopped)
+
+    load() reads a YAML or binary macro (see macro_file) into a MacroTimeline
+    (time array, interned keys resolved to pydirectinput key names, down/up
+    flags), so playback does no per-event parsing. Events are timed by a
+    PreciseScheduler (coarse sleep, then a short yielding spin); the jitter
+    of every pass is logged and kept in `last_jitter`.
+
+    With `seamless` (default) run() loops on one clock: pass k+1 starts
+    `loop_gap` after the last event of pass k, and at the seam only keys
+    held inconsistently (MacroTimeline.seam_releases) are released. The
+    seam's drift from the ideal timeline is logged per pass (`loop_drift`).
+    Otherwise every pass releases all keys and restarts the clock.
 
     Usage:
         player = MacroPlayer("MapleStory")
@@ -39,16 +54,37 @@ class MacroPlayer:
     window_name: str
     hwnd: Optional[int] = None
 
+    # the macro file's meta
     macro: Optional[Dict[str, Any]] = None
-    events: List[Dict[str, Any]] = []
+    timeline: Optional[MacroTimeline] = None
 
     pressed_keys: Set[str] = set()
 
-    def __init__(self, window_name: str) -> None:
+    scheduler: PreciseScheduler = None
+    # scheduler.stats() of the last finished pass
+    last_jitter: Dict[str, float] = {}
+
+    seamless: bool = True
+    loop_gap: float = 0.0
+    loops_played: int = 0
+    # seconds the last seam was behind the ideal timeline (does not accumulate)
+    loop_drift: float = 0.0
+
+    def __init__(
+        self,
+        window_name: str,
+        spin_margin: float = 0.002,
+        seamless: bool = True,
+        loop_gap: float = 0.0,
+    ) -> None:
         try:
             self.window_name = window_name
             self.lock = Lock()
             self.pressed_keys = set()
+            self.scheduler = PreciseScheduler(spin_margin=spin_margin)
+            self.last_jitter = {}
+            self.seamless = seamless
+            self.loop_gap = loop_gap
 
             self._resolve_window()
 
@@ -89,29 +125,30 @@ class MacroPlayer:
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    @staticmethod
+    def _resolve_key(name: str) -> str:
+        """Recorded key name -> pydirectinput key (checked once per distinct key at load)."""
+        if pydirectinput.KEYBOARD_MAPPING.get(name) is None:
+            logging.warning(f"[MacroPlayer] Key '{name}' is not supported by pydirectinput; it will not be sent.")
+        return name
+
     def load(self, path: str) -> None:
-        """Load macro YAML file into memory."""
+        """Load a macro file (YAML or binary, by extension) as a timeline."""
         try:
             if not os.path.exists(path):
                 msg = f"[MacroPlayer] Macro file not found: {path}"
                 logging.error(msg)
                 raise CustomException(msg, sys)
 
-            macro = read_yaml_file(path)
-            events = macro.get("events")
-
-            if not isinstance(events, list):
-                msg = f"[MacroPlayer] Invalid macro file (missing 'events'): {path}"
-                logging.error(msg)
-                raise CustomException(msg, sys)
+            meta, timeline = read_macro(path, resolve=self._resolve_key)
 
             with self.lock:
-                self.macro = macro
-                self.events = events
+                self.macro = meta
+                self.timeline = timeline
 
             logging.info(
                 f"[MacroPlayer] Macro loaded from '{path}' "
-                f"with {len(events)} events."
+                f"with {len(timeline)} events ({len(timeline.keys)} keys, {timeline.duration:.2f}s)."
             )
 
         except Exception as e:
@@ -142,48 +179,55 @@ class MacroPlayer:
             except Exception as e:
                 logging.warning(f"[MacroPlayer] Failed to release key '{key}': {e}")
 
-    def _play_once(self) -> None:
+    def _on_loop(self, passes: int, drift: float) -> None:
+        """Per-pass report of a seamless loop; starts the next pass's jitter window."""
+        self.loops_played = passes
+        self.loop_drift = drift
+        self.last_jitter = self.scheduler.stats()
+        self.scheduler.reset()
+        logging.info(
+            f"[MacroPlayer] Pass {passes} done, seam drift {drift * 1000:.3f} ms. Timing jitter: {self.last_jitter}"
+        )
+
+    def _play(self, loops: Optional[int]) -> None:
         """
-        Play the loaded macro once (blocking).
+        Play the loaded macro `loops` times back to back (None: until stopped; blocking).
         Uses `self.stopped` as stop flag.
         """
         with self.lock:
-            events = list(self.events)
+            timeline = self.timeline
 
-        if not events:
+        if timeline is None or not len(timeline):
             logging.warning("[MacroPlayer] No events to play.")
             return
 
         logging.info(
-            f"[MacroPlayer] Starting playback ({len(events)} events)..."
+            f"[MacroPlayer] Starting playback ({len(timeline)} events, "
+            f"{'looping' if loops is None else f'{loops} pass(es)'})..."
         )
 
-        start_time = time.perf_counter()
-
         try:
-            for event in events:
-                if self.stopped:
-                    logging.info("[MacroPlayer] Stop requested. Ending playback early.")
-                    break
-
-                target_t = float(event["time"])
-                key = str(event["key"])
-                typ = str(event["type"])
-
-                while not self.stopped and (time.perf_counter() - start_time < target_t):
-                    time.sleep(0.0005)
-
-                if self.stopped:
-                    break
-
-                if typ == "down":
-                    self._press_key(key)
-                elif typ == "up":
-                    self._release_key(key)
+            self.scheduler.reset()
+            self.loops_played = 0
+            played = timeline.play(
+                self._press_key,
+                self._release_key,
+                lambda: self.stopped,
+                self.scheduler,
+                loops=loops,
+                loop_gap=self.loop_gap,
+                on_loop=self._on_loop,
+            )
+            if loops is not None and played < loops * len(timeline):
+                logging.info("[MacroPlayer] Stop requested. Ending playback early.")
 
         finally:
             self._release_all_keys()
-            logging.info("[MacroPlayer] Playback finished.")
+            logging.info(f"[MacroPlayer] Playback finished after {self.loops_played} pass(es).")
+
+    def _play_once(self) -> None:
+        """Play the loaded macro once (blocking)."""
+        self._play(loops=1)
 
     def start(self) -> None:
         """
@@ -193,7 +237,7 @@ class MacroPlayer:
         """
         try:
             with self.lock:
-                if not self.events:
+                if self.timeline is None or not len(self.timeline):
                     msg = "[MacroPlayer] No macro loaded. Call load(path) first."
                     logging.error(msg)
                     raise CustomException(msg, sys)
@@ -227,12 +271,15 @@ class MacroPlayer:
     def run(self) -> None:
         """
         Thread entry point.
-        With current while-loop, this will repeat the macro until stopped.
-        Change to a single self._play_once() if you want one-shot playback.
+        Repeats the macro until stopped: one seamless loop, or (seamless=False)
+        a _play_once() per pass. Call _play_once() instead for one-shot playback.
         """
         try:
-            while not self.stopped:
-                self._play_once()
+            if self.seamless:
+                self._play(loops=None)
+            else:
+                while not self.stopped:
+                    self._play_once()
         except Exception as e:
             logging.error(f"MacroPlayer error: {e}")
             raise CustomException(e, sys) from e
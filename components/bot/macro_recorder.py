@@ -1,13 +1,23 @@
+import json
 import os
 import sys
+import time
+from array import array
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from threading import Event, Lock, Thread
+from typing import Any, BinaryIO, Dict, List, Optional, Set, TextIO
 
-import keyboard
+import numpy as np
 
+from components.bot.macro_file import MACRO_RECORD_DTYPE, is_binary_macro, write_macro
+from components.bot.macro_timeline import EVENT_TYPES, MacroTimeline
 from exception import CustomException
 from logger import logging
-from utils import write_yaml_file
+
+
+# journal of a recording in progress, next to its macro file: packed records + key names (JSON lines)
+JOURNAL_SUFFIX: str = ".journal"
+KEYS_SUFFIX: str = ".keys"
 
 
 class MacroRecorder:
@@ -16,123 +26,371 @@ class MacroRecorder:
 
     - start(): begin recording (non-blocking, uses keyboard's internal threads)
     - stop(): stop recording
-    - save(): save to YAML
+    - save(): finalize the recording into a `file_ext` macro file (".yaml", or
+      ".mbin" for the binary format; see macro_file)
     - stop_and_save(): convenience helper
 
-    The recorder itself doesn't need a custom Thread loop, because
-    keyboard.hook() already runs asynchronously.
+    The keyboard hook callback only appends (time, key_id, type) to three
+    packed arrays (key names are interned to ids) under a short lock; no
+    object is kept per event. A background writer swaps those arrays out
+    every `flush_interval` seconds and appends them to an on-disk journal
+    (MACRO_RECORD_DTYPE records, plus new key names), so memory stays
+    bounded by one interval of events and a crash loses at most that
+    interval: recover() turns a leftover journal into a macro file.
+
+    Callback cost is measured (stats(): mean / max) and bounded: callbacks
+    slower than `callback_warn_us` are counted, and the writer logs a
+    warning with the max after the flush that follows them. If the writer
+    fails (e.g. disk full), recording stops on its own: the hook is
+    removed, unflushed events are dropped instead of piling up, the
+    journal files are closed (what was flushed stays recoverable) and
+    `writer_error` holds the cause.
+
+    Usage:
+        recorder = MacroRecorder("artifacts/macros", keys=["f7", "f8"], file_ext=".mbin")
+        recorder.start()
+        ...
+        path = recorder.stop_and_save()
+        MacroRecorder.recover_journals("artifacts/macros")   # after a crash
     """
 
-    def __init__(self, dir_name: str, keys: List[str]) -> None:
+    def __init__(
+        self,
+        dir_name: str,
+        keys: List[str],
+        file_ext: str = ".yaml",
+        flush_interval: float = 0.5,
+        callback_warn_us: float = 1000.0,
+    ) -> None:
         try:
             self.dir_name: str = dir_name
             self.keys: List[str] = keys
+            self._ignored: Set[str] = set(keys)
+            is_binary_macro(f"record{file_ext}")  # rejects unknown extensions up front
+            self.file_ext: str = file_ext
+            self.flush_interval: float = flush_interval
+            # hook callbacks slower than this are counted and logged as a warning
+            self.callback_warn_us: float = callback_warn_us
 
-            self.events: List[Dict[str, Any]] = []
             self.hook: Optional[Any] = None
+            self._hook_lock: Lock = Lock()
             self.start_time: Optional[float] = None
             self.is_recording: bool = False
             self.last_saved_path: Optional[str] = None
+            # macro file of the current / last recording; its journal sits next to it
+            self.path: Optional[str] = None
+
+            self._lock: Lock = Lock()
+            self._times: array = array("d")
+            self._key_ids: array = array("h")
+            self._types: array = array("B")
+            self._key_table: Dict[str, int] = {}
+            self._key_names: List[str] = []
+            self._keys_written: int = 0
+
+            self._journal: Optional[BinaryIO] = None
+            self._keys_file: Optional[TextIO] = None
+            self._writer: Optional[Thread] = None
+            self._stop_event: Event = Event()
+            # why the journal writer stopped the recording, if it did
+            self.writer_error: Optional[BaseException] = None
+
+            self.event_count: int = 0
+            self.flushes: int = 0
+            self._callback_calls: int = 0
+            self._callback_time: float = 0.0
+            self._callback_max: float = 0.0
+            self._slow_callbacks: int = 0
+            self._slow_reported: int = 0
 
             logging.info(f"MacroRecorder initialized. dir_name='{self.dir_name}'")
         except Exception as e:
             raise CustomException(e, sys) from e
 
-    def _callback(self, event: keyboard.KeyboardEvent) -> None:
+    def _callback(self, event: Any) -> None:
         """
-        Keyboard hook callback. It is active only while recording is enabled.
+        Keyboard hook callback (a keyboard.KeyboardEvent). It is active only while recording is enabled.
         """
+        start = time.perf_counter()
         try:
             if not self.is_recording:
                 return
 
-            if event.event_type not in ("down", "up"):
+            flag = EVENT_TYPES.get(event.event_type)
+            if flag is None:
                 return
 
             name = event.name
 
-            if name in self.keys:
-                return
-
-            if name is None:
+            if name is None or name in self._ignored:
                 return
 
             if self.start_time is None:
                 self.start_time = event.time
 
-            rel_time = event.time - self.start_time
+            with self._lock:
+                key_id = self._key_table.get(name)
+                if key_id is None:
+                    key_id = self._key_table[name] = len(self._key_names)
+                    self._key_names.append(name)
+                self._times.append(event.time - self.start_time)
+                self._key_ids.append(key_id)
+                self._types.append(flag)
+            self.event_count += 1
 
-            self.events.append(
-                {
-                    "time": round(rel_time, 4),
-                    "key": str(name),
-                    "type": str(event.event_type),
-                }
+        except Exception as e:
+            logging.error(f"[MacroRecorder] Error in keyboard callback: {e}")
+        finally:
+            cost = time.perf_counter() - start
+            self._callback_calls += 1
+            self._callback_time += cost
+            if cost > self._callback_max:
+                self._callback_max = cost
+            if cost * 1e6 > self.callback_warn_us:
+                self._slow_callbacks += 1
+
+    def _flush(self) -> None:
+        """Append the events buffered since the last flush (and new key names) to the journal."""
+        with self._lock:
+            times, key_ids, types = self._times, self._key_ids, self._types
+            self._times, self._key_ids, self._types = array("d"), array("h"), array("B")
+            names = self._key_names[self._keys_written:]
+            self._keys_written += len(names)
+
+        # key names first: every journal record's key_id must be resolvable
+        if names:
+            self._keys_file.write("".join(json.dumps(name) + "\n" for name in names))
+            self._keys_file.flush()
+            os.fsync(self._keys_file.fileno())
+        if len(times):
+            records = np.empty(len(times), dtype=MACRO_RECORD_DTYPE)
+            records["time"] = np.frombuffer(times, dtype=np.float64)
+            records["key_id"] = np.frombuffer(key_ids, dtype=np.int16)
+            records["type"] = np.frombuffer(types, dtype=np.uint8)
+            self._journal.write(records.tobytes())
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self.flushes += 1
+
+    def _report_slow_callbacks(self) -> None:
+        slow = self._slow_callbacks
+        if slow > self._slow_reported:
+            logging.warning(
+                f"[MacroRecorder] {slow - self._slow_reported} hook callbacks took over "
+                f"{self.callback_warn_us:g} us (max so far {self._callback_max * 1e6:.0f} us)."
             )
+            self._slow_reported = slow
 
+    def _run(self) -> None:
+        """Background writer: flush the buffered events every `flush_interval` seconds."""
+        try:
+            while not self._stop_event.wait(self.flush_interval):
+                self._flush()
+                self._report_slow_callbacks()
         except Exception as e:
-            logging.error(f"[MacroRecorder] Error in keyboard callback: {e}")
+            self.writer_error = e
+            logging.error(
+                f"[MacroRecorder] Journal writer failed, recording stopped: {e}. Events flushed so far "
+                f"stay in '{self.path + JOURNAL_SUFFIX}' (finalized by save() or recover_journals())."
+            )
+            self._abort()
+
+    def _unhook(self) -> None:
+        """Remove the keyboard hook once (stop() and a failing writer may race here)."""
+        with self._hook_lock:
+            hook, self.hook = self.hook, None
+        if hook is not None:
+            import keyboard  # global input hooks
+
+            keyboard.unhook(hook)
+
+    def _abort(self) -> None:
+        """Writer failure: stop recording, drop unflushed events and close the journal files."""
+        self.is_recording = False
+        try:
+            self._unhook()
+        except Exception as e:
+            logging.error(f"[MacroRecorder] Could not remove the keyboard hook: {e}")
+        with self._lock:
+            self._times, self._key_ids, self._types = array("d"), array("h"), array("B")
+        self._close_files()
+
+    def _close_files(self) -> None:
+        journal, keys_file = self._journal, self._keys_file
+        self._journal = self._keys_file = None
+        for file in (journal, keys_file):
+            if file is not None:
+                try:
+                    file.close()
+                except OSError as e:
+                    logging.error(f"[MacroRecorder] Error closing '{file.name}': {e}")
 
     def start(self) -> None:
         """
         Begin macro recording. Non-blocking.
         """
         try:
+            import keyboard  # global input hooks
+
             if self.is_recording:
                 logging.warning("[MacroRecorder] Recording already in progress.")
                 return
 
             print("=== Macro recording started (F9 to stop) ===")
-            self.events = []
+            now_str = datetime.now().strftime("%d%m%y_%H%M%S")
+            self.path = os.path.join(self.dir_name, f"record_{now_str}{self.file_ext}")
+            os.makedirs(self.dir_name, exist_ok=True)
+            self._open_journal()
+
             self.start_time = None
-            self.hook = keyboard.hook(self._callback)
             self.is_recording = True
+            self.hook = keyboard.hook(self._callback)
 
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    def _open_journal(self) -> None:
+        self._times, self._key_ids, self._types = array("d"), array("h"), array("B")
+        self._key_table, self._key_names, self._keys_written = {}, [], 0
+        self.event_count = self.flushes = self._callback_calls = 0
+        self._slow_callbacks = self._slow_reported = 0
+        self._callback_time = self._callback_max = 0.0
+        self.writer_error = None
+
+        self._journal = open(self.path + JOURNAL_SUFFIX, "wb")
+        self._keys_file = open(self.path + KEYS_SUFFIX, "w", encoding="utf-8")
+        self._stop_event.clear()
+        self._writer = Thread(target=self._run, daemon=True)
+        self._writer.start()
+
     def stop(self) -> None:
         """
-        Stop macro recording but do not save automatically.
+        Stop macro recording and flush the journal, but do not save automatically.
         """
         try:
             if not self.is_recording:
-                logging.warning("[MacroRecorder] stop() called but not recording.")
+                if self.writer_error is not None:
+                    logging.warning(f"[MacroRecorder] Recording was already stopped by a writer error: {self.writer_error}")
+                else:
+                    logging.warning("[MacroRecorder] stop() called but not recording.")
                 return
 
-            if self.hook:
-                keyboard.unhook(self.hook)
-                self.hook = None
+            self._unhook()
 
             self.is_recording = False
+            self._close_journal()
+            self._report_slow_callbacks()
             print("=== Macro recording stopped ===")
+            logging.info(f"[MacroRecorder] Recording stopped: {self.stats()}")
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _close_journal(self) -> None:
+        self._stop_event.set()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        # None if the writer already failed and closed them
+        if self._journal is not None:
+            try:
+                self._flush()
+            finally:
+                self._close_files()
+
+    @staticmethod
+    def read_journal(journal_path: str) -> MacroTimeline:
+        """Timeline of a journal (whole records only, so a torn last write is ignored)."""
+        try:
+            base = journal_path[:-len(JOURNAL_SUFFIX)] if journal_path.endswith(JOURNAL_SUFFIX) else journal_path
+            with open(base + KEYS_SUFFIX, "r", encoding="utf-8") as file:
+                keys = []
+                for line in file:
+                    try:
+                        keys.append(json.loads(line))
+                    except ValueError:
+                        break  # torn last line
+            count = os.path.getsize(base + JOURNAL_SUFFIX) // MACRO_RECORD_DTYPE.itemsize
+            records = np.fromfile(base + JOURNAL_SUFFIX, dtype=MACRO_RECORD_DTYPE, count=count)
+            # records whose key name did not reach the disk
+            records = records[records["key_id"] < len(keys)]
+            # same precision as recorded macros always had
+            times = np.round(records["time"], 4)
+            return MacroTimeline(times, records["key_id"].copy(), records["type"].copy(), keys)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def recover(journal_path: str, meta: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Turn a journal into its macro file (the journal's path without
+        JOURNAL_SUFFIX; format by extension) and delete the journal.
+        Also used by save(). Returns the macro file path ("" if the journal
+        had no events).
+        """
+        try:
+            base = journal_path[:-len(JOURNAL_SUFFIX)] if journal_path.endswith(JOURNAL_SUFFIX) else journal_path
+            timeline = MacroRecorder.read_journal(base)
+            if not len(timeline):
+                os.remove(base + JOURNAL_SUFFIX)
+                os.remove(base + KEYS_SUFFIX)
+                logging.warning(f"[MacroRecorder] Journal '{base + JOURNAL_SUFFIX}' had no events; removed.")
+                return ""
+            meta = meta or {
+                "description": "Recorded keyboard macro (recovered from journal)",
+                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            write_macro(base, timeline, meta)
+            os.remove(base + JOURNAL_SUFFIX)
+            os.remove(base + KEYS_SUFFIX)
+            logging.info(f"[MacroRecorder] Journal finalized into '{base}' ({len(timeline)} events).")
+            return base
+        except Exception as e:
+            raise CustomException(e, sys) from e
 
+    @staticmethod
+    def recover_journals(dir_name: str) -> List[str]:
+        """Finalize every journal left in `dir_name` by a recording that never got saved. Returns the macro paths."""
+        try:
+            if not os.path.isdir(dir_name):
+                return []
+            recovered = []
+            for name in sorted(os.listdir(dir_name)):
+                if name.endswith(JOURNAL_SUFFIX):
+                    path = MacroRecorder.recover(os.path.join(dir_name, name))
+                    if path:
+                        logging.warning(f"[MacroRecorder] Recovered unsaved recording: {path}")
+                        recovered.append(path)
+            return recovered
         except Exception as e:
             raise CustomException(e, sys) from e
 
     def save(self) -> str:
         """
-        Persist recorded events to a YAML file.
+        Finalize the recorded journal into its macro file (format by `file_ext`).
         Returns the full file path.
         """
         try:
-            if not self.events:
+            if self.is_recording:
+                logging.warning("[MacroRecorder] save() called while recording; stop() first.")
+                return ""
+
+            if self.path is None or not os.path.exists(self.path + JOURNAL_SUFFIX):
+                logging.warning("[MacroRecorder] No recording to save.")
+                return ""
+
+            if not self.event_count:
                 logging.warning("[MacroRecorder] No events to save.")
+                os.remove(self.path + JOURNAL_SUFFIX)
+                os.remove(self.path + KEYS_SUFFIX)
                 return ""
 
-            now_str = datetime.now().strftime("%d%m%y_%H%M%S")
-            filename = f"record_{now_str}.yaml"
-            full_path = os.path.join(self.dir_name, filename)
-
-            data = {
-                "meta": {
-                    "description": "Recorded keyboard macro",
-                    "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                },
-                "events": self.events,
+            meta = {
+                "description": "Recorded keyboard macro",
+                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             }
 
-            write_yaml_file(full_path, data, replace=True)
+            full_path = self.recover(self.path + JOURNAL_SUFFIX, meta)
             self.last_saved_path = full_path
             print("=== Macro recording saved ===")
             logging.info(f"[MacroRecorder] Saved macro: {full_path}")
@@ -156,3 +414,15 @@ class MacroRecorder:
             return path or None
         except Exception as e:
             raise CustomException(e, sys) from e
+
+    def stats(self) -> Dict[str, float]:
+        """Events recorded, journal flushes and hook callback cost (mean / max microseconds, slow calls)."""
+        calls = max(1, self._callback_calls)
+        return {
+            "events": self.event_count,
+            "flushes": self.flushes,
+            "callbacks": self._callback_calls,
+            "callback_mean_us": 1e6 * self._callback_time / calls,
+            "callback_max_us": 1e6 * self._callback_max,
+            "slow_callbacks": self._slow_callbacks,
+        }
@@ -0,0 +1,199 @@
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from components.bot.precise_scheduler import PreciseScheduler
+from exception import CustomException
+from logger import logging
+
+
+EVENT_UP: int = 0
+EVENT_DOWN: int = 1
+EVENT_TYPES: Dict[str, int] = {"up": EVENT_UP, "down": EVENT_DOWN}
+EVENT_NAMES: Tuple[str, ...] = ("up", "down")
+# events converted to Python lists at a time during play(); bounds its extra memory
+PLAY_CHUNK: int = 1024
+
+
+class MacroTimeline:
+    """
+    Compiled keyboard macro: the recorder's event dicts turned into three
+    parallel arrays, ordered as recorded.
+
+        times    float64  seconds from the start of the macro
+        key_ids  int16    index into `keys` / `codes` (interned key names)
+        down     uint8    EVENT_DOWN / EVENT_UP
+
+    `codes[key_id]` is the key as the input backend takes it, resolved once
+    at compile time by `resolve(name)`, so playback never parses or looks up
+    a key name. play() walks the timeline with no per-event parsing: the
+    arrays are unpacked into Python lists PLAY_CHUNK events at a time, so
+    nothing but the arrays is kept (nbytes is the whole footprint).
+
+    Usage:
+        timeline = MacroTimeline.compile(macro["events"], resolve=backend_key)
+        timeline.play(press, release, stopped=lambda: player.stopped)   # press(code) / release(code)
+        timeline.play(press, release, stopped, scheduler)                # jitter in scheduler.stats()
+        timeline.play(press, release, stopped, loops=None, on_loop=log)  # seamless loop until stopped
+        events = timeline.events()    # back to [{"time", "key", "type"}, ...]
+    """
+
+    def __init__(
+        self,
+        times: np.ndarray,
+        key_ids: np.ndarray,
+        down: np.ndarray,
+        keys: Sequence[str],
+        codes: Optional[Sequence[Any]] = None,
+    ) -> None:
+        try:
+            if not (len(times) == len(key_ids) == len(down)):
+                raise ValueError("times, key_ids and down must have the same length")
+            self.times: np.ndarray = times
+            self.key_ids: np.ndarray = key_ids
+            self.down: np.ndarray = down
+            self.keys: Tuple[str, ...] = tuple(keys)
+            self.codes: Tuple[Any, ...] = tuple(codes) if codes is not None else self.keys
+            if len(self.codes) != len(self.keys):
+                raise ValueError("codes must have one entry per key")
+            self._seam: Optional[Tuple[int, ...]] = None
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @classmethod
+    def compile(
+        cls,
+        events: Sequence[Dict[str, Any]],
+        resolve: Optional[Callable[[str], Any]] = None,
+    ) -> "MacroTimeline":
+        """
+        Compile recorder events ({"time", "key", "type"}). Events of other
+        types are skipped (the player always ignored them); `resolve(name)`
+        maps each distinct key name to the backend's code (default: the name).
+        """
+        try:
+            n = len(events)
+            times = np.empty(n, dtype=np.float64)
+            key_ids = np.empty(n, dtype=np.int16)
+            down = np.empty(n, dtype=np.uint8)
+            interned: Dict[str, int] = {}
+            count = 0
+            for event in events:
+                flag = EVENT_TYPES.get(str(event["type"]))
+                if flag is None:
+                    continue
+                key = str(event["key"])
+                key_id = interned.get(key)
+                if key_id is None:
+                    key_id = interned[key] = len(interned)
+                times[count] = float(event["time"])
+                key_ids[count] = key_id
+                down[count] = flag
+                count += 1
+
+            if count != n:
+                logging.warning(f"[MacroTimeline] Skipped {n - count} events with an unknown type.")
+            if count and not np.all(np.isfinite(times[:count])):
+                raise ValueError("Macro event times must be finite numbers")
+
+            keys = list(interned)
+            codes = [resolve(key) for key in keys] if resolve is not None else None
+            return cls(times[:count].copy(), key_ids[:count].copy(), down[:count].copy(), keys, codes)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def duration(self) -> float:
+        """Time of the last event (0 for an empty macro)."""
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the timeline (its arrays; play() keeps no per-event objects)."""
+        return self.times.nbytes + self.key_ids.nbytes + self.down.nbytes
+
+    def events(self) -> List[Dict[str, Any]]:
+        """The recorder's event form: [{"time", "key", "type"}, ...]."""
+        return [
+            {"time": t, "key": self.keys[k], "type": EVENT_NAMES[d]}
+            for t, k, d in zip(self.times.tolist(), self.key_ids.tolist(), self.down.tolist())
+        ]
+
+    def chunks(self, size: int = PLAY_CHUNK) -> Iterator[Tuple[List[float], List[int], List[int]]]:
+        """(times, key_ids, down) as Python lists, `size` events at a time (nothing is cached)."""
+        for start in range(0, len(self.times), size):
+            stop = start + size
+            yield self.times[start:stop].tolist(), self.key_ids[start:stop].tolist(), self.down[start:stop].tolist()
+
+    def seam_releases(self) -> Tuple[int, ...]:
+        """
+        Key ids to release between two back-to-back passes: keys still held
+        after a pass (last event "down") whose first event is "down", i.e.
+        the next pass expects them up. Keys whose first event is "up" stay
+        held across the seam, as the macro expects. Computed once.
+        """
+        if self._seam is None:
+            key_ids = self.key_ids.astype(np.intp)
+            # ids are interned in order of first appearance, so sorted ids keep that order
+            ids, first = np.unique(key_ids, return_index=True)
+            _, last_reversed = np.unique(key_ids[::-1], return_index=True)
+            last = len(key_ids) - 1 - last_reversed
+            held = (self.down[first] == EVENT_DOWN) & (self.down[last] == EVENT_DOWN)
+            self._seam = tuple(ids[held].tolist())
+        return self._seam
+
+    def play(
+        self,
+        press: Callable[[Any], None],
+        release: Callable[[Any], None],
+        stopped: Callable[[], bool],
+        scheduler: Optional[PreciseScheduler] = None,
+        loops: Optional[int] = 1,
+        loop_gap: float = 0.0,
+        on_loop: Optional[Callable[[int, float], None]] = None,
+    ) -> int:
+        """
+        Dispatch every event at its time from now: press(code) / release(code).
+        Waits go through `scheduler` (a default PreciseScheduler if None),
+        which records each event's lateness.
+
+        `loops` passes (None: until stopped) run back to back on one clock:
+        pass k+1 starts `loop_gap` after the last event of pass k, so there
+        is no dead time or clock restart at the seam, and only the keys of
+        seam_releases() are released there. After each pass,
+        on_loop(passes_done, drift) is called with the seam's drift in
+        seconds (clock now - the ideal end of that pass); it does not
+        accumulate since every deadline is absolute.
+
+        Returns how many events were dispatched (stops early if stopped).
+        """
+        if not len(self):
+            return 0
+        scheduler = scheduler or PreciseScheduler()
+        codes = self.codes
+        actions = (release, press)
+        seam = [codes[k] for k in self.seam_releases()]
+        wait_until = scheduler.wait_until
+        period = self.duration + loop_gap
+        dispatched = 0
+        done = 0
+        start = scheduler.now()
+        while loops is None or done < loops:
+            base = start + done * period
+            for times, key_ids, down in self.chunks():
+                for t, key_id, flag in zip(times, key_ids, down):
+                    if not wait_until(base + t, stopped):
+                        return dispatched
+                    actions[flag](codes[key_id])
+                    dispatched += 1
+            done += 1
+            if on_loop is not None:
+                on_loop(done, scheduler.now() - (base + self.duration))
+            if loops is None or done < loops:
+                for code in seam:
+                    release(code)
+        return dispatched
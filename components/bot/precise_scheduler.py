@@ -0,0 +1,113 @@
+import sys
+import time
+from array import array
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from exception import CustomException
+from logger import logging
+
+
+class PreciseScheduler:
+    """
+    Waits for absolute deadlines on a monotonic clock: sleeps coarsely until
+    `spin_margin` before the deadline (in slices of at most `max_sleep`, so a
+    stop request is seen quickly), then spins, yielding the time slice on
+    every check, until the deadline.
+
+    Every wait_until() records its lateness (clock at return - deadline) in a
+    packed float64 array (no object kept per event); stats() gives p50 / p99 /
+    max jitter of the waits since the last reset(). Time source and sleep are
+    injectable, so the scheduler can be driven by a simulated clock (its
+    sleep(0) must advance the clock).
+
+    Usage:
+        scheduler = PreciseScheduler(spin_margin=0.002)
+        start = scheduler.now()
+        for t, action in actions:
+            if not scheduler.wait_until(start + t, stopped=lambda: player.stopped):
+                break
+            action()
+        logging.info(scheduler.stats())     # {"events", "p50_ms", "p99_ms", "max_ms", ...}
+        scheduler.reset()
+    """
+
+    def __init__(
+        self,
+        spin_margin: float = 0.002,
+        max_sleep: float = 0.05,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        try:
+            if spin_margin < 0 or max_sleep <= 0:
+                raise ValueError("spin_margin must be >= 0 and max_sleep > 0")
+            # how long before a deadline coarse sleeping stops (covers the OS timer's overshoot)
+            self.spin_margin: float = spin_margin
+            self.max_sleep: float = max_sleep
+            self.clock: Callable[[], float] = clock
+            self.sleep: Callable[[float], None] = sleep
+
+            self._lateness: array = array("d")
+            self.sleeps: int = 0
+            self.spins: int = 0
+            self.sleep_time: float = 0.0
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def now(self) -> float:
+        return self.clock()
+
+    def wait_until(self, deadline: float, stopped: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Block until `deadline` (clock time). Returns False without waiting
+        further once `stopped()` is true, else True (lateness recorded).
+        """
+        clock = self.clock
+        now = clock()
+        while deadline - now > self.spin_margin:
+            if stopped is not None and stopped():
+                return False
+            nap = min(deadline - now - self.spin_margin, self.max_sleep)
+            self.sleep(nap)
+            self.sleeps += 1
+            after = clock()
+            self.sleep_time += after - now
+            now = after
+        if stopped is not None and stopped():
+            return False
+        while now < deadline:
+            # yield the time slice instead of burning it while spinning
+            self.sleep(0)
+            self.spins += 1
+            now = clock()
+        self._lateness.append(now - deadline)
+        return True
+
+    def lateness(self) -> np.ndarray:
+        """Lateness in seconds of every wait since the last reset() (a copy)."""
+        return np.array(self._lateness, dtype=np.float64)
+
+    def stats(self) -> Dict[str, float]:
+        """Jitter of the waits since the last reset(): ms percentiles, sleep / spin counts."""
+        late = self.lateness() * 1000.0
+        empty = not len(late)
+        return {
+            "events": int(len(late)),
+            "mean_ms": float("nan") if empty else float(late.mean()),
+            "p50_ms": float("nan") if empty else float(np.percentile(late, 50)),
+            "p99_ms": float("nan") if empty else float(np.percentile(late, 99)),
+            "max_ms": float("nan") if empty else float(late.max()),
+            "sleeps": self.sleeps,
+            "spins": self.spins,
+            "sleep_s": self.sleep_time,
+        }
+
+    def reset(self) -> None:
+        """Start a new measurement window."""
+        del self._lateness[:]
+        self.sleeps = 0
+        self.spins = 0
+        self.sleep_time = 0.0
+        logging.debug("[PreciseScheduler] Jitter stats reset.")
@@ -0,0 +1,175 @@
+import os
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from components.vision.arrow_extractor import ArrowExtractor
+from components.vision.arrow_shapes import DIRECTIONS, draw_arrow
+from exception import CustomException
+from logger import logging
+
+
+class ArrowClassifier:
+    """
+    CPU arrow direction classifier for a whole batch of crops at once.
+
+    Each direction is represented by a set of templates (the arrow rendered
+    at several rotations and sizes, cropped by the same ArrowExtractor the
+    live pipeline uses, so normalization matches exactly). Templates and
+    crops are flattened, centred and L2-normalized; one matrix product then
+    scores every crop against every template (cosine similarity). A
+    direction's score is its best template, and a softmax over the four
+    directions gives the confidence.
+
+    Templates are rendered procedurally by default, or loaded from / saved
+    to an `.npz` (templates, labels, crop_size); `templates` keeps them
+    unnormalized, as given, for save_npz().
+
+    Usage:
+        classifier = ArrowClassifier(crop_size=32)
+        labels, confidences = classifier.classify(crops)   # crops: (N, S, S) float32
+        classifier.names(labels)                            # ["up", "left", ...]
+    """
+
+    def __init__(
+        self,
+        crop_size: int = 32,
+        templates: Optional[np.ndarray] = None,
+        labels: Optional[np.ndarray] = None,
+        temperature: float = 0.05,
+        max_batch: int = 16,
+    ) -> None:
+        try:
+            self.crop_size: int = crop_size
+            # softmax temperature on cosine scores; lower = sharper confidences
+            self.temperature: float = temperature
+
+            if templates is None:
+                templates, labels = self.render_templates(crop_size)
+            if labels is None or len(labels) != len(templates):
+                raise ValueError("templates and labels must have the same length")
+
+            self.labels: np.ndarray = np.asarray(labels, dtype=np.int64)
+            # (K, S, S) as given; _templates is the normalized (K, S*S) copy classify() uses
+            self.templates: np.ndarray = np.array(templates, dtype=np.float32)
+            if self.templates.shape[1:] != (crop_size, crop_size):
+                raise ValueError(f"templates are {self.templates.shape[1:]}, not {crop_size}x{crop_size}")
+            self._templates: np.ndarray = self._normalize(self.templates.reshape(len(self.templates), -1).copy())
+
+            # one-hot (K, 4): template -> direction
+            self._onehot: np.ndarray = np.zeros((len(self.labels), len(DIRECTIONS)), dtype=bool)
+            self._onehot[np.arange(len(self.labels)), self.labels] = True
+
+            # reused per-batch scratch
+            self.max_batch: int = max_batch
+            self._batch: np.ndarray = np.zeros((max_batch, crop_size * crop_size), dtype=np.float32)
+
+            logging.info(f"ArrowClassifier initialized with {len(self.labels)} templates ({crop_size}x{crop_size}).")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def _normalize(x: np.ndarray) -> np.ndarray:
+        """Centre and L2-normalize rows in place."""
+        x -= x.mean(axis=1, keepdims=True)
+        x /= np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-6)
+        return x
+
+    @staticmethod
+    def render_templates(
+        crop_size: int = 32,
+        angles: Tuple[float, ...] = (-12.0, -6.0, 0.0, 6.0, 12.0),
+        sizes: Tuple[float, ...] = (28.0, 40.0),
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(K, S, S) float32 templates and (K,) direction indices, cropped like live arrows."""
+        extractor = ArrowExtractor(crop_size=crop_size, max_arrows=1, min_area=1, min_side=1)
+        canvas_side = int(max(sizes) * 2)
+        templates: List[np.ndarray] = []
+        labels: List[int] = []
+        for label, direction in enumerate(DIRECTIONS):
+            for size in sizes:
+                for angle in angles:
+                    canvas = np.zeros((canvas_side, canvas_side), dtype=np.uint8)
+                    draw_arrow(canvas, direction, size, (canvas_side / 2.0, canvas_side / 2.0), 255, angle)
+                    canvas[canvas < 128] = 0
+                    canvas[canvas >= 128] = 255
+                    _, crops = extractor.extract(canvas)
+                    templates.append(crops[0].copy())
+                    labels.append(label)
+        return np.stack(templates), np.asarray(labels, dtype=np.int64)
+
+    @classmethod
+    def from_npz(cls, path: str, crop_size: Optional[int] = None, **kwargs) -> "ArrowClassifier":
+        """
+        From a save_npz() file. `crop_size` is the size the caller's crops
+        have (e.g. its ArrowExtractor's); a file stored at another size is
+        rejected here instead of failing later in classify().
+        """
+        try:
+            with np.load(path) as data:
+                stored = int(data["crop_size"])
+                if crop_size is not None and crop_size != stored:
+                    raise ValueError(
+                        f"Arrow templates in '{path}' are {stored}x{stored} but crops are "
+                        f"{crop_size}x{crop_size}; re-save the templates at crop size {crop_size} "
+                        f"(or remove the file to render them)"
+                    )
+                return cls(
+                    crop_size=stored,
+                    templates=data["templates"],
+                    labels=data["labels"],
+                    **kwargs,
+                )
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @classmethod
+    def load(cls, path: Optional[str], crop_size: int = 32, **kwargs) -> "ArrowClassifier":
+        """From `path` if that .npz exists (it must match `crop_size`), otherwise with procedurally rendered templates."""
+        if path and os.path.exists(path):
+            logging.info(f"Loading arrow templates from {path}")
+            return cls.from_npz(path, crop_size=crop_size, **kwargs)
+        return cls(crop_size=crop_size, **kwargs)
+
+    def save_npz(self, path: str) -> None:
+        """Store this classifier's (unnormalized) templates, labels and crop size."""
+        try:
+            np.savez_compressed(path, templates=self.templates, labels=self.labels, crop_size=self.crop_size)
+            logging.info(f"Arrow templates saved to {path}")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def classify(self, crops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Direction index (N,) into DIRECTIONS and confidence (N,) for a
+        (N, S, S) batch of crops (e.g. ArrowExtractor.extract()).
+        """
+        try:
+            n = len(crops)
+            if n == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            if n > self.max_batch:
+                self.max_batch = n
+                self._batch = np.zeros((n, self.crop_size * self.crop_size), dtype=np.float32)
+
+            batch = self._batch[:n]
+            batch[:] = crops.reshape(n, -1)
+            self._normalize(batch)
+
+            # (N, K) cosine scores -> best template per direction (N, 4)
+            scores = batch @ self._templates.T
+            per_direction = np.where(self._onehot[None, :, :], scores[:, :, None], -np.inf).max(axis=1)
+
+            logits = (per_direction - per_direction.max(axis=1, keepdims=True)) / self.temperature
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+
+            labels = probs.argmax(axis=1)
+            return labels, probs[np.arange(n), labels].astype(np.float32)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def names(labels: np.ndarray) -> List[str]:
+        return [DIRECTIONS[i] for i in np.asarray(labels).tolist()]
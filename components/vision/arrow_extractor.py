@@ -0,0 +1,104 @@
+import sys
+from typing import Tuple
+
+import cv2 as cv
+import numpy as np
+
+from exception import CustomException
+from logger import logging
+
+
+class ArrowExtractor:
+    """
+    Arrow candidates from a binary mask as one batch.
+
+    cv.connectedComponentsWithStats labels the mask once; the size, area and
+    aspect filters then run on the whole stats table with NumPy masks, and
+    every surviving candidate is warped into a fixed (S, S) square crop of a
+    preallocated batch (aspect kept, padded with 0, scaled to 0..1).
+
+    Usage:
+        extractor = ArrowExtractor(crop_size=32)
+        boxes, crops = extractor.extract(mask.image)
+        # boxes: (N, 4) int32 x, y, w, h in mask coordinates, sorted left -> right
+        # crops: (N, S, S) float32 view of the batch buffer (valid until the next extract())
+    """
+
+    def __init__(
+        self,
+        crop_size: int = 32,
+        max_arrows: int = 16,
+        min_area: int = 50,
+        min_side: int = 10,
+        max_side: int = 200,
+        aspect_range: Tuple[float, float] = (0.5, 2.0),
+        padding: float = 0.1,
+    ) -> None:
+        try:
+            self.crop_size: int = crop_size
+            self.max_arrows: int = max_arrows
+            self.min_area: int = min_area
+            self.min_side: int = min_side
+            self.max_side: int = max_side
+            self.aspect_range: Tuple[float, float] = aspect_range
+            # border kept around each box inside its crop, as a fraction of the box side
+            self.padding: float = padding
+
+            self._crops_u8: np.ndarray = np.zeros((max_arrows, crop_size, crop_size), dtype=np.uint8)
+            self._crops: np.ndarray = np.zeros((max_arrows, crop_size, crop_size), dtype=np.float32)
+            self._warp: np.ndarray = np.zeros((2, 3), dtype=np.float64)
+
+            logging.info(f"ArrowExtractor initialized (crop {crop_size}x{crop_size}, max {max_arrows} arrows).")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def candidates(self, mask: np.ndarray) -> np.ndarray:
+        """(N, 4) int32 boxes of components passing every filter, sorted left -> right."""
+        try:
+            _, _, stats, _ = cv.connectedComponentsWithStats(mask, connectivity=8, ltype=cv.CV_32S)
+            stats = stats[1:]  # label 0 is the background
+
+            w = stats[:, cv.CC_STAT_WIDTH]
+            h = stats[:, cv.CC_STAT_HEIGHT]
+            aspect = w / np.maximum(h, 1)
+            keep = (
+                (stats[:, cv.CC_STAT_AREA] >= self.min_area)
+                & (w >= self.min_side) & (w <= self.max_side)
+                & (h >= self.min_side) & (h <= self.max_side)
+                & (aspect >= self.aspect_range[0]) & (aspect <= self.aspect_range[1])
+            )
+
+            boxes = stats[keep, :4]
+            boxes = boxes[np.argsort(boxes[:, 0], kind="stable")]
+            if len(boxes) > self.max_arrows:
+                logging.debug(f"ArrowExtractor: {len(boxes)} candidates, keeping the first {self.max_arrows}.")
+                boxes = boxes[: self.max_arrows]
+            return boxes.astype(np.int32, copy=False)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def extract(self, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Boxes (N, 4) and the matching (N, S, S) float32 crop batch for a single-channel mask."""
+        try:
+            boxes = self.candidates(mask)
+            n = len(boxes)
+            side = self.crop_size
+            warp = self._warp
+
+            for i, (x, y, w, h) in enumerate(boxes.tolist()):
+                # square window around the box centre, mapped onto (side, side)
+                extent = max(w, h) * (1.0 + 2.0 * self.padding)
+                scale = side / extent
+                warp[0, 0] = warp[1, 1] = scale
+                warp[0, 2] = (side - 1) / 2.0 - (x + (w - 1) / 2.0) * scale
+                warp[1, 2] = (side - 1) / 2.0 - (y + (h - 1) / 2.0) * scale
+                cv.warpAffine(
+                    mask, warp, (side, side), dst=self._crops_u8[i],
+                    flags=cv.INTER_LINEAR, borderMode=cv.BORDER_CONSTANT, borderValue=0,
+                )
+
+            crops = self._crops[:n]
+            np.multiply(self._crops_u8[:n], np.float32(1.0 / 255.0), out=crops)
+            return boxes, crops
+        except Exception as e:
+            raise CustomException(e, sys) from e
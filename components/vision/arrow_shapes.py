@@ -0,0 +1,54 @@
+from typing import Tuple
+
+import cv2 as cv
+import numpy as np
+
+
+DIRECTIONS: Tuple[str, ...] = ("up", "down", "left", "right")
+
+# Arrow pointing right in a unit box centred on the origin: shaft + head
+_ARROW_RIGHT = np.array(
+    [
+        [-0.50, -0.16],
+        [0.05, -0.16],
+        [0.05, -0.45],
+        [0.50, 0.00],
+        [0.05, 0.45],
+        [0.05, 0.16],
+        [-0.50, 0.16],
+    ],
+    dtype=np.float32,
+)
+
+_ANGLES = {"right": 0.0, "down": 90.0, "left": 180.0, "up": 270.0}
+
+
+def arrow_polygon(direction: str, size: float, center: Tuple[float, float], angle_jitter: float = 0.0) -> np.ndarray:
+    """
+    Integer polygon (K, 2) of a filled arrow of `size` px pointing `direction`
+    ("up" / "down" / "left" / "right"), optionally rotated by `angle_jitter` degrees.
+    """
+    theta = np.deg2rad(_ANGLES[direction] + angle_jitter)
+    c, s = np.cos(theta), np.sin(theta)
+    rot = np.array([[c, -s], [s, c]], dtype=np.float32)
+    pts = (_ARROW_RIGHT * size) @ rot.T + np.asarray(center, dtype=np.float32)
+    return np.rint(pts).astype(np.int32)
+
+
+def draw_arrow(
+    img: np.ndarray,
+    direction: str,
+    size: float,
+    center: Tuple[float, float],
+    color=255,
+    angle_jitter: float = 0.0,
+) -> np.ndarray:
+    """Draw a filled arrow into `img` in place and return it."""
+    cv.fillPoly(img, [arrow_polygon(direction, size, center, angle_jitter)], color, lineType=cv.LINE_AA)
+    return img
+
+
+def render_arrow(direction: str, side: int, fill: float = 0.8, angle_jitter: float = 0.0) -> np.ndarray:
+    """Single (side, side) uint8 image of a centred white arrow on black."""
+    img = np.zeros((side, side), dtype=np.uint8)
+    return draw_arrow(img, direction, side * fill, ((side - 1) / 2.0, (side - 1) / 2.0), 255, angle_jitter)
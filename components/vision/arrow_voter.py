@@ -0,0 +1,186 @@
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from components.vision.arrow_shapes import DIRECTIONS
+from exception import CustomException
+from logger import logging
+
+
+@dataclass(frozen=True)
+class ArrowSequence:
+    """A committed rune arrow sequence."""
+    directions: Tuple[str, ...]
+    labels: Tuple[int, ...]
+    # per slot: winning share of the confidence-weighted votes
+    confidences: Tuple[float, ...]
+    # frames voted with the committed length / frames seen since the prompt appeared
+    frames: int
+    frames_seen: int
+    # seconds from the first frame showing arrows to the commit
+    time_to_commit: float
+    # fraction of (frame, slot) votes that agree with the committed direction
+    agreement: float
+
+
+class ArrowSequenceVoter:
+    """
+    Multi-frame consensus for rune arrow sequences.
+
+    Per-frame classifications (left -> right slots) go into a fixed-size ring
+    of the last `window` frames. Frames vote with the sequence length most
+    of them agree on, each slot's direction is the confidence-weighted vote,
+    and the sequence is committed as soon as every slot's winning share
+    reaches `threshold` with at least `min_frames` votes. Clean frames commit
+    after `min_frames`; noisy ones keep voting until the window agrees.
+
+    After a commit further frames are ignored until the prompt disappears:
+    `max_gap` consecutive frames without arrows reset the voter.
+
+    Usage:
+        voter = ArrowSequenceVoter()
+        committed = voter.update(labels, confidences, frame.timestamp)
+        if committed is not None:
+            press(committed.directions)
+    """
+
+    def __init__(
+        self,
+        window: int = 8,
+        max_slots: int = 8,
+        min_frames: int = 2,
+        threshold: float = 0.8,
+        max_gap: int = 5,
+    ) -> None:
+        try:
+            if min_frames > window:
+                raise ValueError("min_frames must not exceed window")
+            self.window: int = window
+            self.max_slots: int = max_slots
+            self.min_frames: int = min_frames
+            self.threshold: float = threshold
+            self.max_gap: int = max_gap
+
+            self._labels: np.ndarray = np.zeros((window, max_slots), dtype=np.int64)
+            self._conf: np.ndarray = np.zeros((window, max_slots), dtype=np.float32)
+            self._counts: np.ndarray = np.zeros(window, dtype=np.int64)
+            self._filled: int = 0
+            self._head: int = 0
+
+            self._first_ts: Optional[float] = None
+            self._frames_seen: int = 0
+            self._gap: int = 0
+            self.committed: Optional[ArrowSequence] = None
+
+            self._commit_times: List[float] = []
+            self._commit_frames: List[int] = []
+            self._agreements: List[float] = []
+            self._abandoned: int = 0
+
+            logging.info(f"ArrowSequenceVoter initialized (window={window}, threshold={threshold}).")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def reset(self) -> None:
+        """Forget the current prompt (votes and commit); statistics are kept."""
+        if self.committed is None and self._frames_seen > 0:
+            self._abandoned += 1
+        self._filled = 0
+        self._head = 0
+        self._first_ts = None
+        self._frames_seen = 0
+        self._gap = 0
+        self.committed = None
+
+    def update(
+        self, labels: np.ndarray, confidences: np.ndarray, timestamp: Optional[float] = None
+    ) -> Optional[ArrowSequence]:
+        """
+        Add one frame's classifications. Returns the ArrowSequence on the
+        frame it is committed, None otherwise (see `committed` afterwards).
+        """
+        try:
+            ts = time.perf_counter() if timestamp is None else timestamp
+            n = min(len(labels), self.max_slots)
+
+            if n == 0:
+                self._gap += 1
+                if self._gap >= self.max_gap and (self._frames_seen or self.committed is not None):
+                    self.reset()
+                return None
+            self._gap = 0
+
+            if self.committed is not None:
+                return None
+            if self._first_ts is None:
+                self._first_ts = ts
+            self._frames_seen += 1
+
+            row = self._head
+            self._labels[row, :n] = labels[:n]
+            self._conf[row, :n] = confidences[:n]
+            self._counts[row] = n
+            self._head = (row + 1) % self.window
+            self._filled = min(self._filled + 1, self.window)
+
+            committed = self._try_commit(ts)
+            if committed is not None:
+                self.committed = committed
+                self._commit_times.append(committed.time_to_commit)
+                self._commit_frames.append(committed.frames_seen)
+                self._agreements.append(committed.agreement)
+                logging.info(
+                    f"Arrow sequence committed: {committed.directions} after {committed.frames_seen} frames "
+                    f"({committed.time_to_commit * 1000.0:.0f} ms, agreement {committed.agreement:.2f})"
+                )
+            return committed
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _try_commit(self, ts: float) -> Optional[ArrowSequence]:
+        counts = self._counts[: self._filled]
+        length = int(np.bincount(counts).argmax())
+        rows = np.flatnonzero(counts == length)
+        if len(rows) < self.min_frames:
+            return None
+
+        labels = self._labels[rows, :length]      # (F, L)
+        conf = self._conf[rows, :length]          # (F, L)
+
+        # confidence-weighted votes per slot and direction: (L, 4)
+        onehot = labels[:, :, None] == np.arange(len(DIRECTIONS))[None, None, :]
+        votes = (onehot * conf[:, :, None]).sum(axis=0)
+        totals = np.maximum(votes.sum(axis=1), 1e-6)
+        winners = votes.argmax(axis=1)
+        shares = votes[np.arange(length), winners] / totals
+        if shares.min() < self.threshold:
+            return None
+
+        agreement = float((labels == winners[None, :]).mean())
+        return ArrowSequence(
+            directions=tuple(DIRECTIONS[i] for i in winners.tolist()),
+            labels=tuple(winners.tolist()),
+            confidences=tuple(float(v) for v in shares.tolist()),
+            frames=len(rows),
+            frames_seen=self._frames_seen,
+            time_to_commit=ts - self._first_ts,
+            agreement=agreement,
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """Commits, time-to-commit (ms) and frames-to-commit, agreement, and prompts abandoned without commit."""
+        times = np.asarray(self._commit_times) * 1000.0
+        frames = np.asarray(self._commit_frames, dtype=np.float64)
+        agreements = np.asarray(self._agreements)
+        return {
+            "commits": len(times),
+            "abandoned": self._abandoned,
+            "time_to_commit_ms_mean": float(times.mean()) if len(times) else float("nan"),
+            "time_to_commit_ms_p95": float(np.percentile(times, 95)) if len(times) else float("nan"),
+            "frames_to_commit_mean": float(frames.mean()) if len(frames) else float("nan"),
+            "agreement_mean": float(agreements.mean()) if len(agreements) else float("nan"),
+            "agreement_min": float(agreements.min()) if len(agreements) else float("nan"),
+        }
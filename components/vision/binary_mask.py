@@ -0,0 +1,67 @@
+from typing import Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.frame_buffer import Frame
+
+
+class BinaryMask:
+    """
+    Single-channel (0/255) VisionPreprocessor output for one captured frame.
+
+    Wraps a pinned, read-only slot of the preprocessor's mask ring, so the
+    arrow stage reads the mask without any copy or colour conversion. Call
+    release() (or use it as a context manager) when done.
+
+    - image:      (H, W) uint8 view, ROI-sized
+    - source_seq: sequence id of the captured frame it was computed from
+    - roi:        (x, y, w, h) of the mask in frame coordinates, or None (full frame)
+    - confirmed_seq / confirmed_ts: newest captured frame the mask stands for;
+                  advanced when the preprocessor reuses it for an unchanged frame
+
+    BGR rendering for viewers is produced only on request via render().
+    """
+
+    __slots__ = ("frame", "source_seq", "roi", "confirmed_seq", "confirmed_ts")
+
+    def __init__(self, frame: Frame, source_seq: int, roi: Optional[Tuple[int, int, int, int]]) -> None:
+        self.frame: Frame = frame
+        self.source_seq: int = source_seq
+        self.roi: Optional[Tuple[int, int, int, int]] = roi
+        self.confirmed_seq: int = source_seq
+        self.confirmed_ts: float = frame.timestamp
+
+    @property
+    def image(self) -> np.ndarray:
+        return self.frame.image
+
+    @property
+    def offset(self) -> Tuple[int, int]:
+        """Top-left of the mask in frame coordinates."""
+        return (0, 0) if self.roi is None else (self.roi[0], self.roi[1])
+
+    def render(self) -> np.ndarray:
+        """New 3-channel BGR copy of the mask, for display only."""
+        return cv.cvtColor(self.frame.image, cv.COLOR_GRAY2BGR)
+
+    def confirm(self, seq: int, timestamp: float) -> None:
+        """Mark the mask as still valid for a newer captured frame."""
+        self.confirmed_seq = seq
+        self.confirmed_ts = timestamp
+
+    def retain(self) -> "BinaryMask":
+        """Return a new handle with its own pin on the same mask."""
+        mask = BinaryMask(self.frame.retain(), self.source_seq, self.roi)
+        mask.confirm(self.confirmed_seq, self.confirmed_ts)
+        return mask
+
+    def release(self) -> None:
+        """Unpin the mask. Safe to call more than once."""
+        self.frame.release()
+
+    def __enter__(self) -> "BinaryMask":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
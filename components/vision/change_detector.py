@@ -0,0 +1,242 @@
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from exception import CustomException
+from logger import logging
+
+
+Rect = Optional[Tuple[int, int, int, int]]
+
+CHANGED: str = "changed"
+UNCHANGED: str = "unchanged"
+REGION_UNCHANGED: str = "region_unchanged"
+
+
+class FrameChange:
+    """
+    Immutable change record of one captured frame (see ChangeDetector).
+
+    The frame is split into a grid of cells. `cell_index` holds, per cell,
+    the index of the last frame in which that cell changed, so a stage that
+    skipped frames can still ask whether anything changed since the frame it
+    last processed (changed_since), not only since the previous capture.
+
+    Usage:
+        change = frame.change
+        if change.blank:                                  # black / loading screen
+            ...
+        change.state(minimap_rect)                        # "changed" / "unchanged" / "region_unchanged"
+        if change.changed_since(last_processed.change, minimap_rect):
+            ...
+    """
+
+    __slots__ = ("index", "size", "cell_index", "blank", "brightness")
+
+    def __init__(self, index: int, size: Tuple[int, int], cell_index: np.ndarray, blank: bool, brightness: float) -> None:
+        self.index: int = index
+        # frame (width, height) the grid was laid over
+        self.size: Tuple[int, int] = size
+        cell_index.flags.writeable = False
+        self.cell_index: np.ndarray = cell_index
+        self.blank: bool = blank
+        self.brightness: float = brightness
+
+    def _cells(self, rect: Rect) -> np.ndarray:
+        """Cells (rows, cols) overlapping `rect` (frame pixels), or the whole grid."""
+        if rect is None:
+            return self.cell_index
+        rows, cols = self.cell_index.shape
+        w, h = self.size
+        x, y, rw, rh = rect
+        c0, c1 = max(0, x * cols // w), min(cols, -(-(x + rw) * cols // w))
+        r0, r1 = max(0, y * rows // h), min(rows, -(-(y + rh) * rows // h))
+        return self.cell_index[r0:max(r0 + 1, r1), c0:max(c0 + 1, c1)]
+
+    @property
+    def changed(self) -> bool:
+        """Anything changed since the previous frame."""
+        return bool((self.cell_index == self.index).any())
+
+    def region_changed(self, rect: Rect) -> bool:
+        """`rect` changed since the previous frame."""
+        return bool((self._cells(rect) == self.index).any())
+
+    def changed_since(self, other: Optional["FrameChange"], rect: Rect = None) -> bool:
+        """Whether the frame (or `rect`) changed after the frame `other` was recorded."""
+        if other is None or other.size != self.size or other.index > self.index:
+            return True
+        return bool((self._cells(rect) > other.index).any())
+
+    def state(self, rect: Rect = None) -> str:
+        """CHANGED, UNCHANGED (nothing changed) or REGION_UNCHANGED (only outside `rect`)."""
+        if not self.changed:
+            return UNCHANGED
+        if rect is not None and not self.region_changed(rect):
+            return REGION_UNCHANGED
+        return CHANGED
+
+    def __repr__(self) -> str:
+        return f"FrameChange(index={self.index}, state={self.state()}, blank={self.blank})"
+
+
+class ChangeDetector:
+    """
+    Cheap per-frame change detection for the capture thread.
+
+    Each frame is reduced to a small grayscale signature, split into `grid`
+    (cols, rows) cells of `cell_px` x `cell_px` signature pixels: a bilinear
+    resize to `supersample` times the signature size, an integer-factor
+    INTER_AREA average down to it (a fractional INTER_AREA resize of a full
+    frame costs several ms), then a gray conversion of the thumbnail only. A cell changes when any of its signature pixels
+    differs from the cell's reference by more than `pixel_delta`; the reference
+    is only updated when the cell changes, so slow fades still add up. Frames
+    darker than `black_level` or flatter than `uniform_std` are flagged blank
+    (black, fading or loading screens).
+
+    Usage:
+        ring = FrameRing(slots=8, change_detector=ChangeDetector())
+        ring.write(img)                       # frame.change is set on every published frame
+    """
+
+    def __init__(
+        self,
+        grid: Tuple[int, int] = (16, 9),
+        cell_px: int = 16,
+        supersample: int = 2,
+        pixel_delta: int = 6,
+        black_level: float = 12.0,
+        uniform_std: float = 2.0,
+    ) -> None:
+        try:
+            self.grid: Tuple[int, int] = (int(grid[0]), int(grid[1]))
+            self.cell_px: int = cell_px
+            self.supersample: int = supersample
+            self.pixel_delta: int = pixel_delta
+            self.black_level: float = black_level
+            self.uniform_std: float = uniform_std
+
+            cols, rows = self.grid
+            k = supersample
+            self._sampled: np.ndarray = np.empty((rows * cell_px * k, cols * cell_px * k, 3), dtype=np.uint8)
+            self._small: np.ndarray = np.empty((rows * cell_px, cols * cell_px, 3), dtype=np.uint8)
+            self._signature: np.ndarray = np.empty((rows * cell_px, cols * cell_px), dtype=np.uint8)
+            self._reference: np.ndarray = np.zeros_like(self._signature, dtype=np.int16)
+            self._cell_index: np.ndarray = np.zeros((rows, cols), dtype=np.int64)
+            self._size: Tuple[int, int] = (0, 0)
+            self._index: int = 0
+
+            self._stats: Dict[str, float] = {"frames": 0, "changed": 0, "unchanged": 0, "blank": 0, "time": 0.0}
+            logging.info(f"ChangeDetector initialized ({cols}x{rows} cells, delta {pixel_delta}).")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def update(self, img_bgr: np.ndarray) -> FrameChange:
+        """Record one frame and return its FrameChange."""
+        try:
+            start = time.perf_counter()
+            cols, rows = self.grid
+            s = self.cell_px
+            h, w = img_bgr.shape[:2]
+
+            k = self.supersample
+            cv.resize(img_bgr, (cols * s * k, rows * s * k), dst=self._sampled, interpolation=cv.INTER_LINEAR)
+            cv.resize(self._sampled, (cols * s, rows * s), dst=self._small, interpolation=cv.INTER_AREA)
+            cv.cvtColor(self._small, cv.COLOR_BGR2GRAY, dst=self._signature)
+            self._index += 1
+
+            if (w, h) != self._size:
+                # new geometry: every cell counts as changed
+                self._size = (w, h)
+                changed = np.ones((rows, cols), dtype=bool)
+            else:
+                diff = np.abs(self._signature.astype(np.int16) - self._reference)
+                changed = diff.reshape(rows, s, cols, s).max(axis=(1, 3)) > self.pixel_delta
+
+            if changed.any():
+                self._cell_index[changed] = self._index
+                update = np.repeat(np.repeat(changed, s, axis=0), s, axis=1)
+                self._reference[update] = self._signature[update]
+
+            brightness = float(self._signature.mean())
+            blank = brightness < self.black_level or float(self._signature.std()) < self.uniform_std
+            change = FrameChange(self._index, self._size, self._cell_index.copy(), blank, brightness)
+
+            self._stats["frames"] += 1
+            self._stats["changed" if change.changed else "unchanged"] += 1
+            self._stats["blank"] += int(blank)
+            self._stats["time"] += time.perf_counter() - start
+            return change
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def stats(self) -> Dict[str, float]:
+        """Frames seen, changed / unchanged / blank counts and mean cost per frame (ms)."""
+        s = self._stats
+        return {
+            "frames": s["frames"],
+            "changed": s["changed"],
+            "unchanged": s["unchanged"],
+            "blank": s["blank"],
+            "ms_per_frame": 1000.0 * s["time"] / max(1, s["frames"]),
+        }
+
+
+class ChangeGate:
+    """
+    Per-stage skip decision from FrameChange records.
+
+    check() says whether a stage must PROCESS a frame, may REUSE its previous
+    result (nothing changed in its `rect` since the last frame it processed)
+    or is looking at a BLANK frame. Frames without a change record are always
+    processed. Counts per decision are kept for stats().
+
+    Usage:
+        gate = ChangeGate("detector")
+        decision = gate.check(frame.change, search_rect)
+        if decision == ChangeGate.PROCESS:
+            result = work(frame)
+            gate.processed(frame.change)
+    """
+
+    PROCESS: str = "process"
+    REUSE: str = "reuse"
+    BLANK: str = "blank"
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self._last: Optional[FrameChange] = None
+        self._counts: Dict[str, int] = {self.PROCESS: 0, self.REUSE: 0, self.BLANK: 0}
+
+    def check(self, change: Optional[FrameChange], rect: Rect = None) -> str:
+        if change is None:
+            decision = self.PROCESS
+        elif change.blank:
+            # results for a blank frame are not reusable later
+            self._last = None
+            decision = self.BLANK
+        elif self._last is not None and not change.changed_since(self._last, rect):
+            decision = self.REUSE
+        else:
+            decision = self.PROCESS
+        self._counts[decision] += 1
+        return decision
+
+    def processed(self, change: Optional[FrameChange]) -> None:
+        """Record the frame the stage's current result was computed from."""
+        self._last = change
+
+    def reset(self) -> None:
+        """Force the next frame to be processed (e.g. after a settings change)."""
+        self._last = None
+
+    def stats(self) -> Dict[str, int]:
+        """Frames processed, reused (skipped as unchanged) and skipped as blank."""
+        return {
+            "processed": self._counts[self.PROCESS],
+            "reused": self._counts[self.REUSE],
+            "blank": self._counts[self.BLANK],
+        }
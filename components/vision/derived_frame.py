@@ -0,0 +1,216 @@
+import sys
+from threading import Lock
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.region_registry import Region, RegionRegistry
+from exception import CustomException
+
+
+Rect = Optional[Tuple[int, int, int, int]]
+
+KINDS: Tuple[str, ...] = ("gray", "hsv", "channels", "level", "region")
+
+
+def _freeze(value):
+    """Mark cached arrays read-only; every consumer of the frame shares them."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, tuple):
+        for v in value:
+            _freeze(v)
+    return value
+
+
+class DerivedFrame:
+    """
+    Lazily computed, memoized representations of one captured frame.
+
+    Every representation is computed at most once per frame sequence id, no
+    matter how many stages ask for it, and is returned read-only. Computation
+    happens outside the cache lock with a per-representation lock, so a
+    detector converting to gray does not block the preprocessor converting
+    (another crop) to HSV.
+
+    `rect` arguments are (x, y, w, h) in frame coordinates; None means the
+    whole frame.
+
+    Usage:
+        with ring.latest() as frame:
+            gray = frame.derived.gray()
+            h, s, v = frame.derived.channels("hsv", rect=roi)
+            coarse = frame.derived.level(2, rect=roi)
+            minimap, region = frame.derived.crop("minimap", regions, kind="gray")
+    """
+
+    def __init__(self, cache: "DerivedCache", seq: int, image: np.ndarray) -> None:
+        self.seq: int = seq
+        self.image: np.ndarray = image
+        self._cache: "DerivedCache" = cache
+        self._lock: Lock = Lock()
+        self._values: Dict[Hashable, object] = {}
+        self._key_locks: Dict[Hashable, Lock] = {}
+
+    def _get(self, kind: str, key: Hashable, compute: Callable[[], object]):
+        with self._lock:
+            if key in self._values:
+                self._cache._count(kind, hit=True)
+                return self._values[key]
+            key_lock = self._key_locks.setdefault(key, Lock())
+
+        with key_lock:
+            # another stage may have computed it while we waited
+            with self._lock:
+                if key in self._values:
+                    self._cache._count(kind, hit=True)
+                    return self._values[key]
+
+            value = _freeze(compute())
+            with self._lock:
+                self._values[key] = value
+            self._cache._count(kind, hit=False)
+            return value
+
+    def _bgr(self, rect: Rect) -> np.ndarray:
+        if rect is None:
+            return self.image
+        x, y, w, h = rect
+        return self.image[y:y + h, x:x + w]
+
+    def _view_of_full(self, kind: str, rect: Rect) -> Optional[np.ndarray]:
+        """If the whole-frame image of `kind` is already cached, `rect` is just a view of it."""
+        if rect is None:
+            return None
+        with self._lock:
+            full = self._values.get((kind, None))
+        if full is None:
+            return None
+        self._cache._count(kind, hit=True)
+        x, y, w, h = rect
+        return full[y:y + h, x:x + w]
+
+    def cached(self, kind: str, rect: Rect = None) -> Optional[np.ndarray]:
+        """The "gray" / "hsv" image of `rect` if some stage already computed it, else None (never computes)."""
+        view = self._view_of_full(kind, rect)
+        if view is not None:
+            return view
+        with self._lock:
+            value = self._values.get((kind, rect))
+        if value is not None:
+            self._cache._count(kind, hit=True)
+        return value
+
+    def gray(self, rect: Rect = None) -> np.ndarray:
+        """Grayscale of the frame (or of `rect`)."""
+        try:
+            view = self._view_of_full("gray", rect)
+            if view is not None:
+                return view
+            return self._get("gray", ("gray", rect), lambda: cv.cvtColor(self._bgr(rect), cv.COLOR_BGR2GRAY))
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def hsv(self, rect: Rect = None) -> np.ndarray:
+        """HSV of the frame (or of `rect`)."""
+        try:
+            view = self._view_of_full("hsv", rect)
+            if view is not None:
+                return view
+            return self._get("hsv", ("hsv", rect), lambda: cv.cvtColor(self._bgr(rect), cv.COLOR_BGR2HSV))
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def channels(self, space: str = "hsv", rect: Rect = None) -> Tuple[np.ndarray, ...]:
+        """Split channels of the "bgr" or "hsv" image (or of `rect`)."""
+        try:
+            if space not in ("hsv", "bgr"):
+                raise ValueError(f"Unknown color space: {space}")
+
+            def split() -> Tuple[np.ndarray, ...]:
+                source = self.hsv(rect) if space == "hsv" else self._bgr(rect)
+                return tuple(cv.split(source))
+
+            return self._get("channels", ("channels", space, rect), split)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def level(self, n: int, rect: Rect = None) -> np.ndarray:
+        """Grayscale pyramid level `n` (cv.pyrDown applied n times); level 0 is gray(rect)."""
+        try:
+            if n <= 0:
+                return self.gray(rect)
+            return self._get("level", ("level", rect, n), lambda: cv.pyrDown(self.level(n - 1, rect)))
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def crop(self, name: str, regions: RegionRegistry, kind: str = "bgr") -> Tuple[np.ndarray, Region]:
+        """
+        Zero-copy view of region `name` in the "bgr", "gray" or "hsv" image,
+        plus the resolved Region. Only the region is converted, not the frame.
+        """
+        try:
+            h, w = self.image.shape[:2]
+            region: Region = self._get("region", ("region", name), lambda: regions.get(name, w, h))
+            if kind == "bgr":
+                return region.crop(self.image), region
+            if kind == "gray":
+                return self.gray(region.rect), region
+            if kind == "hsv":
+                return self.hsv(region.rect), region
+            raise ValueError(f"Unknown image kind: {kind}")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+class DerivedCache:
+    """
+    One DerivedFrame per FrameRing slot, keyed by the frame sequence id.
+
+    An entry lives as long as its slot holds that frame: the ring drops it
+    when the slot is claimed for a new frame. Hit/miss counters per kind of
+    representation show whether each conversion really runs once per frame
+    (misses per kind == frames that needed it).
+    """
+
+    def __init__(self, slots: int) -> None:
+        self.lock: Lock = Lock()
+        self._entries: List[Optional[DerivedFrame]] = [None] * slots
+        self._hits: Dict[str, int] = {kind: 0 for kind in KINDS}
+        self._misses: Dict[str, int] = {kind: 0 for kind in KINDS}
+        self._frames: int = 0
+
+    def get(self, slot: int, seq: int, image: np.ndarray) -> DerivedFrame:
+        with self.lock:
+            entry = self._entries[slot]
+            if entry is None or entry.seq != seq:
+                entry = DerivedFrame(self, seq, image)
+                self._entries[slot] = entry
+                self._frames += 1
+            return entry
+
+    def drop(self, slot: int) -> None:
+        """Forget the slot's derived images (the slot is about to be overwritten)."""
+        with self.lock:
+            self._entries[slot] = None
+
+    def _count(self, kind: str, hit: bool) -> None:
+        with self.lock:
+            if hit:
+                self._hits[kind] += 1
+            else:
+                self._misses[kind] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """{kind: {"hits", "misses"}} plus {"frames": {"count"}} since creation / reset_stats()."""
+        with self.lock:
+            out = {kind: {"hits": self._hits[kind], "misses": self._misses[kind]} for kind in KINDS}
+            out["frames"] = {"count": self._frames}
+            return out
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self._hits = {kind: 0 for kind in KINDS}
+            self._misses = {kind: 0 for kind in KINDS}
+            self._frames = 0
@@ -0,0 +1,107 @@
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+
+DETECTION_DTYPE: np.dtype = np.dtype(
+    [
+        ("x", "<i4"),
+        ("y", "<i4"),
+        ("w", "<i4"),
+        ("h", "<i4"),
+        ("cx", "<i4"),
+        ("cy", "<i4"),
+        ("score", "<f4"),
+        ("frame_seq", "<i8"),
+    ]
+)
+
+
+class Detections:
+    """
+    Immutable snapshot of detection results backed by one structured array
+    (see DETECTION_DTYPE), sorted best-first.
+
+    The array is read-only, so detectors can publish the same object to every
+    reader without copying. as_dicts() gives the legacy List[Dict] form.
+
+    Usage:
+        dets = detector.get_detections()
+        if dets:
+            best = dets[0]
+            print(best["cx"], best["cy"], best["score"])
+        xs = dets.array["x"]   # column access, no Python objects per hit
+    """
+
+    __slots__ = ("array",)
+
+    def __init__(self, array: np.ndarray) -> None:
+        if array.dtype != DETECTION_DTYPE:
+            raise TypeError(f"Detections expects DETECTION_DTYPE, got {array.dtype}")
+        array.flags.writeable = False
+        self.array: np.ndarray = array
+
+    @classmethod
+    def empty(cls) -> "Detections":
+        return cls(np.zeros(0, dtype=DETECTION_DTYPE))
+
+    @classmethod
+    def from_boxes(cls, boxes: np.ndarray, scores: np.ndarray, frame_seq: int = 0) -> "Detections":
+        """Build from (N, 4) [x, y, w, h] boxes and (N,) scores."""
+        boxes = np.asarray(boxes)
+        array = np.empty(len(boxes), dtype=DETECTION_DTYPE)
+        if len(boxes):
+            array["x"] = boxes[:, 0]
+            array["y"] = boxes[:, 1]
+            array["w"] = boxes[:, 2]
+            array["h"] = boxes[:, 3]
+            array["cx"] = array["x"] + array["w"] // 2
+            array["cy"] = array["y"] + array["h"] // 2
+            array["score"] = scores
+            array["frame_seq"] = frame_seq
+        return cls(array)
+
+    @property
+    def frame_seq(self) -> int:
+        return int(self.array["frame_seq"][0]) if len(self.array) else 0
+
+    def best(self) -> Optional[np.void]:
+        """Highest-scoring detection, or None."""
+        return self.array[0] if len(self.array) else None
+
+    def boxes(self) -> np.ndarray:
+        """(N, 4) int32 [x, y, w, h] array (a new array, fields are not contiguous)."""
+        return np.stack([self.array["x"], self.array["y"], self.array["w"], self.array["h"]], axis=1)
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        """Legacy form: [{"x", "y", "w", "h", "center_x", "center_y", "score"}, ...]."""
+        return [
+            {
+                "x": x,
+                "y": y,
+                "w": w,
+                "h": h,
+                "center_x": cx,
+                "center_y": cy,
+                "score": score,
+            }
+            for x, y, w, h, cx, cy, score, _ in self.array.tolist()
+        ]
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __bool__(self) -> bool:
+        return len(self.array) > 0
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def __iter__(self) -> Iterator[np.void]:
+        return iter(self.array)
+
+    def __repr__(self) -> str:
+        return f"Detections(n={len(self.array)}, frame_seq={self.frame_seq})"
+
+
+EMPTY_DETECTIONS: Detections = Detections.empty()
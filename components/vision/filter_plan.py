@@ -0,0 +1,164 @@
+import sys
+from typing import List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from configs.filter_configs import FilterConfig
+from exception import CustomException
+from logger import logging
+
+
+class FilterPlan:
+    """
+    VisionPreprocessor's HSV + threshold pipeline compiled from one FilterConfig version.
+
+    Everything that depends only on the settings (clamped HSV bounds, channel
+    selection, median kernel, brightness/contrast LUT, morphology kernel) is
+    computed once here. Every frame-sized intermediate lives in a buffer that
+    is allocated on the first frame of a given ROI size and then reused via
+    OpenCV's `dst=`, so run() allocates nothing frame-sized.
+
+    Brightness/contrast (convertScaleAbs) is a fixed 256-entry LUT. Histogram
+    equalization is data dependent, so it cannot be precomputed; instead the
+    frame's histogram is pushed through the brightness/contrast LUT and the
+    equalization LUT is built from that. Both steps then run as a single
+    cv.LUT pass, bit-exact with convertScaleAbs followed by equalizeHist.
+
+    Rebuild the plan when `FilterConfig.version` changes:
+
+        if plan is None or plan.version != cfg.version:
+            plan = FilterPlan(cfg)
+        mask = plan.run(roi_bgr)
+    """
+
+    def __init__(self, cfg: FilterConfig) -> None:
+        try:
+            # read the version first: a change made while compiling triggers another rebuild
+            self.version: int = cfg.version
+
+            h_min, h_max = int(np.clip(cfg.h_min, 0, 179)), int(np.clip(cfg.h_max, 0, 179))
+            s_min, s_max = int(np.clip(cfg.s_min, 0, 255)), int(np.clip(cfg.s_max, 0, 255))
+            v_min, v_max = int(np.clip(cfg.v_min, 0, 255)), int(np.clip(cfg.v_max, 0, 255))
+            self.lower: np.ndarray = np.array([h_min, s_min, v_min], dtype=np.uint8)
+            self.upper: np.ndarray = np.array([h_max, s_max, v_max], dtype=np.uint8)
+
+            # 0 = H, 1 = S, 2 = V, anything else = 0.4*S + 0.6*V
+            self.channel_mode: int = int(getattr(cfg, "hsv_channel", 2))
+
+            k = max(1, cfg.gaussian)
+            if k % 2 == 0:
+                k += 1
+            self.median_k: int = k if k >= 3 else 0
+
+            # convertScaleAbs(alpha, beta) for every possible input value
+            brightness = int(np.clip(cfg.brightness, 0, 100))
+            alpha = 1.0 + (cfg.contrast / 50.0)
+            levels = np.arange(256, dtype=np.float32) * np.float32(alpha) + np.float32(brightness)
+            self.tone_lut: np.ndarray = np.clip(np.rint(np.abs(levels)), 0, 255).astype(np.uint8)
+
+            self.use_adaptive: bool = bool(cfg.use_adaptive)
+            self.thresh_min: int = int(np.clip(cfg.thresh_min, 0, 255))
+
+            ksz = max(1, cfg.kernel_size)
+            self.kernel: np.ndarray = np.ones((ksz, ksz), np.uint8)
+            self.open_iterations: int = max(1, cfg.erosion_iterations)
+            self.close_iterations: int = max(1, cfg.dilation_iterations)
+
+            # small per-frame scratch (histogram -> combined LUT)
+            self._hist: np.ndarray = np.zeros((256, 1), dtype=np.float32)
+            self._lut: np.ndarray = np.zeros(256, dtype=np.uint8)
+
+            self._shape: Optional[Tuple[int, int]] = None
+            self._out: List[np.ndarray] = []
+            self._out_index: int = 0
+
+            logging.debug(f"FilterPlan compiled for settings version {self.version}.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _ensure_buffers(self, h: int, w: int) -> None:
+        """(Re)allocate the intermediates when the ROI size changes."""
+        if self._shape == (h, w):
+            return
+        self._shape = (h, w)
+        self._hsv = np.empty((h, w, 3), dtype=np.uint8)
+        self._mask = np.empty((h, w), dtype=np.uint8)
+        self._chan_a = np.empty((h, w), dtype=np.uint8)
+        self._chan_b = np.empty((h, w), dtype=np.uint8)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._blur = np.empty((h, w), dtype=np.uint8)
+        self._tone = np.empty((h, w), dtype=np.uint8)
+        self._binary = np.empty((h, w), dtype=np.uint8)
+        self._opened = np.empty((h, w), dtype=np.uint8)
+        # two outputs (when the caller gives no `out`), so a returned mask survives the next call
+        self._out = [np.empty((h, w), dtype=np.uint8) for _ in range(2)]
+        logging.debug(f"FilterPlan buffers allocated for {w}x{h}.")
+
+    def _base_channel(self, hsv: np.ndarray) -> np.ndarray:
+        mode = self.channel_mode
+        if mode in (0, 1, 2):
+            return cv.extractChannel(hsv, mode, dst=self._chan_a)
+        cv.extractChannel(hsv, 1, dst=self._chan_a)
+        cv.extractChannel(hsv, 2, dst=self._chan_b)
+        return cv.addWeighted(self._chan_a, 0.4, self._chan_b, 0.6, 0, dst=self._gray)
+
+    def _equalized_tone_lut(self, gray: np.ndarray) -> np.ndarray:
+        """LUT equal to equalizeHist(LUT(gray, tone_lut)), built from gray's histogram."""
+        cv.calcHist([gray], [0], None, [256], [0, 256], hist=self._hist)
+        hist = np.bincount(self.tone_lut, weights=self._hist[:, 0], minlength=256)
+
+        # same arithmetic as cv.equalizeHist (float32 scale, round to nearest)
+        first = int(np.flatnonzero(hist)[0])
+        total = hist.sum()
+        eq = self._lut
+        if hist[first] == total:
+            eq.fill(first)
+        else:
+            scale = np.float32(255.0) / np.float32(total - hist[first])
+            cdf = (np.cumsum(hist) - hist[first]).astype(np.float32)
+            eq[:] = np.clip(np.rint(cdf * scale), 0, 255)
+            eq[:first] = 0
+        return eq[self.tone_lut]
+
+    def run(
+        self, img_bgr: np.ndarray, hsv: Optional[np.ndarray] = None, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Single-channel binary mask (0/255) of `img_bgr`. Pass `hsv` if its HSV
+        conversion already exists. The mask is written into `out` (an (H, W)
+        uint8 array, e.g. a claimed ring slot); without it, the returned array
+        is owned by the plan and stays valid until the next-but-one call.
+        """
+        try:
+            h, w = img_bgr.shape[:2]
+            self._ensure_buffers(h, w)
+
+            if hsv is None:
+                hsv = cv.cvtColor(img_bgr, cv.COLOR_BGR2HSV, dst=self._hsv)
+            hsv_mask = cv.inRange(hsv, self.lower, self.upper, dst=self._mask)
+
+            # masked base channel: min(channel, 0/255 mask) == bitwise_and with mask
+            base = self._base_channel(hsv)
+            gray = cv.min(base, hsv_mask, dst=self._gray)
+
+            if self.median_k:
+                gray = cv.medianBlur(gray, self.median_k, dst=self._blur)
+
+            # brightness/contrast + equalizeHist in one LUT pass
+            gray = cv.LUT(gray, self._equalized_tone_lut(gray), dst=self._tone)
+
+            if self.use_adaptive:
+                binary = cv.adaptiveThreshold(
+                    gray, 255, cv.ADAPTIVE_THRESH_GAUSSIAN_C, cv.THRESH_BINARY, 31, 2, dst=self._binary
+                )
+            else:
+                _, binary = cv.threshold(gray, self.thresh_min, 255, cv.THRESH_BINARY, dst=self._binary)
+
+            opened = cv.morphologyEx(binary, cv.MORPH_OPEN, self.kernel, dst=self._opened, iterations=self.open_iterations)
+            if out is None:
+                out = self._out[self._out_index]
+                self._out_index ^= 1
+            return cv.morphologyEx(opened, cv.MORPH_CLOSE, self.kernel, dst=out, iterations=self.close_iterations)
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -0,0 +1,256 @@
+import sys
+import time
+from threading import Lock
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from components.vision.change_detector import ChangeDetector, FrameChange
+from components.vision.derived_frame import DerivedCache, DerivedFrame
+from components.vision.stage_signal import StageSignal
+from exception import CustomException
+from logger import logging
+
+
+class Frame:
+    """
+    Read-only handle on one FrameRing slot.
+
+    The slot is pinned while the handle is alive, so the capture thread will
+    not overwrite it. Call release() (or use it as a context manager) when done.
+    Use retain() to hand the same frame to another consumer with its own pin.
+    `derived` gives the shared, memoized gray / HSV / pyramid views of it.
+    `change` is its FrameChange record if the ring runs a ChangeDetector.
+    """
+
+    __slots__ = ("seq", "timestamp", "image", "change", "_ring", "_slot", "_released")
+
+    def __init__(
+        self,
+        ring: "FrameRing",
+        slot: int,
+        seq: int,
+        timestamp: float,
+        image: np.ndarray,
+        change: Optional[FrameChange] = None,
+    ) -> None:
+        self.seq: int = seq
+        self.timestamp: float = timestamp
+        self.image: np.ndarray = image
+        self.change: Optional[FrameChange] = change
+        self._ring: "FrameRing" = ring
+        self._slot: int = slot
+        self._released: bool = False
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.image.shape
+
+    @property
+    def derived(self) -> DerivedFrame:
+        """Derived images of this frame, computed once per sequence id for all stages."""
+        return self._ring.derived_cache.get(self._slot, self.seq, self.image)
+
+    def retain(self) -> "Frame":
+        """Return a new handle pinning the same slot."""
+        return self._ring._pin(self._slot, self.seq)
+
+    def release(self) -> None:
+        """Unpin the slot. Safe to call more than once."""
+        if self._released:
+            return
+        self._released = True
+        self._ring._unpin(self._slot)
+
+    def __enter__(self) -> "Frame":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+class FrameRing:
+    """
+    Fixed set of preallocated frame slots shared between the capture thread
+    and its consumers.
+
+    - write(img)  -> copy img into a free slot, assign the next sequence id
+    - claim()/commit() -> fill a free slot in place instead of copying into it
+    - latest()    -> pinned read-only Frame for the newest sequence id
+    - signal      -> StageSignal published with every new sequence id
+    - derived_cache -> per-slot DerivedFrame (gray, HSV, pyramid, region crops)
+    - change_detector -> optional ChangeDetector; every published Frame then
+      carries a FrameChange (computed by the writer before publishing)
+    - recorder    -> optional SessionRecorder (set by recorder.attach(ring));
+      every published frame is handed to its submit() after publishing
+
+    Writing is the only copy a frame goes through; consumers get views.
+    Slots that are pinned are skipped by the writer. If every slot is pinned
+    the new frame is dropped (counted in `dropped`) instead of blocking capture.
+
+    Usage:
+        ring = FrameRing(slots=8)
+        ring.write(img)
+
+        frame = ring.latest()
+        if frame is not None:
+            with frame:
+                do_something(frame.image)
+    """
+
+    def __init__(self, slots: int = 8, change_detector: Optional[ChangeDetector] = None) -> None:
+        try:
+            if slots < 2:
+                raise ValueError("FrameRing needs at least 2 slots.")
+
+            self.lock: Lock = Lock()
+            self.slots: int = slots
+
+            self._buffers: List[Optional[np.ndarray]] = [None] * slots
+            self._seqs: List[int] = [0] * slots
+            self._timestamps: List[float] = [0.0] * slots
+            self._changes: List[Optional[FrameChange]] = [None] * slots
+            self._pins: List[int] = [0] * slots
+            self._writing: List[bool] = [False] * slots
+
+            self._next_slot: int = 0
+            self._latest_slot: int = -1
+            self._seq: int = 0
+
+            self.dropped: int = 0
+            self.signal: StageSignal = StageSignal("capture")
+            # per-slot gray / HSV / pyramid images shared by every stage
+            self.derived_cache: DerivedCache = DerivedCache(slots)
+            self.change_detector: Optional[ChangeDetector] = change_detector
+            # SessionRecorder; queues a copy of every published frame (never blocks)
+            self.recorder = None
+
+            logging.info(f"FrameRing initialized with {slots} slots.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequence id of the newest published frame (0 if none yet)."""
+        with self.lock:
+            return self._seq
+
+    def _claim_slot(self, shape: Tuple[int, ...], dtype: np.dtype) -> Optional[int]:
+        """Pick a slot the writer may overwrite. Called with the lock held."""
+        for i in range(self.slots):
+            slot = (self._next_slot + i) % self.slots
+            if slot == self._latest_slot or self._pins[slot] > 0 or self._writing[slot]:
+                continue
+
+            buf = self._buffers[slot]
+            if buf is None or buf.shape != shape or buf.dtype != dtype:
+                # Only unpinned slots are reallocated; any old views keep their own memory alive
+                self._buffers[slot] = np.empty(shape, dtype=dtype)
+                logging.debug(f"FrameRing slot {slot} allocated with shape {shape}.")
+
+            self._writing[slot] = True
+            self.derived_cache.drop(slot)
+            self._next_slot = (slot + 1) % self.slots
+            return slot
+        return None
+
+    def claim(self, shape: Tuple[int, ...], dtype=np.uint8) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Reserve a free slot to be filled in place (e.g. as an OpenCV dst=).
+        Returns (slot, writable buffer), or None if every slot is busy (counted
+        in `dropped`). Finish with commit(slot) or abort(slot).
+        """
+        try:
+            with self.lock:
+                slot = self._claim_slot(tuple(shape), np.dtype(dtype))
+                if slot is None:
+                    self.dropped += 1
+                    return None
+                return slot, self._buffers[slot]
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def commit(self, slot: int, timestamp: Optional[float] = None) -> int:
+        """Publish a slot filled after claim(). Returns the new sequence id."""
+        try:
+            ts = time.perf_counter() if timestamp is None else timestamp
+            change = None
+            if self.change_detector is not None:
+                # the slot is still reserved for this writer, so it can be read outside the lock
+                try:
+                    change = self.change_detector.update(self._buffers[slot])
+                except Exception:
+                    self.abort(slot)
+                    raise
+
+            with self.lock:
+                self._seq += 1
+                self._seqs[slot] = self._seq
+                self._timestamps[slot] = ts
+                self._changes[slot] = change
+                self._writing[slot] = False
+                self._latest_slot = slot
+                seq = self._seq
+
+            self.signal.publish(seq)
+
+            recorder = self.recorder
+            if recorder is not None:
+                # the slot cannot be reclaimed before this writer's next claim()
+                recorder.submit(self._buffers[slot], seq, ts)
+            return seq
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def abort(self, slot: int) -> None:
+        """Give back a claimed slot without publishing it."""
+        with self.lock:
+            self._writing[slot] = False
+
+    def write(self, img: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """
+        Copy `img` into a free slot and publish it.
+        Returns the new sequence id, or 0 if the frame was dropped.
+        """
+        try:
+            ts = time.perf_counter() if timestamp is None else timestamp
+
+            claimed = self.claim(img.shape, img.dtype)
+            if claimed is None:
+                return 0
+            slot, buf = claimed
+
+            # Copy outside the lock so readers are never blocked on memcpy
+            np.copyto(buf, img)
+            return self.commit(slot, ts)
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def latest(self) -> Optional[Frame]:
+        """Pin and return the newest frame, or None if nothing was written yet."""
+        try:
+            with self.lock:
+                if self._latest_slot < 0:
+                    return None
+                return self._make_frame(self._latest_slot)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _make_frame(self, slot: int) -> Frame:
+        """Build a pinned Frame for `slot`. Called with the lock held."""
+        self._pins[slot] += 1
+        view = self._buffers[slot].view()
+        view.flags.writeable = False
+        return Frame(self, slot, self._seqs[slot], self._timestamps[slot], view, self._changes[slot])
+
+    def _pin(self, slot: int, seq: int) -> Frame:
+        with self.lock:
+            if self._seqs[slot] != seq:
+                raise RuntimeError(f"Frame {seq} is no longer held by slot {slot}.")
+            return self._make_frame(slot)
+
+    def _unpin(self, slot: int) -> None:
+        with self.lock:
+            if self._pins[slot] > 0:
+                self._pins[slot] -= 1
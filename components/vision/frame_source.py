@@ -0,0 +1,146 @@
+import sys
+import time
+from threading import Event, Thread
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from components.vision.change_detector import ChangeDetector
+from components.vision.frame_buffer import FrameRing
+from exception import CustomException
+from logger import logging
+
+
+class FrameSource:
+    """
+    Base class of platform-independent frame producers that feed a FrameRing.
+
+    Same interface as WindowCapture, so any source can drive the vision
+    pipeline (RunTasks, ReplayRunner):
+        ring, change_detector        published frames (+ FrameChange records)
+        capture_once()               write the next frame; returns its seq (0 when exhausted)
+        start(interval) / stop()     background capture thread
+        track_window_closed()        True once the source has no more frames
+        get_screen_position(pos), get_window_size()
+
+    Subclasses implement capture_once() and may override _pace() (the wait
+    between two frames of the background thread).
+    """
+
+    def __init__(self, size: Tuple[int, int] = (0, 0), ring_slots: int = 8, detect_changes: bool = True) -> None:
+        try:
+            self.w, self.h = size
+            self.buffer_time: float = 0.1
+            self.stopped: bool = True
+            self._stop_event: Event = Event()
+            # set once capture_once() has nothing left to publish
+            self.exhausted: bool = False
+
+            self.change_detector: Optional[ChangeDetector] = ChangeDetector() if detect_changes else None
+            self.ring: FrameRing = FrameRing(slots=ring_slots, change_detector=self.change_detector)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def track_window_closed(self) -> bool:
+        """A source counts as closed once it is exhausted."""
+        return self.exhausted
+
+    def get_screen_position(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        return pos[0], pos[1]
+
+    def get_window_size(self) -> Tuple[int, int]:
+        return self.w, self.h
+
+    def capture_once(self) -> int:
+        """Publish the next frame into the ring (synchronously). Returns its sequence id, 0 if none."""
+        raise NotImplementedError
+
+    def _pace(self, interval_sec: float) -> None:
+        """Wait before the next frame; returns immediately when stop() is called."""
+        self._stop_event.wait(interval_sec)
+
+    def start(self, interval_sec: float = 0.01) -> None:
+        try:
+            name = type(self).__name__
+            if not self.stopped:
+                logging.warning(f"{name} thread already running.")
+                return
+
+            self.stopped = False
+            self._stop_event.clear()
+            thread = Thread(target=self._run, args=(interval_sec,), daemon=True)
+            thread.start()
+            logging.info(f"{name} thread started.")
+            time.sleep(self.buffer_time)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def stop(self) -> None:
+        try:
+            self.stopped = True
+            self._stop_event.set()
+            logging.info(f"{type(self).__name__} thread stop requested.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _run(self, interval_sec: float) -> None:
+        try:
+            while not self.stopped:
+                self.capture_once()
+                if self.exhausted:
+                    logging.info(f"{type(self).__name__} exhausted.")
+                    break
+                self._pace(interval_sec)
+        except Exception as e:
+            logging.error(f"Error in {type(self).__name__} thread: {e}")
+            raise CustomException(e, sys) from e
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    Platform-independent frame producer that feeds a FrameRing.
+
+    Mirrors the WindowCapture threading interface (start / stop / ring) so the
+    vision pipeline can be exercised on Linux without a game window.
+
+    By default it renders a noisy background with a bright square moving left
+    to right. Pass `generator(index, out)` to draw custom content into `out`.
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int, int] = (1366, 769),
+        generator: Optional[Callable[[int, np.ndarray], None]] = None,
+        ring_slots: int = 8,
+        seed: int = 42,
+        detect_changes: bool = True,
+    ) -> None:
+        try:
+            super().__init__(size, ring_slots, detect_changes)
+            self.generator = generator or self._default_generator
+            self.frames_generated: int = 0
+
+            rng = np.random.default_rng(seed)
+            self._background: np.ndarray = rng.integers(0, 40, size=(self.h, self.w, 3), dtype=np.uint8)
+            self._canvas: np.ndarray = np.empty_like(self._background)
+
+            logging.info(f"SyntheticFrameSource initialized ({self.w}x{self.h}).")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _default_generator(self, index: int, out: np.ndarray) -> None:
+        """Noisy background plus a 40x40 white square sweeping across the frame."""
+        np.copyto(out, self._background)
+        side = 40
+        x = (index * 7) % max(1, self.w - side)
+        y = self.h // 2 - side // 2
+        out[y:y + side, x:x + side] = 255
+
+    def capture_once(self) -> int:
+        """Render one frame into the ring (synchronously). Returns its sequence id."""
+        try:
+            self.generator(self.frames_generated, self._canvas)
+            self.frames_generated += 1
+            return self.ring.write(self._canvas)
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -0,0 +1,305 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Lock
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from components.vision.change_detector import ChangeGate, FrameChange
+from components.vision.derived_frame import DerivedFrame
+from components.vision.detections import EMPTY_DETECTIONS, Detections
+from components.vision.frame_buffer import Frame, FrameRing
+from components.vision.region_registry import RegionRegistry
+from components.vision.stage_signal import StageSignal
+from components.vision.template_matcher import TemplateMatcher
+from exception import CustomException
+from logger import logging
+
+
+class MultiTemplateDetector:
+    """
+    Template detector for several templates on a single background thread.
+
+    Each frame is converted to grayscale once (in the frame's shared
+    DerivedFrame cache) and every template is matched against that same
+    image, so adding a template costs one matchTemplate, not one more thread
+    and two more frame copies. With max_workers > 1 the
+    matches fan out to a bounded thread pool (OpenCV releases the GIL).
+
+    Templates with a "region" key search only that RegionRegistry region
+    (resolved once per window geometry, matched on a zero-copy slice).
+
+    With frame change records (frame.change), a template whose search area
+    did not change since its last match keeps its previous results, and blank
+    frames give empty results without matching; see skip_stats().
+
+    Same threading interface as ObjectDetector:
+
+    Usage:
+        detector = MultiTemplateDetector(template_config_list, max_workers=2, regions=regions)
+        detector.attach(wincap.ring)
+        detector.start()
+
+        dets = detector.get_detections()             # read-only {name: Detections}, no copy
+        rune = dets["rune"].best()
+        coords = detector.get_coordinates("rune")    # legacy List[Dict]
+    """
+
+    def __init__(
+        self,
+        template_config_list: List[Dict],
+        max_workers: int = 1,
+        sleep_interval: float = 0.1,
+        regions: Optional[RegionRegistry] = None,
+    ) -> None:
+        try:
+            self.lock: Lock = Lock()
+            self.stopped: bool = True
+
+            self.input_signal: StageSignal = StageSignal("multi-detector-input")
+            self.result_signal: StageSignal = StageSignal("multi-detector-results")
+            self._source: Optional[FrameRing] = None
+
+            # max time the worker blocks waiting for a new frame before re-checking `stopped`
+            self.sleep_interval: float = sleep_interval
+
+            self.matchers: Dict[str, TemplateMatcher] = {}
+            for config in template_config_list:
+                matcher = TemplateMatcher.from_config(config)
+                if matcher.name in self.matchers:
+                    raise ValueError(f"Duplicate template name: {matcher.name}")
+                self.matchers[matcher.name] = matcher
+
+            self.regions: Optional[RegionRegistry] = regions
+            for matcher in self.matchers.values():
+                if matcher.region is not None and regions is None:
+                    raise ValueError(f"Template '{matcher.name}' uses region '{matcher.region}' but no RegionRegistry was given")
+
+            # one skip decision per template: each searches its own area
+            self.change_gates: Dict[str, ChangeGate] = {name: ChangeGate(name) for name in self.matchers}
+
+            self.max_workers: int = max(1, min(max_workers, len(self.matchers)))
+            self._pool: Optional[ThreadPoolExecutor] = None
+
+            self._frame: Optional[Frame] = None
+            # published snapshot; replaced (never mutated) on every frame
+            self._detections: Mapping[str, Detections] = MappingProxyType(
+                {name: EMPTY_DETECTIONS for name in self.matchers}
+            )
+
+            self._last_seq: int = 0
+            self._coords_seq: int = 0
+
+            logging.info(
+                f"MultiTemplateDetector initialized with templates {list(self.matchers)} "
+                f"(max_workers={self.max_workers})."
+            )
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _bind_regions(self, width: int, height: int) -> None:
+        """Point region-bound matchers at their rect for this window geometry (cached lookup)."""
+        if self.regions is None:
+            return
+        for matcher in self.matchers.values():
+            if matcher.region is not None:
+                matcher.set_roi(self.regions.get(matcher.region, width, height).rect)
+
+    def detect(
+        self,
+        img_gray: np.ndarray,
+        frame_seq: int = 0,
+        derived: Optional[DerivedFrame] = None,
+        change: Optional[FrameChange] = None,
+    ) -> Mapping[str, Detections]:
+        """
+        Match every template against one grayscale image (`derived.gray()` if
+        given). With the frame's `change` record, templates whose search area
+        is unchanged keep their previous results and blank frames match nothing.
+        """
+        try:
+            self._bind_regions(img_gray.shape[1], img_gray.shape[0])
+
+            results: Dict[str, Detections] = dict(self._detections)
+            todo: Dict[str, TemplateMatcher] = {}
+            for name, m in self.matchers.items():
+                decision = self.change_gates[name].check(change, m.roi)
+                if decision == ChangeGate.PROCESS:
+                    todo[name] = m
+                elif decision == ChangeGate.BLANK:
+                    results[name] = EMPTY_DETECTIONS
+
+            if self._pool is None or len(todo) < 2:
+                results.update({name: m.match(img_gray, frame_seq, derived) for name, m in todo.items()})
+            else:
+                futures = {name: self._pool.submit(m.match, img_gray, frame_seq, derived) for name, m in todo.items()}
+                results.update({name: f.result() for name, f in futures.items()})
+            for name in todo:
+                self.change_gates[name].processed(change)
+            return MappingProxyType(results)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def update(self, frame: Frame) -> None:
+        """
+        Update the latest frame (pinned BGR Frame from the capture ring).
+        This is thread-safe.
+        """
+        try:
+            with self.lock:
+                if self._frame is not None and frame.seq <= self._frame.seq:
+                    return
+                previous, self._frame = self._frame, frame.retain()
+            self.input_signal.publish(frame.seq)
+            if previous is not None:
+                previous.release()
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def attach(self, ring: FrameRing) -> None:
+        """Follow a capture ring directly instead of update(). Call before start()."""
+        try:
+            self._source = ring
+            logging.info("MultiTemplateDetector attached to frame ring.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _acquire_frame(self) -> Optional[Frame]:
+        """Pin the newest available input frame (ring or update())."""
+        if self._source is not None:
+            return self._source.latest()
+        with self.lock:
+            return None if self._frame is None else self._frame.retain()
+
+    def get_detections(self) -> Mapping[str, Detections]:
+        """
+        Latest results as a read-only {name: Detections} mapping.
+        No copy is made; a new snapshot is published per frame.
+        """
+        try:
+            with self.lock:
+                return self._detections
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_detections_with_seq(self) -> Tuple[int, Mapping[str, Detections]]:
+        """Latest results (no copy) plus the sequence id of the frame they came from."""
+        try:
+            with self.lock:
+                return self._coords_seq, self._detections
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_coordinates(self, name: Optional[str] = None):
+        """
+        Legacy accessor: results for one template (List[Dict]) or, without a
+        name, for all templates (Dict[name, List[Dict]]).
+        """
+        try:
+            detections = self.get_detections()
+            if name is not None:
+                return detections.get(name, EMPTY_DETECTIONS).as_dicts()
+            return {k: v.as_dicts() for k, v in detections.items()}
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_coordinates_with_seq(self) -> Tuple[int, Dict[str, List[Dict[str, int]]]]:
+        """All results (legacy form) plus the sequence id of the frame they came from."""
+        try:
+            with self.lock:
+                seq, detections = self._coords_seq, self._detections
+            return seq, {k: v.as_dicts() for k, v in detections.items()}
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def skip_stats(self) -> Dict[str, Dict[str, int]]:
+        """Per template: frames matched, reused (search area unchanged) and skipped as blank."""
+        try:
+            return {name: gate.stats() for name, gate in self.change_gates.items()}
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def tracking_stats(self) -> Dict[str, Dict[str, float]]:
+        """Tracking counters for every template running in tracking mode."""
+        try:
+            return {name: m.tracking_stats() for name, m in self.matchers.items() if m.tracking}
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def start(self) -> None:
+        try:
+            with self.lock:
+                if not self.stopped:
+                    logging.warning("MultiTemplateDetector is already running.")
+                    return
+                self.stopped = False
+            self.input_signal.reopen()
+
+            if self.max_workers > 1:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="match")
+
+            t = Thread(target=self.run, daemon=True)
+            t.start()
+            logging.info("MultiTemplateDetector thread started.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def stop(self) -> None:
+        try:
+            self.stopped = True
+            self.input_signal.close()
+            logging.info("MultiTemplateDetector stop requested.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def run(self) -> None:
+        """
+        Background loop:
+        - Blocks until a frame newer than the last processed one is announced,
+        - Takes its grayscale from the frame's shared derived cache,
+        - Matches every template whose search area changed (optionally in parallel),
+        - Updates results keyed by template name and publishes `result_signal`.
+        """
+        try:
+            signal = self._source.signal if self._source is not None else self.input_signal
+
+            while not self.stopped:
+                seq = signal.wait_for(self._last_seq, timeout=self.sleep_interval)
+                if self.stopped or seq <= self._last_seq:
+                    continue
+
+                local_frame = self._acquire_frame()
+                if local_frame is None:
+                    continue
+                if local_frame.seq <= self._last_seq:
+                    local_frame.release()
+                    continue
+                self._last_seq = local_frame.seq
+
+                try:
+                    derived = local_frame.derived
+                    detections = self.detect(derived.gray(), local_frame.seq, derived, local_frame.change)
+
+                    with self.lock:
+                        self._detections = detections
+                        self._coords_seq = local_frame.seq
+                    self.result_signal.publish(local_frame.seq)
+
+                except Exception as inner_e:
+                    logging.error(f"Error during template matching: {inner_e}")
+                finally:
+                    local_frame.release()
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+        finally:
+            self.stopped = True
+            with self.lock:
+                held, self._frame = self._frame, None
+            if held is not None:
+                held.release()
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            logging.info("MultiTemplateDetector thread finished.")
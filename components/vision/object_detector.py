@@ -1,11 +1,17 @@
 import sys
-import time
 from threading import Thread, Lock
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 import cv2 as cv
 import numpy as np
 
+from components.vision.change_detector import ChangeGate
+from components.vision.derived_frame import DerivedFrame
+from components.vision.detections import EMPTY_DETECTIONS, Detections
+from components.vision.frame_buffer import Frame, FrameRing
+from components.vision.region_registry import RegionRegistry
+from components.vision.stage_signal import StageSignal
+from components.vision.template_matcher import TemplateMatcher
 from logger import logging
 from exception import CustomException
 
@@ -16,15 +22,25 @@ class ObjectDetector:
 
     Usage:
         detector = ObjectDetector(template_path="images/obj.png", threshold=0.8)
+
+        # either follow the capture ring directly (wakes on every new frame) ...
+        detector.attach(wincap.ring)
         detector.start()
 
-        while True:
-            screenshot = ...  # BGR numpy array from your WindowCapture
-            detector.update(screenshot)
+        # optionally search only a named region (zero-copy slice of each frame)
+        detector.bind_region(regions, "minimap")
+
+        # ... or start() without attach() and feed frames by hand
+        frame = wincap.ring.latest()  # pinned Frame from your WindowCapture
+        detector.update(frame)
+        frame.release()
 
-            coords = detector.get_coordinates()
-            if coords:
-                # do something with coords[0]['center_x'], coords[0]['center_y']
+        seen_seq = 0
+        while True:
+            seen_seq = detector.result_signal.wait_for(seen_seq, timeout=0.1)
+            dets = detector.get_detections()   # immutable snapshot, no copy
+            if dets:
+                # do something with dets[0]['cx'], dets[0]['cy']
                 pass
     """
 
@@ -33,36 +49,57 @@ class ObjectDetector:
         template_path: str,
         threshold: float = 0.8,
         draw_color: tuple = (0, 255, 0),
-        sleep_interval: float = 0.01,
+        sleep_interval: float = 0.1,
+        max_results: int = 10,
+        nms_iou: float = 0.3,
+        regions: Optional[RegionRegistry] = None,
+        region: Optional[str] = None,
     ):
         try:
             self.lock: Lock = Lock()
             self.stopped: bool = True
 
+            # input: published by update(); output: published when new coords are ready
+            self.input_signal: StageSignal = StageSignal("detector-input")
+            self.result_signal: StageSignal = StageSignal("detector-results")
+            self._source: Optional[FrameRing] = None
+
             self.template_path: str = template_path
             self.threshold: float = threshold
             self.draw_color: tuple = draw_color
+            # max time the worker blocks waiting for a new frame before re-checking `stopped`
             self.sleep_interval: float = sleep_interval
 
-            self._screenshot: Optional[np.ndarray] = None
-            self._coords: List[Dict[str, int]] = []
+            self._frame: Optional[Frame] = None
+            # published snapshot; replaced (never mutated) on every frame
+            self._detections: Detections = EMPTY_DETECTIONS
+
+            # sequence ids: last frame processed / frame the current results came from
+            self._last_seq: int = 0
+            self._coords_seq: int = 0
 
-            self.template_gray, self.w, self.h = self._load_template(template_path)
+            # skips frames whose search area did not change since the last match (frame.change)
+            self.change_gate: ChangeGate = ChangeGate("object-detector")
+
+            self.matcher: TemplateMatcher = TemplateMatcher(
+                name=template_path,
+                template_path=template_path,
+                threshold=threshold,
+                draw_color=draw_color,
+                max_results=max_results,
+                nms_iou=nms_iou,
+            )
+            self.template_gray = self.matcher.template_gray
+            self.w, self.h = self.matcher.w, self.matcher.h
+
+            self.regions: Optional[RegionRegistry] = None
+            if region is not None:
+                self.bind_region(regions, region)
 
             logging.info(f"ObjectDetector initialized with template: {template_path}")
         except Exception as e:
             raise CustomException(e, sys) from e
 
-    def _load_template(self, template_path: str):
-        """Load the template, convert to grayscale, and get its width and height."""
-        template_bgr = cv.imread(template_path, cv.IMREAD_COLOR)
-        if template_bgr is None:
-            raise FileNotFoundError(f"Template image not found: {template_path}")
-
-        template_gray = cv.cvtColor(template_bgr, cv.COLOR_BGR2GRAY)
-        h, w = template_gray.shape[:2]
-        return template_gray, w, h
-
     def preprocess_image(self, img_bgr: np.ndarray) -> np.ndarray:
         """
         Preprocess screenshot before matching.
@@ -76,59 +113,118 @@ class ObjectDetector:
         except Exception as e:
             raise CustomException(e, sys) from e
 
-    def _match_template(self, img_gray: np.ndarray) -> List[Dict[str, int]]:
-        """
-        Perform template matching on a grayscale image and return coordinates list.
-        """
-        result = cv.matchTemplate(img_gray, self.template_gray, cv.TM_CCOEFF_NORMED)
-        ys, xs = np.where(result >= self.threshold)
-
-        coords: List[Dict[str, int]] = []
-        for x, y in zip(xs, ys):
-            center_x = x + self.w // 2
-            center_y = y + self.h // 2
-            coords.append(
-                {
-                    "x": int(x),
-                    "y": int(y),
-                    "w": int(self.w),
-                    "h": int(self.h),
-                    "center_x": int(center_x),
-                    "center_y": int(center_y),
-                }
-            )
+    def bind_region(self, regions: Optional[RegionRegistry], name: str) -> None:
+        """Search only the named region (resolved once per window geometry)."""
+        try:
+            if regions is None:
+                raise ValueError(f"Region '{name}' given but no RegionRegistry")
+            if name not in regions.specs:
+                raise KeyError(f"Unknown region: {name}")
+            self.regions = regions
+            self.matcher.region = name
+            logging.info(f"ObjectDetector bound to region '{name}'.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _search_rect(self, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """Area searched in a width x height frame (the bound region's rect, else the matcher ROI)."""
+        if self.regions is not None and self.matcher.region is not None:
+            self.matcher.set_roi(self.regions.get(self.matcher.region, width, height).rect)
+        return self.matcher.roi
+
+    def _match_template(
+        self, img_gray: np.ndarray, frame_seq: int = 0, derived: Optional[DerivedFrame] = None
+    ) -> Detections:
+        """
+        Perform template matching on a grayscale image and return a Detections snapshot.
+        """
+        h, w = img_gray.shape[:2]
+        self._search_rect(w, h)
+        return self.matcher.match(img_gray, frame_seq, derived)
 
-        return coords
+    def skip_stats(self) -> Dict[str, int]:
+        """Frames matched, reused (search area unchanged) and skipped as blank."""
+        try:
+            return self.change_gate.stats()
+        except Exception as e:
+            raise CustomException(e, sys) from e
 
     # TODO - move to util / main 
-    def _draw_debug_rectangles(self, img_bgr: np.ndarray, coords: List[Dict[str, int]]):
+    def _draw_debug_rectangles(self, img_bgr: np.ndarray, detections: Detections):
         """Draw rectangles around detected regions to visualize the detection."""
-        for c in coords:
-            x, y, w, h = c["x"], c["y"], c["w"], c["h"]
+        for x, y, w, h in detections.boxes().tolist():
             cv.rectangle(img_bgr, (x, y), (x + w, y + h), self.draw_color, 2)
 
         cv.imshow("ObjectDetector Debug", img_bgr)
         cv.waitKey(1)
 
-    def update(self, screenshot: np.ndarray) -> None:
+    def update(self, frame: Frame) -> None:
         """
-        Update the latest screenshot (BGR image from your WindowCapture).
+        Update the latest frame (pinned BGR Frame from the capture ring).
+        The detector keeps its own pin instead of copying pixels.
         This is thread-safe.
         """
         try:
             with self.lock:
-                self._screenshot = screenshot.copy()
+                # Same frame as before (or older): nothing new for the worker
+                if self._frame is not None and frame.seq <= self._frame.seq:
+                    return
+                previous, self._frame = self._frame, frame.retain()
+            self.input_signal.publish(frame.seq)
+            if previous is not None:
+                previous.release()
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def attach(self, ring: FrameRing) -> None:
+        """
+        Follow a capture ring directly: the worker wakes on the ring's signal
+        and pins the newest frame itself, so update() is no longer needed.
+        Call before start().
+        """
+        try:
+            self._source = ring
+            logging.info("ObjectDetector attached to frame ring.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _acquire_frame(self) -> Optional[Frame]:
+        """Pin the newest available input frame (ring or update())."""
+        if self._source is not None:
+            return self._source.latest()
+        with self.lock:
+            return None if self._frame is None else self._frame.retain()
+
+    def get_detections(self) -> Detections:
+        """
+        Latest detection results as an immutable Detections snapshot.
+        No copy is made; the detector publishes a new object per frame.
+        """
+        try:
+            with self.lock:
+                return self._detections
         except Exception as e:
             raise CustomException(e, sys) from e
 
     def get_coordinates(self) -> List[Dict[str, int]]:
         """
-        Safely retrieve the latest detection results.
-        Returns a shallow copy of the internal list to avoid race conditions.
+        Legacy accessor: latest detection results as a list of dicts
+        (x, y, w, h, center_x, center_y, score).
+        """
+        try:
+            return self.get_detections().as_dicts()
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_coordinates_with_seq(self) -> Tuple[int, List[Dict[str, int]]]:
+        """
+        Same as get_coordinates(), plus the sequence id of the frame the
+        results were computed from (0 if nothing was processed yet).
         """
         try:
             with self.lock:
-                return list(self._coords)
+                seq, detections = self._coords_seq, self._detections
+            return seq, detections.as_dicts()
         except Exception as e:
             raise CustomException(e, sys) from e
 
@@ -142,6 +238,7 @@ class ObjectDetector:
                     logging.warning("ObjectDetector is already running.")
                     return
                 self.stopped = False
+            self.input_signal.reopen()
 
             t = Thread(target=self.run, daemon=True)
             t.start()
@@ -155,6 +252,7 @@ class ObjectDetector:
         """
         try:
             self.stopped = True
+            self.input_signal.close()
             logging.info("ObjectDetector stop requested.")
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -162,40 +260,62 @@ class ObjectDetector:
     def run(self) -> None:
         """
         Background loop:
-        - Takes latest screenshot (if any),
-        - Preprocesses,
-        - Runs template matching,
-        - Updates latest coordinates.
+        - Blocks until its input signal announces a frame newer than the last processed one,
+        - Reuses the previous results if the search area did not change since the
+          last matched frame (empty results on blank frames),
+        - Otherwise takes the frame's grayscale from its shared derived cache
+          (computed once per frame) and runs template matching,
+        - Updates latest coordinates and publishes `result_signal`.
         """
         try:
-            while not self.stopped:
-                local_img = None
+            signal = self._source.signal if self._source is not None else self.input_signal
 
-                # Copy screenshot under lock, then release lock while processing
-                with self.lock:
-                    if self._screenshot is not None:
-                        local_img = self._screenshot.copy()
+            while not self.stopped:
+                seq = signal.wait_for(self._last_seq, timeout=self.sleep_interval)
+                if self.stopped or seq <= self._last_seq:
+                    continue
+
+                # Pin the frame, then process it without holding the lock
+                local_frame = self._acquire_frame()
+                if local_frame is not None:
+                    if local_frame.seq <= self._last_seq:
+                        local_frame.release()
+                        continue
+                    self._last_seq = local_frame.seq
 
-                if local_img is not None:
                     try:
-                        img_gray = self.preprocess_image(local_img)
-                        coords = self._match_template(img_gray)
+                        h, w = local_frame.shape[:2]
+                        decision = self.change_gate.check(local_frame.change, self._search_rect(w, h))
+                        if decision == ChangeGate.PROCESS:
+                            derived = local_frame.derived
+                            detections = self._match_template(derived.gray(), local_frame.seq, derived)
+                            self.change_gate.processed(local_frame.change)
+                        elif decision == ChangeGate.BLANK:
+                            detections = EMPTY_DETECTIONS
+                        else:
+                            detections = self._detections
 
                         # if self.debug:
                         #     debug_img = local_img.copy()
-                        #     self._draw_debug_rectangles(debug_img, coords)
+                        #     self._draw_debug_rectangles(debug_img, detections)
 
-                        # Save results
+                        # Publish results
                         with self.lock:
-                            self._coords = coords
+                            self._detections = detections
+                            self._coords_seq = local_frame.seq
+                        self.result_signal.publish(local_frame.seq)
 
                     except Exception as inner_e:
                         logging.error(f"Error during template matching: {inner_e}")
-
-                time.sleep(self.sleep_interval)
+                    finally:
+                        local_frame.release()
 
         except Exception as e:
             raise CustomException(e, sys) from e
         finally:
             self.stopped = True
+            with self.lock:
+                held, self._frame = self._frame, None
+            if held is not None:
+                held.release()
             logging.info("ObjectDetector thread finished.")
@@ -0,0 +1,133 @@
+from typing import Optional, Sequence, Tuple
+
+import cv2 as cv
+import numpy as np
+
+
+def find_peaks(
+    score_map: np.ndarray,
+    threshold: float,
+    neighborhood: Tuple[int, int] = (3, 3),
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized local-maximum extraction on a matchTemplate score map.
+
+    A pixel is a peak if it is >= threshold and equal to the maximum of its
+    (w, h) neighborhood. Returns (xs, ys, scores) sorted by descending score.
+    """
+    kw = max(1, int(neighborhood[0])) | 1
+    kh = max(1, int(neighborhood[1])) | 1
+
+    above = score_map >= threshold
+    if not above.any():
+        empty = np.empty(0, dtype=np.int32)
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    dilated = cv.dilate(score_map, np.ones((kh, kw), np.uint8))
+    ys, xs = np.nonzero(above & (score_map >= dilated))
+    scores = score_map[ys, xs]
+
+    order = np.argsort(-scores, kind="stable")
+    return xs[order].astype(np.int32), ys[order].astype(np.int32), scores[order].astype(np.float32)
+
+
+def nms_boxes(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    iou_threshold: float = 0.3,
+    max_results: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Greedy non-max suppression over (N, 4) [x, y, w, h] boxes.
+
+    Each step keeps the best remaining box and drops every box overlapping it
+    by more than iou_threshold, all in array ops. Returns kept indices sorted
+    by descending score, capped at max_results.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    boxes = np.asarray(boxes, dtype=np.float32)
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    limit = len(order) if max_results is None else max_results
+    keep = []
+
+    while order.size > 0 and len(keep) < limit:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.intp)
+
+
+def nms_boxes_batched(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_ids: np.ndarray,
+    iou_threshold: float = 0.3,
+    max_results: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Class-wise non-max suppression: boxes only suppress boxes of their own class.
+
+    Every class is shifted to its own coordinate range (offset by class id
+    times the largest coordinate), so a single nms_boxes() pass never sees
+    overlaps across classes. Returns kept indices sorted by descending score.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    boxes = np.asarray(boxes, dtype=np.float32)
+    span = float((boxes[:, :2] + boxes[:, 2:]).max()) + 1.0
+    shifted = boxes.copy()
+    shifted[:, :2] += (np.asarray(class_ids, dtype=np.float32) * span)[:, None]
+    return nms_boxes(shifted, scores, iou_threshold, max_results)
+
+
+def decode_yolo(
+    outputs: Sequence[np.ndarray],
+    score_threshold: float,
+    width: int,
+    height: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized decode of YOLO head outputs from cv.dnn.
+
+    Each output is (N, 5 + C): normalized cx, cy, w, h, objectness, class
+    scores. Rows whose best class score is above score_threshold are kept
+    (argmax runs on those rows only) and their boxes are scaled to
+    width x height. Returns (M, 4) int32 [x, y, w, h] boxes, (M,) float32
+    scores and (M,) int64 class ids, rounded exactly like the old per-row loop.
+    """
+    box_parts, score_parts, class_parts = [], [], []
+    for out in outputs:
+        out = out.reshape(-1, out.shape[-1])
+        class_scores = out[:, 5:]
+        rows = np.flatnonzero(class_scores.max(axis=1) > score_threshold)
+        if len(rows) == 0:
+            continue
+        class_ids = class_scores[rows].argmax(axis=1)
+        score_parts.append(class_scores[rows, class_ids])
+        class_parts.append(class_ids)
+        box_parts.append(out[rows, :4])
+
+    if not box_parts:
+        return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    xywh = np.concatenate(box_parts).astype(np.float64) * np.array([width, height, width, height], dtype=np.float64)
+    boxes = np.empty((len(xywh), 4), dtype=np.int32)
+    boxes[:, 0] = xywh[:, 0] - np.floor_divide(xywh[:, 2], 2)
+    boxes[:, 1] = xywh[:, 1] - np.floor_divide(xywh[:, 3], 2)
+    boxes[:, 2:] = xywh[:, 2:]
+    return boxes, np.concatenate(score_parts).astype(np.float32), np.concatenate(class_parts).astype(np.int64)
@@ -0,0 +1,145 @@
+import sys
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from exception import CustomException
+from logger import logging
+from utils import read_yaml_file
+
+
+ANCHORS: Tuple[str, ...] = ("top_left", "top_right", "bottom_left", "bottom_right", "top", "center")
+
+
+@dataclass(frozen=True)
+class Region:
+    name: str
+    x: int
+    y: int
+    w: int
+    h: int
+
+    @property
+    def rect(self) -> Tuple[int, int, int, int]:
+        return self.x, self.y, self.w, self.h
+
+    def crop(self, img: np.ndarray) -> np.ndarray:
+        """Zero-copy view of this region of `img`."""
+        return img[self.y:self.y + self.h, self.x:self.x + self.w]
+
+
+@dataclass(frozen=True)
+class RegionSpec:
+    name: str
+    rect: Tuple[int, int, int, int]
+    anchor: str = "top_left"
+    scale: bool = False
+
+
+class RegionRegistry:
+    """
+    Named screen regions (minimap, buff bar, rune arrow prompt, ...).
+
+    Specs are given at a reference window size; resolve() maps them onto the
+    actual window geometry once and caches the result per (width, height),
+    so per-frame lookups are a dict hit. Consumers bind to a region name and
+    crop frames with Region.crop() (a view, never a copy).
+
+    Usage:
+        regions = RegionRegistry.from_yaml(constants.REGION_CONFIG_PATH)
+        minimap = regions.get("minimap", frame_w, frame_h)
+        view = minimap.crop(frame.image)
+    """
+
+    def __init__(self, specs: List[RegionSpec], reference_size: Tuple[int, int] = (1366, 769)) -> None:
+        try:
+            self.reference_size: Tuple[int, int] = reference_size
+            self.specs: Dict[str, RegionSpec] = {}
+            for spec in specs:
+                if spec.anchor not in ANCHORS:
+                    raise ValueError(f"Unknown anchor '{spec.anchor}' for region '{spec.name}'")
+                self.specs[spec.name] = spec
+
+            self._lock: Lock = Lock()
+            self._resolved: Dict[Tuple[int, int], Dict[str, Region]] = {}
+
+            logging.info(f"RegionRegistry initialized with regions {list(self.specs)}.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @classmethod
+    def from_yaml(cls, path: str) -> "RegionRegistry":
+        try:
+            config = read_yaml_file(path)
+            ref_w, ref_h = config.get("reference_size", (1366, 769))
+            specs = [
+                RegionSpec(
+                    name=name,
+                    rect=tuple(int(v) for v in entry["rect"]),
+                    anchor=entry.get("anchor", "top_left"),
+                    scale=bool(entry.get("scale", False)),
+                )
+                for name, entry in (config.get("regions") or {}).items()
+            ]
+            return cls(specs, reference_size=(int(ref_w), int(ref_h)))
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def names(self) -> List[str]:
+        return list(self.specs)
+
+    def _resolve_spec(self, spec: RegionSpec, width: int, height: int) -> Region:
+        ref_w, ref_h = self.reference_size
+        x, y, w, h = spec.rect
+
+        if spec.scale:
+            sx, sy = width / ref_w, height / ref_h
+            x, y, w, h = round(x * sx), round(y * sy), round(w * sx), round(h * sy)
+        else:
+            dx, dy = width - ref_w, height - ref_h
+            if spec.anchor in ("top_right", "bottom_right"):
+                x += dx
+            elif spec.anchor in ("top", "center"):
+                x += dx // 2
+            if spec.anchor in ("bottom_left", "bottom_right"):
+                y += dy
+            elif spec.anchor == "center":
+                y += dy // 2
+
+        # Clip to the window
+        x1, y1 = max(0, min(x, width)), max(0, min(y, height))
+        x2, y2 = max(0, min(x + w, width)), max(0, min(y + h, height))
+        return Region(spec.name, x1, y1, x2 - x1, y2 - y1)
+
+    def resolve(self, width: int, height: int) -> Dict[str, Region]:
+        """All regions for a window of (width, height); computed once per geometry."""
+        try:
+            key = (int(width), int(height))
+            with self._lock:
+                resolved = self._resolved.get(key)
+                if resolved is None:
+                    resolved = {name: self._resolve_spec(spec, *key) for name, spec in self.specs.items()}
+                    self._resolved[key] = resolved
+                    logging.debug(f"RegionRegistry resolved for {key}: {resolved}")
+                return resolved
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get(self, name: str, width: int, height: int) -> Region:
+        try:
+            region: Optional[Region] = self.resolve(width, height).get(name)
+            if region is None:
+                raise KeyError(f"Unknown region: {name}")
+            return region
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def crop(self, name: str, img: np.ndarray) -> Tuple[np.ndarray, Region]:
+        """Zero-copy view of region `name` in `img`, plus the resolved Region."""
+        try:
+            region = self.get(name, img.shape[1], img.shape[0])
+            return region.crop(img), region
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -0,0 +1,202 @@
+import sys
+import time
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from components.vision.frame_buffer import Frame
+from components.vision.stage_signal import StageSignal
+from exception import CustomException
+from logger import logging
+
+
+class ReplayRunner:
+    """
+    Drives a vision pipeline from a frame source (ReplayFrameSource,
+    SyntheticFrameSource, ...) and measures it.
+
+    `stages` maps a stage name to the StageSignal it publishes with the
+    source sequence id of every frame it finished (e.g. a detector's
+    result_signal, the preprocessor's done_signal). `on_frame(frame)` is the
+    consumer loop body (what RunTasks does per frame), run on the runner
+    thread for every published frame and timed as stage "loop".
+
+    Modes:
+    - lockstep (default): publish a frame, wait until every stage reported
+      it (or `frame_timeout`), run on_frame, publish the next one. Runs as
+      fast as the pipeline allows and every stage sees every frame.
+    - realtime: publish frames on the source's original timeline (its
+      `next_timestamp`, divided by `speed`) without waiting for the stages,
+      like live capture; stages skip frames when they fall behind.
+
+    Latency is measured per stage from the moment a frame is written into
+    the ring (its Frame.timestamp, after the source decoded it) to the moment
+    the stage publishes it.
+
+    Usage:
+        runner = ReplayRunner(source, {"detector": detector.result_signal}, on_frame=step)
+        report = runner.run()
+        print(ReplayRunner.format_report(report))
+    """
+
+    def __init__(
+        self,
+        source,
+        stages: Dict[str, StageSignal],
+        on_frame: Optional[Callable[[Frame], None]] = None,
+        realtime: bool = False,
+        speed: float = 1.0,
+        frame_timeout: float = 1.0,
+        max_frames: Optional[int] = None,
+    ) -> None:
+        try:
+            self.source = source
+            self.stages: Dict[str, StageSignal] = dict(stages)
+            self.on_frame: Optional[Callable[[Frame], None]] = on_frame
+            self.realtime: bool = realtime
+            self.speed: float = speed
+            # lockstep: max time to wait for a stage before moving on (counted as a timeout)
+            self.frame_timeout: float = frame_timeout
+            self.max_frames: Optional[int] = max_frames
+
+            self._lock: Lock = Lock()
+            # ring sequence id -> the frame's ring timestamp (perf_counter when it was written)
+            self._written: Dict[int, float] = {}
+            # (seq, perf_counter) per stage publish; matched with _written in the report,
+            # since a fast stage may publish a frame before the runner has looked at it
+            self._published: Dict[str, List[Tuple[int, float]]] = {name: [] for name in self.stages}
+            self._loop_latencies: List[float] = []
+            self._timeouts: Dict[str, int] = {name: 0 for name in self.stages}
+            self._done: bool = False
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _watch(self, name: str, signal: StageSignal) -> None:
+        """Record the latency of every sequence id `signal` publishes."""
+        last = signal.seq
+        while not self._done:
+            seq = signal.wait_for(last, timeout=0.1)
+            if seq <= last:
+                continue
+            now = time.perf_counter()
+            last = seq
+            with self._lock:
+                self._published[name].append((seq, now))
+
+    def _wait_stages(self, seq: int) -> None:
+        """Lockstep: block until every stage has published `seq` (or timed out)."""
+        deadline = time.perf_counter() + self.frame_timeout
+        for name, signal in self.stages.items():
+            while signal.seq < seq:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or signal.closed:
+                    self._timeouts[name] += 1
+                    break
+                signal.wait_for(seq - 1, timeout=remaining)
+
+    def run(self) -> Dict[str, Any]:
+        """Replay until the source is exhausted (or `max_frames`); returns the report."""
+        try:
+            self._done = False
+            watchers = [
+                Thread(target=self._watch, args=(name, signal), daemon=True) for name, signal in self.stages.items()
+            ]
+            for t in watchers:
+                t.start()
+
+            ring = self.source.ring
+            frames, dropped = 0, 0
+            clock_start: Optional[float] = None
+            first_timestamp: Optional[float] = None
+            start = time.perf_counter()
+            try:
+                while self.max_frames is None or frames < self.max_frames:
+                    if self.realtime:
+                        due = self.source.next_timestamp
+                        if due is None:
+                            break
+                        if clock_start is None:
+                            clock_start, first_timestamp = time.perf_counter(), due
+                        delay = clock_start + (due - first_timestamp) / self.speed - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+
+                    seq = self.source.capture_once()
+                    if seq == 0:
+                        if self.source.exhausted:
+                            break
+                        dropped += 1
+                        continue
+                    frames += 1
+                    # single writer: the newest frame is the one just published
+                    frame = ring.latest()
+                    if frame is None:
+                        continue
+                    try:
+                        with self._lock:
+                            self._written[seq] = frame.timestamp
+
+                        if not self.realtime:
+                            self._wait_stages(seq)
+                        if self.on_frame is not None:
+                            self.on_frame(frame)
+                            self._loop_latencies.append(time.perf_counter() - frame.timestamp)
+                    finally:
+                        frame.release()
+            finally:
+                elapsed = time.perf_counter() - start
+                # let the stages publish the last frame before the watchers stop
+                if self.realtime:
+                    self._wait_stages(ring.latest_seq)
+                self._done = True
+                for t in watchers:
+                    t.join(1.0)
+
+            return self._report(frames, dropped + ring.dropped, elapsed)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _report(self, frames: int, dropped: int, elapsed: float) -> Dict[str, Any]:
+        latencies: Dict[str, List[float]] = {
+            name: [now - self._written[seq] for seq, now in published if seq in self._written]
+            for name, published in self._published.items()
+        }
+        if self.on_frame is not None:
+            latencies["loop"] = self._loop_latencies
+
+        stages: Dict[str, Dict[str, float]] = {}
+        for name, values in latencies.items():
+            lat = np.asarray(values) * 1000.0
+            stages[name] = {
+                "frames": len(lat),
+                "mean_ms": float(lat.mean()) if len(lat) else float("nan"),
+                "p50_ms": float(np.percentile(lat, 50)) if len(lat) else float("nan"),
+                "p95_ms": float(np.percentile(lat, 95)) if len(lat) else float("nan"),
+                "max_ms": float(lat.max()) if len(lat) else float("nan"),
+                "timeouts": self._timeouts.get(name, 0),
+            }
+        report = {
+            "mode": "realtime" if self.realtime else "lockstep",
+            "frames": frames,
+            "dropped": dropped,
+            "seconds": elapsed,
+            "fps": frames / elapsed if elapsed > 0 else 0.0,
+            "stages": stages,
+        }
+        logging.info(f"Replay finished: {frames} frames in {elapsed:.2f}s ({report['fps']:.1f} fps).")
+        return report
+
+    @staticmethod
+    def format_report(report: Dict[str, Any]) -> str:
+        """Human-readable summary of a run() report."""
+        lines = [
+            f"{report['mode']}: {report['frames']} frames in {report['seconds']:.2f}s "
+            f"= {report['fps']:.1f} fps ({report['dropped']} dropped)"
+        ]
+        for name, s in report["stages"].items():
+            lines.append(
+                f"  {name:>12}: {s['frames']:6d} results  latency mean {s['mean_ms']:7.2f} ms  "
+                f"p50 {s['p50_ms']:7.2f}  p95 {s['p95_ms']:7.2f}  max {s['max_ms']:7.2f}  timeouts {s['timeouts']}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,208 @@
+import glob
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.frame_source import FrameSource
+from components.vision.session_reader import SessionReader
+from components.vision.session_recorder import MANIFEST_FILE
+from exception import CustomException
+from logger import logging
+
+
+IMAGE_EXTENSIONS: Tuple[str, ...] = (".png", ".jpg", ".jpeg", ".bmp")
+
+KIND_SESSION: str = "session"
+KIND_IMAGES: str = "images"
+KIND_VIDEO: str = "video"
+
+
+class ReplayFrameSource(FrameSource):
+    """
+    Frame source that replays recorded frames into a FrameRing.
+
+    `path` may be:
+    - a session directory written by SessionRecorder (original timestamps,
+      screen offset from its metadata; frames are ring-copied straight from
+      the session's memory mapping),
+    - a folder of images (.png / .jpg / .bmp, sorted by name), or
+    - a video file readable by cv.VideoCapture.
+    Folders and videos without timestamps are timed at `fps` (a video's own
+    frame rate when it reports one).
+
+    Published frames are stamped with the replay-time perf_counter, like live
+    captures; `source_timestamp` is the original time (seconds from the first
+    frame) of the last published frame and `next_timestamp` that of the next.
+    The background thread (start()) paces frames to the original timestamps
+    divided by `speed`; capture_once() publishes the next frame immediately.
+
+    Usage:
+        source = ReplayFrameSource("artifacts/sessions/20240101_120000")
+        tasks = RunTasks(source=source)               # instead of a WindowCapture
+
+        source = ReplayFrameSource("clips/rune.mp4", loop=True)
+        while source.capture_once():                  # as fast as possible
+            ...
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fps: float = 30.0,
+        speed: float = 1.0,
+        loop: bool = False,
+        ring_slots: int = 8,
+        detect_changes: bool = True,
+    ) -> None:
+        try:
+            super().__init__((0, 0), ring_slots, detect_changes)
+            self.path: str = path
+            self.fps: float = fps
+            self.speed: float = speed
+            self.loop: bool = loop
+
+            self.session: Optional[SessionReader] = None
+            self._images: List[str] = []
+            self._video: Optional[cv.VideoCapture] = None
+            self._canvas: Optional[np.ndarray] = None
+            self._offset: Tuple[int, int] = (0, 0)
+
+            if os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE)):
+                self.kind: str = KIND_SESSION
+                self.session = SessionReader(path)
+                self._length: int = len(self.session)
+                self._timestamps: np.ndarray = np.asarray(self.session.timestamps, dtype=np.float64)
+                offset = self.session.metadata.get("screen_offset")
+                if offset is not None:
+                    self._offset = (int(offset[0]), int(offset[1]))
+            elif os.path.isdir(path):
+                self.kind = KIND_IMAGES
+                self._images = sorted(
+                    p for p in glob.glob(os.path.join(path, "*")) if p.lower().endswith(IMAGE_EXTENSIONS)
+                )
+                self._length = len(self._images)
+                self._timestamps = np.arange(self._length, dtype=np.float64) / fps
+            elif os.path.isfile(path):
+                self.kind = KIND_VIDEO
+                self._video = cv.VideoCapture(path)
+                if not self._video.isOpened():
+                    raise ValueError(f"Cannot open video: {path}")
+                video_fps = self._video.get(cv.CAP_PROP_FPS)
+                if video_fps and video_fps > 0:
+                    self.fps = float(video_fps)
+                # frame count is only a hint for some containers; playback runs until read() fails
+                self._length = int(self._video.get(cv.CAP_PROP_FRAME_COUNT))
+                self._timestamps = np.empty(0, dtype=np.float64)
+            else:
+                raise FileNotFoundError(f"Nothing to replay at: {path}")
+
+            if self.kind != KIND_VIDEO and self._length == 0:
+                raise ValueError(f"No frames to replay in: {path}")
+
+            self.index: int = 0
+            self.frames_replayed: int = 0
+            self.source_timestamp: float = 0.0
+            self._loop_offset: float = 0.0
+            self._clock_start: Optional[float] = None
+
+            logging.info(f"ReplayFrameSource initialized ({self.kind}, {self._length} frames) from '{path}'.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def __len__(self) -> int:
+        return self._length
+
+    def get_screen_position(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        return pos[0] + self._offset[0], pos[1] + self._offset[1]
+
+    def _timestamp(self, index: int) -> float:
+        if self.kind == KIND_VIDEO:
+            return index / self.fps
+        return float(self._timestamps[index] - self._timestamps[0])
+
+    @property
+    def duration(self) -> float:
+        """Original length of one pass in seconds (plus one mean frame interval)."""
+        if self._length == 0:
+            return 0.0
+        last = self._timestamp(self._length - 1)
+        interval = last / (self._length - 1) if self._length > 1 and last > 0 else 1.0 / self.fps
+        return last + interval
+
+    @property
+    def next_timestamp(self) -> Optional[float]:
+        """Original time of the next frame (loops included), or None at the end."""
+        if self.index >= self._length and self.kind != KIND_VIDEO:
+            if not self.loop:
+                return None
+            return self._loop_offset + self.duration
+        return self._loop_offset + self._timestamp(self.index)
+
+    def rewind(self) -> None:
+        """Start over from the first frame (timestamps keep increasing when looping)."""
+        if self._video is not None:
+            self._video.set(cv.CAP_PROP_POS_FRAMES, 0)
+        self.index = 0
+        self.exhausted = False
+
+    def _read(self) -> Optional[np.ndarray]:
+        """Next frame (a view or reusable buffer; the ring copies it), or None at the end."""
+        if self.kind == KIND_SESSION:
+            return self.session.read(self.index) if self.index < self._length else None
+        if self.kind == KIND_IMAGES:
+            if self.index >= self._length:
+                return None
+            img = cv.imread(self._images[self.index], cv.IMREAD_COLOR)
+            if img is None:
+                raise ValueError(f"Cannot read image: {self._images[self.index]}")
+            return img
+        ok, frame = self._video.read(self._canvas)
+        if not ok:
+            return None
+        self._canvas = frame
+        return frame
+
+    def capture_once(self) -> int:
+        """Publish the next recorded frame. Returns its sequence id, 0 once exhausted."""
+        try:
+            if self.exhausted:
+                return 0
+            img = self._read()
+            if img is None and self.loop and self.index > 0:
+                self._loop_offset += self.duration if self.kind != KIND_VIDEO else self.index / self.fps
+                self.rewind()
+                img = self._read()
+            if img is None:
+                self.exhausted = True
+                logging.info(f"ReplayFrameSource reached the end after {self.frames_replayed} frames.")
+                return 0
+
+            self.source_timestamp = self._loop_offset + self._timestamp(self.index)
+            self.h, self.w = img.shape[:2]
+            self.index += 1
+            self.frames_replayed += 1
+            return self.ring.write(img)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _pace(self, interval_sec: float) -> None:
+        """Sleep until the next frame is due on the original timeline (scaled by `speed`)."""
+        now = time.perf_counter()
+        if self._clock_start is None:
+            # anchor the replay clock on the frame just published
+            self._clock_start = now - self.source_timestamp / self.speed
+        due = self.next_timestamp
+        if due is None:
+            return
+        delay = self._clock_start + due / self.speed - now
+        if delay > 0:
+            self._stop_event.wait(delay)
+
+    def start(self, interval_sec: float = 0.0) -> None:
+        """Replay in the background, paced to the original timestamps (`interval_sec` is unused)."""
+        self._clock_start = None
+        super().start(interval_sec)
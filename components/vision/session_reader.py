@@ -0,0 +1,190 @@
+import json
+import os
+import sys
+import zlib
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from components.vision.detections import Detections
+from components.vision.session_recorder import (
+    CODEC_DELTA,
+    CODEC_DELTA_ZLIB,
+    CODEC_RAW,
+    DETECTION_INDEX_FILE,
+    DETECTION_RECORD_DTYPE,
+    FRAME_INDEX_FILE,
+    FRAME_RECORD_DTYPE,
+    MANIFEST_FILE,
+    SESSION_VERSION,
+    TILE_INDEX_FILE,
+    TILE_RECORD_DTYPE,
+    TILE_ZLIB,
+    tile_grid,
+)
+from exception import CustomException
+from logger import logging
+
+
+def _map_records(path: str, dtype: np.dtype) -> np.ndarray:
+    """Read-only memmap of an append-only record file (whole records only; empty if missing)."""
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=dtype)
+    count = os.path.getsize(path) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class SessionReader:
+    """
+    Reads a session written by SessionRecorder.
+
+    Index files and chunks are memory-mapped, nothing is loaded up front.
+    For codec "raw", read(i) returns a read-only view straight into the
+    chunk mapping (no copy, no decode). Tiled codecs decode into one
+    reusable canvas per geometry, so the returned array is only valid until
+    the next read(); delta sessions decode forward from the nearest keyframe
+    (sequential reads only apply the new frame's changed tiles).
+
+    Sessions whose recorder did not shut down cleanly are readable up to the
+    last whole frame record (`complete` is False).
+
+    Usage:
+        session = SessionReader("artifacts/sessions/run1")
+        for record, image in session:                      # record: FRAME_RECORD_DTYPE row
+            ...
+        image = session.read(100)
+        dets = session.detections(session.records[100]["seq"])   # {stage: {label: Detections}}
+    """
+
+    def __init__(self, directory: str) -> None:
+        try:
+            self.directory: str = directory
+            with open(os.path.join(directory, MANIFEST_FILE), "r") as file:
+                self.manifest: Dict[str, Any] = json.load(file)
+            if self.manifest.get("version") != SESSION_VERSION:
+                raise ValueError(f"Unsupported session version {self.manifest.get('version')} in {directory}")
+
+            self.codec: str = self.manifest["codec"]
+            self.tile_size: Tuple[int, int] = tuple(self.manifest["tile_size"])
+            self.complete: bool = bool(self.manifest.get("complete", False))
+            self.metadata: Dict[str, Any] = self.manifest.get("metadata", {})
+            self.stages: List[str] = self.manifest.get("stages", [])
+            self.labels: List[str] = self.manifest.get("labels", [])
+
+            self.records: np.ndarray = _map_records(os.path.join(directory, FRAME_INDEX_FILE), FRAME_RECORD_DTYPE)
+            self.tiles: np.ndarray = _map_records(os.path.join(directory, TILE_INDEX_FILE), TILE_RECORD_DTYPE)
+            detections = _map_records(os.path.join(directory, DETECTION_INDEX_FILE), DETECTION_RECORD_DTYPE)
+            # stable sort by frame so per-frame lookups are one searchsorted
+            self._detections: np.ndarray = detections[np.argsort(detections["seq"], kind="stable")]
+
+            self._chunks: Dict[int, np.memmap] = {}
+            self._canvas: Optional[np.ndarray] = None
+            self._canvas_index: int = -1
+            self._grids: Dict[Tuple[int, int], np.ndarray] = {}
+
+            logging.info(
+                f"SessionReader opened '{directory}': {len(self.records)} frames, codec {self.codec}"
+                f"{'' if self.complete else ' (incomplete)'}."
+            )
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Tuple[np.void, np.ndarray]]:
+        for i in range(len(self.records)):
+            yield self.records[i], self.read(i)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.records["timestamp"]
+
+    def _chunk(self, index: int) -> np.memmap:
+        chunk = self._chunks.get(index)
+        if chunk is None:
+            path = os.path.join(self.directory, self.manifest["chunks"][index])
+            chunk = np.memmap(path, dtype=np.uint8, mode="r")
+            self._chunks[index] = chunk
+        return chunk
+
+    @staticmethod
+    def _shape(record: np.void) -> Tuple[int, ...]:
+        h, w, c = int(record["height"]), int(record["width"]), int(record["channels"])
+        return (h, w) if c == 1 else (h, w, c)
+
+    def read(self, index: int) -> np.ndarray:
+        """Frame `index` as a read-only array (a chunk view for raw sessions, else the decode canvas)."""
+        try:
+            record = self.records[index]
+            shape = self._shape(record)
+            if self.codec == CODEC_RAW:
+                chunk = self._chunk(int(record["chunk"]))
+                return np.ndarray(shape, dtype=np.uint8, buffer=chunk, offset=int(record["offset"]))
+
+            if self._canvas is None or self._canvas.shape != shape:
+                self._canvas = np.zeros(shape, dtype=np.uint8)
+                self._canvas_index = -1
+
+            delta = self.codec in (CODEC_DELTA, CODEC_DELTA_ZLIB)
+            if not delta or record["keyframe"]:
+                first = index
+            elif 0 <= self._canvas_index < index and self._canvas_index >= self._keyframe_before(index):
+                first = self._canvas_index + 1
+            else:
+                first = self._keyframe_before(index)
+
+            self._canvas.flags.writeable = True
+            for i in range(first, index + 1):
+                self._apply_tiles(self.records[i])
+            self._canvas.flags.writeable = False
+            self._canvas_index = index
+            return self._canvas
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _keyframe_before(self, index: int) -> int:
+        keyframes = np.flatnonzero(self.records["keyframe"][:index + 1])
+        if not len(keyframes):
+            raise ValueError(f"No keyframe at or before frame {index}")
+        return int(keyframes[-1])
+
+    def _apply_tiles(self, record: np.void) -> None:
+        w, h = int(record["width"]), int(record["height"])
+        grid = self._grids.get((w, h))
+        if grid is None:
+            grid = self._grids[(w, h)] = tile_grid(w, h, self.tile_size)
+
+        chunk = self._chunk(int(record["chunk"]))
+        start = int(record["tile_start"])
+        channels = self._canvas.shape[2:] if self._canvas.ndim == 3 else ()
+        for tile, codec, offset, nbytes in self.tiles[start:start + int(record["tile_count"])].tolist():
+            x, y, tw, th = grid[tile].tolist()
+            payload = chunk[offset:offset + nbytes]
+            if codec == TILE_ZLIB:
+                payload = np.frombuffer(zlib.decompress(payload), dtype=np.uint8)
+            self._canvas[y:y + th, x:x + tw] = payload.reshape((th, tw) + channels)
+
+    def detections(self, seq: int) -> Mapping[str, Mapping[str, Detections]]:
+        """Recorded detections of frame `seq`: {stage: {label: Detections}} (read-only)."""
+        try:
+            lo, hi = np.searchsorted(self._detections["seq"], [seq, seq + 1])
+            rows = self._detections[lo:hi]
+            result: Dict[str, Dict[str, Detections]] = {}
+            for stage_id in np.unique(rows["stage"]).tolist():
+                stage_rows = rows[rows["stage"] == stage_id]
+                per_label = result.setdefault(self.stages[stage_id], {})
+                for label_id in np.unique(stage_rows["label"]).tolist():
+                    dets = stage_rows["det"][stage_rows["label"] == label_id]
+                    per_label[self.labels[label_id]] = Detections(dets)
+            return MappingProxyType({stage: MappingProxyType(labels) for stage, labels in result.items()})
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def close(self) -> None:
+        """Drop the chunk mappings (views returned by read() keep their own chunk alive)."""
+        self._chunks.clear()
+        self._canvas = None
@@ -0,0 +1,496 @@
+import json
+import os
+import sys
+import time
+import zlib
+from collections import deque
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+from typing import Any, BinaryIO, Deque, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from components.vision.detections import DETECTION_DTYPE, Detections
+from exception import CustomException
+from logger import logging
+
+
+SESSION_VERSION: int = 1
+MANIFEST_FILE: str = "manifest.json"
+FRAME_INDEX_FILE: str = "frames.idx"
+TILE_INDEX_FILE: str = "tiles.idx"
+DETECTION_INDEX_FILE: str = "detections.idx"
+
+# frame codecs (manifest "codec")
+CODEC_RAW: str = "raw"                # whole frame stored as is; readers get memmap views
+CODEC_ZLIB: str = "zlib"              # every tile zlib-compressed
+CODEC_DELTA: str = "delta"            # only tiles that differ from the previous frame, raw
+CODEC_DELTA_ZLIB: str = "delta+zlib"  # only changed tiles, zlib-compressed
+CODECS: Tuple[str, ...] = (CODEC_RAW, CODEC_ZLIB, CODEC_DELTA, CODEC_DELTA_ZLIB)
+
+# tile codecs (TILE_RECORD_DTYPE "codec")
+TILE_RAW: int = 0
+TILE_ZLIB: int = 1
+
+# one record per frame; tiled codecs point at `tile_count` rows of tiles.idx
+FRAME_RECORD_DTYPE: np.dtype = np.dtype(
+    [
+        ("seq", "<i8"),
+        ("timestamp", "<f8"),
+        ("width", "<i4"),
+        ("height", "<i4"),
+        ("channels", "<i4"),
+        ("chunk", "<i4"),
+        ("offset", "<i8"),
+        ("nbytes", "<i8"),
+        ("tile_start", "<i8"),
+        ("tile_count", "<i4"),
+        ("keyframe", "<i4"),
+    ]
+)
+
+TILE_RECORD_DTYPE: np.dtype = np.dtype(
+    [
+        ("tile", "<i4"),
+        ("codec", "<i4"),
+        ("offset", "<i8"),
+        ("nbytes", "<i8"),
+    ]
+)
+
+# stage / label are indices into the manifest's "stages" / "labels" tables
+DETECTION_RECORD_DTYPE: np.dtype = np.dtype(
+    [
+        ("seq", "<i8"),
+        ("stage", "<u2"),
+        ("label", "<u2"),
+        ("det", DETECTION_DTYPE),
+    ]
+)
+
+
+def tile_grid(width: int, height: int, tile_size: Tuple[int, int]) -> np.ndarray:
+    """(T, 4) [x, y, w, h] tiles covering a width x height frame, row-major (edge tiles are smaller)."""
+    tw, th = tile_size
+    return np.array(
+        [(x, y, min(tw, width - x), min(th, height - y)) for y in range(0, height, th) for x in range(0, width, tw)],
+        dtype=np.int32,
+    ).reshape(-1, 4)
+
+
+def chunk_name(index: int) -> str:
+    return f"chunk_{index:05d}.bin"
+
+
+class SessionRecorder:
+    """
+    Records captured frames, their timestamps / geometry and detector outputs
+    into a session directory for offline replay (see SessionReader).
+
+    Layout:
+        manifest.json      codec, tile size, chunk list, stage / label names, metadata
+        frames.idx         FRAME_RECORD_DTYPE per frame (append-only, memmap-able)
+        tiles.idx          TILE_RECORD_DTYPE per stored tile (tiled codecs)
+        detections.idx     DETECTION_RECORD_DTYPE per detection
+        chunk_NNNNN.bin    frame / tile payloads; a new chunk starts at
+                           `chunk_bytes` or when the frame geometry changes
+
+    codec "raw" stores whole frames so readers can map them without copying.
+    "zlib", "delta" and "delta+zlib" split frames into `tile_size` tiles:
+    zlib compresses each tile, delta stores only tiles that differ from the
+    previous frame (every `keyframe_interval` frames, and at every chunk
+    start, all tiles are stored).
+
+    The capture thread only pays for one copy per frame: submit() (called by
+    FrameRing.commit once attached) copies the frame into a free buffer of a
+    bounded pool and queues it; a background writer encodes and writes. When
+    the pool is exhausted the frame is dropped (counted in stats()) instead
+    of stalling capture.
+
+    Usage:
+        recorder = SessionRecorder(codec="delta+zlib")
+        recorder.start("artifacts/sessions/run1", metadata={"window": "..."})
+        recorder.attach(wincap.ring)                          # every published frame is queued
+        recorder.record_detections("detector", seq, detector.get_detections())
+        ...
+        recorder.stop()                                       # drains the queue, writes the manifest
+    """
+
+    def __init__(
+        self,
+        codec: str = CODEC_RAW,
+        tile_size: Tuple[int, int] = (128, 128),
+        zlib_level: int = 1,
+        keyframe_interval: int = 60,
+        chunk_bytes: int = 256 * 1024 * 1024,
+        queue_size: int = 32,
+        flush_every: int = 30,
+    ) -> None:
+        try:
+            if codec not in CODECS:
+                raise ValueError(f"Unknown session codec '{codec}' (expected one of {CODECS})")
+            self.codec: str = codec
+            self.tile_size: Tuple[int, int] = (int(tile_size[0]), int(tile_size[1]))
+            self.zlib_level: int = zlib_level
+            self.keyframe_interval: int = max(1, keyframe_interval)
+            self.chunk_bytes: int = chunk_bytes
+            self.queue_size: int = queue_size
+            # index files are flushed every N frames so a crash loses little
+            self.flush_every: int = flush_every
+
+            self.directory: Optional[str] = None
+            self.metadata: Dict[str, Any] = {}
+            self.is_recording: bool = False
+
+            self._queue: "Queue[Optional[Tuple[np.ndarray, int, float]]]" = Queue(maxsize=queue_size)
+            # free frame buffers; a buffer leaves the pool while it sits in the queue
+            self._pool: Deque[np.ndarray] = deque()
+            self._pool_lock: Lock = Lock()
+            # orders submit()'s queue put against stop()'s sentinel
+            self._submit_lock: Lock = Lock()
+            self._pool_allocated: int = 0
+
+            self._detections_lock: Lock = Lock()
+            self._pending_detections: List[np.ndarray] = []
+            self.stages: Dict[str, int] = {}
+            self.labels: Dict[str, int] = {}
+
+            self._thread: Optional[Thread] = None
+            self._ring = None
+            self._reset_writer_state()
+            logging.info(f"SessionRecorder initialized (codec {codec}, queue {queue_size}).")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _reset_writer_state(self) -> None:
+        self._frame_file: Optional[BinaryIO] = None
+        self._tile_file: Optional[BinaryIO] = None
+        self._detection_file: Optional[BinaryIO] = None
+        self._chunk_file: Optional[BinaryIO] = None
+        self._chunks: List[str] = []
+        self._chunk_offset: int = 0
+        self._geometry: Tuple[int, ...] = ()
+        self._tiles: np.ndarray = np.empty((0, 4), dtype=np.int32)
+        self._previous: Optional[np.ndarray] = None
+        self._since_keyframe: int = 0
+        self._frames: int = 0
+        self._tile_rows: int = 0
+        self._stats: Dict[str, float] = {
+            "frames": 0,
+            "dropped": 0,
+            "detections": 0,
+            "raw_bytes": 0,
+            "stored_bytes": 0,
+            "write_time": 0.0,
+            "submit_time": 0.0,
+            "queue_peak": 0,
+        }
+
+    # -------------------------------------------------------------------------
+    # Capture side
+    # -------------------------------------------------------------------------
+
+    def attach(self, ring) -> None:
+        """Record every frame `ring` publishes from now on (FrameRing.recorder)."""
+        try:
+            ring.recorder = self
+            self._ring = ring
+            logging.info("SessionRecorder attached to frame ring.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def detach(self) -> None:
+        try:
+            if self._ring is not None and self._ring.recorder is self:
+                self._ring.recorder = None
+            self._ring = None
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _take_buffer(self, shape: Tuple[int, ...], dtype: np.dtype) -> Optional[np.ndarray]:
+        with self._pool_lock:
+            while self._pool:
+                buf = self._pool.popleft()
+                if buf.shape == shape and buf.dtype == dtype:
+                    return buf
+                # geometry changed: let the old buffer go
+                self._pool_allocated -= 1
+            if self._pool_allocated < self.queue_size:
+                self._pool_allocated += 1
+                return np.empty(shape, dtype=dtype)
+        return None
+
+    def _give_buffer(self, buf: np.ndarray) -> None:
+        with self._pool_lock:
+            self._pool.append(buf)
+
+    def submit(self, image: np.ndarray, seq: int, timestamp: float) -> bool:
+        """
+        Queue one frame for writing (capture thread; never blocks).
+        Returns False if the frame was dropped because the writer is behind.
+        """
+        if not self.is_recording:
+            return False
+        start = time.perf_counter()
+        buf = self._take_buffer(image.shape, image.dtype)
+        if buf is None:
+            self._stats["dropped"] += 1
+            return False
+        np.copyto(buf, image)
+        with self._submit_lock:
+            # stop() may have run since the check above: a frame put now would land after its sentinel
+            if not self.is_recording:
+                self._give_buffer(buf)
+                return False
+            try:
+                self._queue.put_nowait((buf, seq, timestamp))
+            except Full:
+                self._give_buffer(buf)
+                self._stats["dropped"] += 1
+                return False
+        self._stats["queue_peak"] = max(self._stats["queue_peak"], self._queue.qsize())
+        self._stats["submit_time"] += time.perf_counter() - start
+        return True
+
+    def record_detections(self, stage: str, seq: int, detections: Mapping[str, Detections]) -> None:
+        """Record one stage's per-label detections for frame `seq` (any thread)."""
+        try:
+            if not self.is_recording:
+                return
+            with self._detections_lock:
+                stage_id = self.stages.setdefault(stage, len(self.stages))
+                for label, dets in detections.items():
+                    label_id = self.labels.setdefault(label, len(self.labels))
+                    if not len(dets):
+                        continue
+                    rows = np.empty(len(dets), dtype=DETECTION_RECORD_DTYPE)
+                    rows["seq"] = seq
+                    rows["stage"] = stage_id
+                    rows["label"] = label_id
+                    rows["det"] = dets.array
+                    self._pending_detections.append(rows)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self, directory: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Create the session directory and start the background writer."""
+        try:
+            if self.is_recording:
+                logging.warning("SessionRecorder is already recording.")
+                return
+            if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+                raise FileExistsError(f"Session already exists: {directory}")
+            os.makedirs(directory, exist_ok=True)
+
+            self.directory = directory
+            self.metadata = dict(metadata or {})
+            self._reset_writer_state()
+            with self._detections_lock:
+                self._pending_detections = []
+                self.stages, self.labels = {}, {}
+            self._frame_file = open(os.path.join(directory, FRAME_INDEX_FILE), "wb")
+            self._tile_file = open(os.path.join(directory, TILE_INDEX_FILE), "wb")
+            self._detection_file = open(os.path.join(directory, DETECTION_INDEX_FILE), "wb")
+            self._write_manifest(complete=False)
+
+            self.is_recording = True
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+            logging.info(f"SessionRecorder recording to '{directory}'.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def stop(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Stop accepting frames, write everything queued and finalize the session. Returns its directory."""
+        try:
+            if not self.is_recording:
+                return self.directory
+            self.detach()
+            with self._submit_lock:
+                self.is_recording = False
+            if self._thread is not None and self._thread.is_alive():
+                # the sentinel goes after every queued frame (blocking put: the writer is draining)
+                self._queue.put(None)
+                self._thread.join(timeout)
+            self._thread = None
+            logging.info(f"SessionRecorder stopped: {self.stats()}")
+            return self.directory
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def stats(self) -> Dict[str, float]:
+        """Frames written / dropped, detections, compression ratio and per-frame costs (ms)."""
+        s = self._stats
+        frames = max(1, s["frames"])
+        return {
+            "frames": s["frames"],
+            "dropped": s["dropped"],
+            "detections": s["detections"],
+            "raw_mb": s["raw_bytes"] / 1e6,
+            "stored_mb": s["stored_bytes"] / 1e6,
+            "ratio": s["raw_bytes"] / max(1, s["stored_bytes"]),
+            "submit_ms": 1000.0 * s["submit_time"] / max(1, s["frames"] + s["dropped"]),
+            "write_ms": 1000.0 * s["write_time"] / frames,
+            "queue_peak": s["queue_peak"],
+        }
+
+    # -------------------------------------------------------------------------
+    # Writer thread
+    # -------------------------------------------------------------------------
+
+    def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=0.1)
+                except Empty:
+                    self._write_detections()
+                    continue
+                if item is None:
+                    break
+                buf, seq, timestamp = item
+                try:
+                    self._write_frame(buf, seq, timestamp)
+                finally:
+                    self._give_buffer(buf)
+                if self._frames % self.flush_every == 0:
+                    self._write_detections()
+                    self._flush()
+        except Exception as e:
+            logging.error(f"SessionRecorder writer error: {e}")
+            self.is_recording = False
+            raise CustomException(e, sys) from e
+        finally:
+            self._finalize()
+
+    def _open_chunk(self) -> None:
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+        name = chunk_name(len(self._chunks))
+        self._chunk_file = open(os.path.join(self.directory, name), "wb")
+        self._chunks.append(name)
+        self._chunk_offset = 0
+        self._write_manifest(complete=False)
+
+    def _write_frame(self, img: np.ndarray, seq: int, timestamp: float) -> None:
+        start = time.perf_counter()
+        h, w = img.shape[:2]
+        channels = img.shape[2] if img.ndim == 3 else 1
+
+        new_chunk = self._chunk_file is None or self._chunk_offset >= self.chunk_bytes or img.shape != self._geometry
+        if new_chunk:
+            self._open_chunk()
+            if img.shape != self._geometry:
+                self._geometry = img.shape
+                self._tiles = tile_grid(w, h, self.tile_size)
+                self._previous = None
+
+        record = np.zeros(1, dtype=FRAME_RECORD_DTYPE)
+        record["seq"], record["timestamp"] = seq, timestamp
+        record["width"], record["height"], record["channels"] = w, h, channels
+        record["chunk"], record["offset"] = len(self._chunks) - 1, self._chunk_offset
+
+        if self.codec == CODEC_RAW:
+            self._chunk_file.write(memoryview(img).cast("B"))
+            stored = img.nbytes
+            record["keyframe"] = 1
+        else:
+            delta = self.codec in (CODEC_DELTA, CODEC_DELTA_ZLIB)
+            keyframe = (
+                not delta or new_chunk or self._previous is None or self._since_keyframe >= self.keyframe_interval
+            )
+            stored = self._write_tiles(img, keyframe, record)
+            if delta:
+                if self._previous is None:
+                    self._previous = np.empty_like(img)
+                np.copyto(self._previous, img)
+                self._since_keyframe = 0 if keyframe else self._since_keyframe + 1
+            record["keyframe"] = int(keyframe)
+
+        record["nbytes"] = stored
+        self._chunk_offset += stored
+        self._frame_file.write(record.tobytes())
+        self._frames += 1
+
+        self._stats["frames"] += 1
+        self._stats["raw_bytes"] += img.nbytes
+        self._stats["stored_bytes"] += stored
+        self._stats["write_time"] += time.perf_counter() - start
+
+    def _write_tiles(self, img: np.ndarray, keyframe: bool, record: np.ndarray) -> int:
+        """Write the frame's tiles (all, or only changed ones) and their tile records. Returns bytes written."""
+        compress = self.codec in (CODEC_ZLIB, CODEC_DELTA_ZLIB)
+        rows = np.empty(len(self._tiles), dtype=TILE_RECORD_DTYPE)
+        count, stored = 0, 0
+        for i, (x, y, tw, th) in enumerate(self._tiles.tolist()):
+            tile = img[y:y + th, x:x + tw]
+            if not keyframe and np.array_equal(tile, self._previous[y:y + th, x:x + tw]):
+                continue
+            data = np.ascontiguousarray(tile)
+            if compress:
+                payload = zlib.compress(data, self.zlib_level)
+                codec = TILE_ZLIB
+            else:
+                payload = memoryview(data).cast("B")
+                codec = TILE_RAW
+            self._chunk_file.write(payload)
+            rows[count] = (i, codec, self._chunk_offset + stored, len(payload))
+            count += 1
+            stored += len(payload)
+
+        record["tile_start"], record["tile_count"] = self._tile_rows, count
+        self._tile_file.write(rows[:count].tobytes())
+        self._tile_rows += count
+        return stored
+
+    def _write_detections(self) -> None:
+        with self._detections_lock:
+            pending, self._pending_detections = self._pending_detections, []
+        if not pending or self._detection_file is None:
+            return
+        rows = np.concatenate(pending)
+        self._detection_file.write(rows.tobytes())
+        self._stats["detections"] += len(rows)
+
+    def _flush(self) -> None:
+        for f in (self._chunk_file, self._frame_file, self._tile_file, self._detection_file):
+            if f is not None:
+                f.flush()
+
+    def _write_manifest(self, complete: bool) -> None:
+        with self._detections_lock:
+            stages = sorted(self.stages, key=self.stages.get)
+            labels = sorted(self.labels, key=self.labels.get)
+        manifest = {
+            "version": SESSION_VERSION,
+            "codec": self.codec,
+            "tile_size": list(self.tile_size),
+            "keyframe_interval": self.keyframe_interval,
+            "chunks": list(self._chunks),
+            "frames": self._frames,
+            "dropped": int(self._stats["dropped"]),
+            "stages": stages,
+            "labels": labels,
+            "complete": complete,
+            "metadata": self.metadata,
+        }
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(path + ".tmp", "w") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _finalize(self) -> None:
+        try:
+            self._write_detections()
+            for f in (self._chunk_file, self._frame_file, self._tile_file, self._detection_file):
+                if f is not None:
+                    f.close()
+            self._write_manifest(complete=True)
+        except Exception as e:
+            logging.error(f"SessionRecorder could not finalize '{self.directory}': {e}")
+        finally:
+            self._chunk_file = self._frame_file = self._tile_file = self._detection_file = None
@@ -0,0 +1,82 @@
+from threading import Condition
+from typing import Optional
+
+
+class StageSignal:
+    """
+    Publish / wait primitive between pipeline stages.
+
+    The upstream stage calls publish(seq) after it has made a new result
+    available (frame, mask, detections, ...). Downstream stages call
+    wait_for(last_seen_seq, timeout) and wake as soon as something newer is
+    published, instead of polling on a fixed sleep. close() wakes every waiter
+    so threads can shut down without waiting for their timeout; wake() makes
+    the current waiters return early without publishing anything (e.g. to
+    re-check state that changed outside the pipeline, like settings).
+
+    Usage:
+        seq = 0
+        while not stopped:
+            seq_new = signal.wait_for(seq, timeout=0.1)
+            if seq_new == seq:
+                continue  # timeout, closed or woken -> re-check stop flag
+            seq = seq_new
+            ...
+    """
+
+    def __init__(self, name: str = "") -> None:
+        self.name: str = name
+        self._cond: Condition = Condition()
+        self._seq: int = 0
+        self._closed: bool = False
+        # bumped by wake(); a wait returns when it changes
+        self._wakeups: int = 0
+
+    @property
+    def seq(self) -> int:
+        with self._cond:
+            return self._seq
+
+    @property
+    def closed(self) -> bool:
+        with self._cond:
+            return self._closed
+
+    def publish(self, seq: Optional[int] = None) -> int:
+        """
+        Announce a new result. If `seq` is None the internal counter is bumped.
+        Returns the published sequence id.
+        """
+        with self._cond:
+            self._seq = self._seq + 1 if seq is None else max(self._seq, seq)
+            self._cond.notify_all()
+            return self._seq
+
+    def wait_for(self, after_seq: int, timeout: Optional[float] = None) -> int:
+        """
+        Block until a sequence id greater than `after_seq` is published, the
+        signal is closed or woken, or `timeout` seconds pass. Returns the current id.
+        """
+        with self._cond:
+            wakeups = self._wakeups
+            self._cond.wait_for(
+                lambda: self._seq > after_seq or self._closed or self._wakeups != wakeups,
+                timeout=timeout,
+            )
+            return self._seq
+
+    def wake(self) -> None:
+        """Make the current waiters return (with the current id) without publishing."""
+        with self._cond:
+            self._wakeups += 1
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Wake all waiters (used on shutdown)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self) -> None:
+        with self._cond:
+            self._closed = False
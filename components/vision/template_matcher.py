@@ -0,0 +1,338 @@
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.derived_frame import DerivedFrame
+from components.vision.detections import EMPTY_DETECTIONS, Detections
+from components.vision.postprocess import find_peaks, nms_boxes
+from exception import CustomException
+from logger import logging
+
+
+class TemplateMatcher:
+    """
+    One grayscale template plus its matching settings.
+
+    match() takes an already converted grayscale image, so several matchers
+    can share one BGR->GRAY conversion. Only tracking mode keeps state between
+    frames, so one matcher must not be used by two threads at once.
+
+    Config keys (same shape as RunTasks.template_config_list entries):
+        name:       key used for results
+        path:       template image path
+        threshold:  TM_CCOEFF_NORMED score threshold (default 0.8)
+        roi:        optional (x, y, w, h) search window in frame coordinates
+        region:     optional RegionRegistry name; its rect is used as `roi`
+        draw_color: BGR color for debug drawing
+        max_results: cap on returned matches (default 10)
+        nms_iou:    overlap above which weaker matches are suppressed (default 0.3)
+
+    Optional coarse-to-fine (pyramid) mode, off by default:
+        pyramid_levels:     number of pyrDown steps for the coarse pass (0 = exhaustive)
+        refine_window:      pixels searched around each coarse candidate at full resolution
+        pyramid_candidates: coarse candidates refined per frame (default 5)
+        pyramid_slack:      how far below `threshold` a coarse score may be (default 0.2)
+
+    Optional tracking mode for objects that move a little per frame (player):
+        tracking:        search only a window around the last / predicted position
+        track_margin:    pixels added around the predicted box (default 32)
+        full_scan_every: force a full scan every N frames (default 30)
+    A miss in the tracking window falls back to a full scan on the same frame.
+    Counters are available from tracking_stats().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        template_path: str,
+        threshold: float = 0.8,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        draw_color: tuple = (0, 255, 0),
+        region: Optional[str] = None,
+        max_results: int = 10,
+        nms_iou: float = 0.3,
+        pyramid_levels: int = 0,
+        refine_window: int = 8,
+        pyramid_candidates: int = 5,
+        pyramid_slack: float = 0.2,
+        tracking: bool = False,
+        track_margin: int = 32,
+        full_scan_every: int = 30,
+    ) -> None:
+        try:
+            self.name: str = name
+            self.template_path: str = template_path
+            self.threshold: float = threshold
+            self.roi: Optional[Tuple[int, int, int, int]] = roi
+            self.region: Optional[str] = region
+            self.draw_color: tuple = draw_color
+            self.max_results: int = max_results
+            self.nms_iou: float = nms_iou
+
+            self.template_gray, self.w, self.h = self._load_template(template_path)
+
+            self.refine_window: int = refine_window
+            self.pyramid_candidates: int = pyramid_candidates
+            self.pyramid_slack: float = pyramid_slack
+            self.pyramid_levels: int = 0
+            self.template_levels: List[np.ndarray] = [self.template_gray]
+            self._build_template_pyramid(pyramid_levels)
+
+            self.tracking: bool = tracking
+            self.track_margin: int = track_margin
+            self.full_scan_every: int = max(1, full_scan_every)
+            # last two positions (area coordinates) for constant-velocity prediction
+            self._track_pos: Optional[Tuple[int, int]] = None
+            self._track_vel: Tuple[int, int] = (0, 0)
+            self._frames_since_full: int = 0
+            self._stats: Dict[str, float] = {
+                "frames": 0,
+                "track_attempts": 0,
+                "track_hits": 0,
+                "fallbacks": 0,
+                "full_scans": 0,
+                "track_time": 0.0,
+                "full_time": 0.0,
+            }
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "TemplateMatcher":
+        """Build a matcher from a template_config_list entry."""
+        try:
+            roi = config.get("roi")
+            return cls(
+                name=config["name"],
+                template_path=config["path"],
+                threshold=config.get("threshold", 0.8),
+                roi=tuple(roi) if roi is not None else None,
+                draw_color=tuple(config.get("draw_color", (0, 255, 0))),
+                region=config.get("region"),
+                max_results=config.get("max_results", 10),
+                nms_iou=config.get("nms_iou", 0.3),
+                pyramid_levels=config.get("pyramid_levels", 0),
+                refine_window=config.get("refine_window", 8),
+                pyramid_candidates=config.get("pyramid_candidates", 5),
+                pyramid_slack=config.get("pyramid_slack", 0.2),
+                tracking=config.get("tracking", False),
+                track_margin=config.get("track_margin", 32),
+                full_scan_every=config.get("full_scan_every", 30),
+            )
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _load_template(self, template_path: str):
+        """Load the template, convert to grayscale, and get its width and height."""
+        template_bgr = cv.imread(template_path, cv.IMREAD_COLOR)
+        if template_bgr is None:
+            raise FileNotFoundError(f"Template image not found: {template_path}")
+
+        template_gray = cv.cvtColor(template_bgr, cv.COLOR_BGR2GRAY)
+        h, w = template_gray.shape[:2]
+        return template_gray, w, h
+
+    def _build_template_pyramid(self, levels: int) -> None:
+        """Precompute downscaled templates; stop before the template gets too small to match."""
+        self.template_levels = [self.template_gray]
+        for _ in range(max(0, levels)):
+            smaller = cv.pyrDown(self.template_levels[-1])
+            if min(smaller.shape[:2]) < 4:
+                logging.warning(
+                    f"[TemplateMatcher] '{self.name}' template too small for {levels} pyramid levels; "
+                    f"using {len(self.template_levels) - 1}."
+                )
+                break
+            self.template_levels.append(smaller)
+        self.pyramid_levels = len(self.template_levels) - 1
+
+    def set_roi(self, roi: Optional[Tuple[int, int, int, int]]) -> None:
+        """Change the search window; tracking state is relative to it, so reset it."""
+        if roi == self.roi:
+            return
+        self.roi = roi
+        self._track_pos, self._track_vel = None, (0, 0)
+
+    def _search_window(self, img_gray: np.ndarray) -> Tuple[np.ndarray, int, int]:
+        """Return the (view) area to search and its offset in frame coordinates."""
+        if self.roi is None:
+            return img_gray, 0, 0
+
+        x, y, w, h = self.roi
+        img_h, img_w = img_gray.shape[:2]
+        x1, y1 = max(0, min(x, img_w)), max(0, min(y, img_h))
+        x2, y2 = max(0, min(x + w, img_w)), max(0, min(y + h, img_h))
+        if x2 - x1 < self.w or y2 - y1 < self.h:
+            logging.debug(f"[TemplateMatcher] ROI of '{self.name}' smaller than template; using full frame.")
+            return img_gray, 0, 0
+        return img_gray[y1:y2, x1:x2], x1, y1
+
+    def _exhaustive_peaks(self, area: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Full-resolution matchTemplate over the whole search area."""
+        result = cv.matchTemplate(area, self.template_gray, cv.TM_CCOEFF_NORMED)
+        return find_peaks(result, self.threshold, neighborhood=(self.w // 2, self.h // 2))
+
+    def _pyramid_peaks(
+        self, area: np.ndarray, coarse: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Coarse-to-fine search: match the smallest template against an equally
+        downscaled area, then re-match at full resolution only in a small
+        window around the best coarse candidates.
+        `coarse` is the area already downscaled `pyramid_levels` times, if cached.
+        """
+        levels = self.pyramid_levels
+        if coarse is None:
+            coarse = area
+            for _ in range(levels):
+                coarse = cv.pyrDown(coarse)
+
+        tpl = self.template_levels[levels]
+        if coarse.shape[0] < tpl.shape[0] or coarse.shape[1] < tpl.shape[1]:
+            return self._exhaustive_peaks(area)
+
+        coarse_result = cv.matchTemplate(coarse, tpl, cv.TM_CCOEFF_NORMED)
+        cxs, cys, _ = find_peaks(
+            coarse_result,
+            self.threshold - self.pyramid_slack,
+            neighborhood=(tpl.shape[1] // 2, tpl.shape[0] // 2),
+        )
+
+        scale = 1 << levels
+        r = self.refine_window + scale
+        area_h, area_w = area.shape[:2]
+        xs_out, ys_out, scores_out = [], [], []
+
+        for cx, cy in zip(cxs[: self.pyramid_candidates].tolist(), cys[: self.pyramid_candidates].tolist()):
+            x1, y1 = max(0, cx * scale - r), max(0, cy * scale - r)
+            x2, y2 = min(area_w, cx * scale + self.w + r), min(area_h, cy * scale + self.h + r)
+            if x2 - x1 < self.w or y2 - y1 < self.h:
+                continue
+
+            fine = cv.matchTemplate(area[y1:y2, x1:x2], self.template_gray, cv.TM_CCOEFF_NORMED)
+            _, max_val, _, (mx, my) = cv.minMaxLoc(fine)
+            if max_val >= self.threshold:
+                xs_out.append(mx + x1)
+                ys_out.append(my + y1)
+                scores_out.append(max_val)
+
+        return (
+            np.asarray(xs_out, dtype=np.int32),
+            np.asarray(ys_out, dtype=np.int32),
+            np.asarray(scores_out, dtype=np.float32),
+        )
+
+    def _track_window(self, area_w: int, area_h: int) -> Optional[Tuple[int, int, int, int]]:
+        """Predicted search window (x1, y1, x2, y2) in area coordinates, or None."""
+        px = self._track_pos[0] + self._track_vel[0]
+        py = self._track_pos[1] + self._track_vel[1]
+        m = self.track_margin
+        x1, y1 = max(0, px - m), max(0, py - m)
+        x2, y2 = min(area_w, px + self.w + m), min(area_h, py + self.h + m)
+        if x2 - x1 < self.w or y2 - y1 < self.h:
+            return None
+        return x1, y1, x2, y2
+
+    def _tracked_peaks(self, area: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Search only around the predicted position. None means "do a full scan"."""
+        if self._track_pos is None or self._frames_since_full >= self.full_scan_every:
+            return None
+
+        window = self._track_window(area.shape[1], area.shape[0])
+        if window is None:
+            return None
+        x1, y1, x2, y2 = window
+
+        start = time.perf_counter()
+        self._stats["track_attempts"] += 1
+        xs, ys, scores = self._exhaustive_peaks(area[y1:y2, x1:x2])
+        self._stats["track_time"] += time.perf_counter() - start
+
+        if len(scores) == 0:
+            self._stats["fallbacks"] += 1
+            return None
+
+        self._stats["track_hits"] += 1
+        self._frames_since_full += 1
+        return xs + x1, ys + y1, scores
+
+    def _update_track(self, xs: np.ndarray, ys: np.ndarray, scores: np.ndarray) -> None:
+        """Remember the best hit (and its motion) for the next frame."""
+        if len(scores) == 0:
+            self._track_pos, self._track_vel = None, (0, 0)
+            return
+        best = int(np.argmax(scores))
+        pos = (int(xs[best]), int(ys[best]))
+        if self._track_pos is not None:
+            self._track_vel = (pos[0] - self._track_pos[0], pos[1] - self._track_pos[1])
+        self._track_pos = pos
+
+    def tracking_stats(self) -> Dict[str, float]:
+        """Hit rate, fallback rate and mean time per mode (ms) for tracking mode."""
+        s = self._stats
+        attempts = max(1, s["track_attempts"])
+        return {
+            "frames": s["frames"],
+            "track_hit_rate": s["track_hits"] / attempts,
+            "fallback_rate": s["fallbacks"] / attempts,
+            "full_scan_rate": s["full_scans"] / max(1, s["frames"]),
+            "track_ms": 1000.0 * s["track_time"] / attempts,
+            "full_ms": 1000.0 * s["full_time"] / max(1, s["full_scans"]),
+        }
+
+    def _full_peaks(
+        self, area: np.ndarray, derived: Optional[DerivedFrame] = None, rect=None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Whole search area, exhaustive or pyramid (coarse level shared via `derived`)."""
+        if self.pyramid_levels > 0:
+            coarse = derived.level(self.pyramid_levels, rect) if derived is not None else None
+            return self._pyramid_peaks(area, coarse)
+        return self._exhaustive_peaks(area)
+
+    def match(self, img_gray: np.ndarray, frame_seq: int = 0, derived: Optional[DerivedFrame] = None) -> Detections:
+        """
+        Perform template matching on a grayscale image and return a Detections
+        snapshot (in full-frame coordinates, also when an ROI is set).
+
+        Only local maxima of the score map survive, overlapping hits are merged
+        by NMS, and results are sorted best-first with their score.
+
+        If `img_gray` is `derived.gray()`, pass `derived` so pyramid levels are
+        computed once per frame and shared with other matchers.
+        """
+        try:
+            area, off_x, off_y = self._search_window(img_gray)
+            if area.shape[0] < self.h or area.shape[1] < self.w:
+                return EMPTY_DETECTIONS
+            rect = None if area is img_gray else (off_x, off_y, area.shape[1], area.shape[0])
+
+            if self.tracking:
+                self._stats["frames"] += 1
+                peaks = self._tracked_peaks(area)
+                if peaks is None:
+                    start = time.perf_counter()
+                    peaks = self._full_peaks(area, derived, rect)
+                    self._stats["full_time"] += time.perf_counter() - start
+                    self._stats["full_scans"] += 1
+                    self._frames_since_full = 0
+                xs, ys, scores = peaks
+                self._update_track(xs, ys, scores)
+            else:
+                xs, ys, scores = self._full_peaks(area, derived, rect)
+
+            if len(scores) == 0:
+                return EMPTY_DETECTIONS
+
+            boxes = np.empty((len(scores), 4), dtype=np.int32)
+            boxes[:, 0] = xs + off_x
+            boxes[:, 1] = ys + off_y
+            boxes[:, 2] = self.w
+            boxes[:, 3] = self.h
+            keep = nms_boxes(boxes, scores, self.nms_iou, self.max_results)
+
+            return Detections.from_boxes(boxes[keep], scores[keep], frame_seq)
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -0,0 +1,145 @@
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from exception import CustomException
+from logger import logging
+
+
+class TileCache:
+    """
+    Change-driven bookkeeping for tiled inference.
+
+    The image is covered by fixed-size tiles overlapping by `overlap` pixels
+    (the last row / column is aligned to the image edge). Change is measured
+    on a grayscale thumbnail at 1 / `thumb_scale` (e.g. DerivedFrame.level(3)):
+    every tile keeps the thumbnail patch it was last inferred on, and a tile
+    is dirty when more than `change_threshold` of its patch pixels moved by
+    more than `pixel_delta` gray levels. All tiles are compared in one array
+    op. Dirty tiles, tiles without results and tiles older than `max_age`
+    frames are re-run; the others reuse their cached detections.
+
+    Usage:
+        tiles = TileCache(tile_size=(416, 416), overlap=32)
+        for i in tiles.update(thumb, width, height):       # indices of tiles to re-run
+            x, y, w, h = tiles.rects[i]
+            tiles.store(i, boxes, scores, class_ids)         # image coordinates
+        boxes, scores, class_ids = tiles.merged()            # then global NMS
+    """
+
+    def __init__(
+        self,
+        tile_size: Tuple[int, int] = (416, 416),
+        overlap: int = 32,
+        change_threshold: float = 0.002,
+        pixel_delta: int = 10,
+        thumb_scale: int = 8,
+        max_age: int = 60,
+    ) -> None:
+        try:
+            if overlap >= min(tile_size):
+                raise ValueError("overlap must be smaller than the tile size")
+            self.tile_size: Tuple[int, int] = (int(tile_size[0]), int(tile_size[1]))
+            self.overlap: int = overlap
+            # fraction of a tile's thumbnail pixels that must change to re-run it
+            self.change_threshold: float = change_threshold
+            self.pixel_delta: int = pixel_delta
+            self.thumb_scale: int = thumb_scale
+            # re-run a tile after this many frames even if it looks unchanged (0 = never)
+            self.max_age: int = max_age
+
+            self.geometry: Tuple[int, int] = (0, 0)
+            self.rects: np.ndarray = np.empty((0, 4), dtype=np.int32)
+            self._iy: np.ndarray = np.empty(0, dtype=np.intp)
+            self._ix: np.ndarray = np.empty(0, dtype=np.intp)
+            self._reference: np.ndarray = np.empty(0, dtype=np.uint8)
+            self._age: np.ndarray = np.empty(0, dtype=np.int64)
+            self._valid: np.ndarray = np.empty(0, dtype=bool)
+            self._results: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def __len__(self) -> int:
+        return len(self.rects)
+
+    @staticmethod
+    def _origins(length: int, tile: int, stride: int) -> List[int]:
+        if length <= tile:
+            return [0]
+        origins = list(range(0, length - tile, stride))
+        return origins + [length - tile]
+
+    def layout(self, width: int, height: int) -> None:
+        """Lay tiles over a width x height image and drop every cached result."""
+        try:
+            tw, th = min(self.tile_size[0], width), min(self.tile_size[1], height)
+            xs = self._origins(width, tw, tw - self.overlap)
+            ys = self._origins(height, th, th - self.overlap)
+            self.rects = np.array([(x, y, tw, th) for y in ys for x in xs], dtype=np.int32)
+
+            # (T, ph, 1) / (T, 1, pw) gather indices of every tile's thumbnail patch
+            s = self.thumb_scale
+            pw, ph = max(1, tw // s), max(1, th // s)
+            self._iy = (self.rects[:, 1] // s)[:, None, None] + np.arange(ph)[None, :, None]
+            self._ix = (self.rects[:, 0] // s)[:, None, None] + np.arange(pw)[None, None, :]
+
+            self._reference = np.zeros((len(self.rects), ph, pw), dtype=np.uint8)
+            self._age = np.zeros(len(self.rects), dtype=np.int64)
+            self._valid = np.zeros(len(self.rects), dtype=bool)
+            self._results = [self._empty()] * len(self.rects)
+            self.geometry = (width, height)
+            logging.info(f"TileCache laid out {len(self.rects)} tiles of {tw}x{th} over {width}x{height}.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def _empty() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    def update(self, thumb: np.ndarray, width: int, height: int) -> np.ndarray:
+        """
+        Compare the new thumbnail with every tile's reference patch and return
+        the indices of tiles to re-run (their references are updated).
+        """
+        try:
+            if (width, height) != self.geometry:
+                self.layout(width, height)
+
+            iy = np.minimum(self._iy, thumb.shape[0] - 1)
+            ix = np.minimum(self._ix, thumb.shape[1] - 1)
+            patches = thumb[iy, ix]                                          # (T, ph, pw)
+
+            moved = np.abs(patches.astype(np.int16) - self._reference) > self.pixel_delta
+            dirty = moved.mean(axis=(1, 2)) > self.change_threshold
+            dirty |= ~self._valid
+            if self.max_age > 0:
+                dirty |= self._age >= self.max_age
+
+            self._reference[dirty] = patches[dirty]
+            self._age += 1
+            self._age[dirty] = 0
+            self._valid[dirty] = False
+            return np.flatnonzero(dirty)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def store(self, index: int, boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray) -> None:
+        """Cache one tile's detections (image coordinates)."""
+        self._results[index] = (boxes, scores, class_ids)
+        self._valid[index] = True
+
+    def merged(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every tile's cached detections concatenated (duplicates from overlaps included)."""
+        results = [r for r in self._results if len(r[0])]
+        if not results:
+            return self._empty()
+        boxes, scores, class_ids = zip(*results)
+        return np.concatenate(boxes), np.concatenate(scores), np.concatenate(class_ids)
+
+    def invalidate(self, index: Optional[int] = None) -> None:
+        """Force one tile (or every tile) to be re-run on the next update()."""
+        if index is None:
+            self._valid[:] = False
+        else:
+            self._valid[index] = False
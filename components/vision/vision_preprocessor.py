@@ -1,11 +1,19 @@
 import sys
 import time
 from threading import Thread, Lock
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import cv2 as cv
 import numpy as np
 
+from components.vision.arrow_extractor import ArrowExtractor
+from components.vision.binary_mask import BinaryMask
+from components.vision.change_detector import ChangeGate
+from components.vision.derived_frame import DerivedFrame
+from components.vision.filter_plan import FilterPlan
+from components.vision.frame_buffer import Frame, FrameRing
+from components.vision.region_registry import RegionRegistry
+from components.vision.stage_signal import StageSignal
 from configs.filter_configs import FilterConfig
 from exception import CustomException
 from logger import logging
@@ -14,14 +22,34 @@ from logger import logging
 class VisionPreprocessor:
     CONTROL_PANEL_WINDOW: str = "Vision Control Panel"
     buffer_time: float = 0.1
+    wait_timeout: float = 0.1
 
     stopped: bool = True
     lock: Lock = None
 
-    input_frame: Optional[np.ndarray] = None
-    output_frame: Optional[np.ndarray] = None
+    # input: published by set_input(); output: published when output_mask changes
+    input_signal: StageSignal = None
+    output_signal: StageSignal = None
+    # published with every input frame the worker is done with (masked, reused or skipped)
+    done_signal: StageSignal = None
+    source: Optional[FrameRing] = None
+
+    input_frame: Optional[Frame] = None
+    # single-channel masks are computed straight into this ring's slots
+    mask_ring: FrameRing = None
+    mask_slots: int = 4
+    output_mask: Optional[BinaryMask] = None
+
+    # connected-components arrow candidates + fixed-size crop batch
+    arrow_extractor: ArrowExtractor = None
+
+    # sequence ids: last frame processed / frame the current output came from
+    last_seq: int = 0
+    output_seq: int = 0
 
     filter_settings: FilterConfig = None
+    # compiled from filter_settings; rebuilt when its version changes
+    _plan: Optional[FilterPlan] = None
 
     roi_enabled: bool = False
     roi_x: int = 0
@@ -29,10 +57,27 @@ class VisionPreprocessor:
     roi_w: int = 0
     roi_h: int = 0
 
+    # named region binding; the ROI trackbars / set_roi() override it once touched
+    regions: Optional[RegionRegistry] = None
+    region_name: Optional[str] = None
+    roi_override: bool = False
+    panel_ready: bool = False
+    # ROI (x, y, w, h) actually used for the last processed frame
+    active_roi: Optional[Tuple[int, int, int, int]] = None
+
+    # skips frames whose ROI did not change since the last mask (frame.change)
+    change_gate: ChangeGate = None
+
     def __init__(self) -> None:
         try:
             self.lock = Lock()
+            self.input_signal = StageSignal("preprocessor-input")
+            self.output_signal = StageSignal("preprocessor-output")
+            self.done_signal = StageSignal("preprocessor-done")
+            self.mask_ring = FrameRing(slots=self.mask_slots)
+            self.arrow_extractor = ArrowExtractor()
             self.filter_settings = FilterConfig()
+            self.change_gate = ChangeGate("preprocessor")
         except Exception as e:
             raise CustomException(e, sys) from e
 
@@ -41,6 +86,9 @@ class VisionPreprocessor:
             def on_change(val: int, attr=field, tgt=target, flag=is_bool) -> None:
                 val = bool(val) if flag else val
                 setattr(tgt, attr, val)
+                if tgt is self and attr.startswith("roi_") and self.panel_ready:
+                    self.roi_override = True
+                self._mark_settings_dirty()
                 logging.debug(f"[trackbar] {attr} -> {val}")
 
             cv.createTrackbar(name, self.CONTROL_PANEL_WINDOW, init, maxv, on_change)
@@ -87,12 +135,14 @@ class VisionPreprocessor:
             # Number of erosion iterations in the OPEN step
             self.create_trackbar("Erode Iter", 0, 10, self.filter_settings, "erosion_iterations")
 
-            # --- ROI ---
+            # --- ROI --- (defaults come from the bound region, if any)
+            roi_x, roi_y, roi_w, roi_h = self._default_roi()
             self.create_trackbar("ROI Enabled", 1, 1, self, "roi_enabled", is_bool=True)
-            self.create_trackbar("ROI X", 498, 1920, self, "roi_x")
-            self.create_trackbar("ROI Y", 257, 1080, self, "roi_y")
-            self.create_trackbar("ROI W", 477, 1920, self, "roi_w")
-            self.create_trackbar("ROI H", 123, 1080, self, "roi_h")
+            self.create_trackbar("ROI X", roi_x, 1920, self, "roi_x")
+            self.create_trackbar("ROI Y", roi_y, 1080, self, "roi_y")
+            self.create_trackbar("ROI W", roi_w, 1920, self, "roi_w")
+            self.create_trackbar("ROI H", roi_h, 1080, self, "roi_h")
+            self.panel_ready = True
 
             logging.info("Vision control panel initialized (HSV + adaptive/global threshold).")
 
@@ -100,33 +150,163 @@ class VisionPreprocessor:
             raise CustomException(e, sys) from e
 
 
+    def _mark_settings_dirty(self) -> None:
+        """Wake the worker so the held frame is reprocessed with new settings."""
+        with self.lock:
+            # Forget the last processed frame so the current one counts as unseen
+            self.last_seq = max(0, self.last_seq - 1)
+            self.change_gate.reset()
+        # the signal _run() blocks on: the ring's when attached, else input_signal
+        signal = self.source.signal if self.source is not None else self.input_signal
+        signal.wake()
+
+    def bind_region(self, regions: RegionRegistry, name: str) -> None:
+        """
+        Process only the named region (resolved per window geometry).
+        Call before init_control_panel() so the ROI trackbars start from it.
+        """
+        try:
+            if name not in regions.specs:
+                raise KeyError(f"Unknown region: {name}")
+            self.regions, self.region_name = regions, name
+            self.roi_override = False
+            self.roi_enabled = True
+            logging.info(f"VisionPreprocessor bound to region '{name}'.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _default_roi(self) -> Tuple[int, int, int, int]:
+        """Trackbar defaults: the bound region at its reference size, else the legacy arrow ROI."""
+        if self.regions is not None and self.region_name is not None:
+            ref_w, ref_h = self.regions.reference_size
+            return self.regions.get(self.region_name, ref_w, ref_h).rect
+        return 498, 257, 477, 123
+
+    def _resolve_roi(self, img: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """ROI for this frame: bound region unless overridden, else the ROI trackbars."""
+        h, w = img.shape[:2]
+        if not self.roi_enabled:
+            return None
+        if self.regions is not None and self.region_name is not None and not self.roi_override:
+            region = self.regions.get(self.region_name, w, h)
+            return region.rect if region.w > 0 and region.h > 0 else None
+        if self.roi_w <= 0 or self.roi_h <= 0:
+            return None
+
+        x1 = max(0, min(self.roi_x, w))
+        x2 = max(0, min(self.roi_x + self.roi_w, w))
+        y1 = max(0, min(self.roi_y, h))
+        y2 = max(0, min(self.roi_y + self.roi_h, h))
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2 - x1, y2 - y1
+
     def set_roi(self, x: int, y: int, w: int, h: int, enabled: bool = True) -> None:
         try:
             self.roi_x, self.roi_y = x, y
             self.roi_w, self.roi_h = w, h
             self.roi_enabled = enabled
+            self.roi_override = True
+            self._mark_settings_dirty()
             logging.info(f"VisionPreprocessor ROI set: enabled={enabled}, x={x}, y={y}, w={w}, h={h}")
         except Exception as e:
             raise CustomException(e, sys) from e
 
-    def set_input(self, frame: np.ndarray) -> None:
+    def set_input(self, frame: Frame) -> None:
+        """Hand a pinned Frame to the worker; the previous one is released."""
         try:
             with self.lock:
-                self.input_frame = frame.copy()
+                # Same frame as before (or older): nothing new for the worker
+                if self.input_frame is not None and frame.seq <= self.input_frame.seq:
+                    return
+                previous, self.input_frame = self.input_frame, frame.retain()
+            self.input_signal.publish(frame.seq)
+            if previous is not None:
+                previous.release()
         except Exception as e:
             raise CustomException(e, sys) from e
 
-    def get_output(self) -> Optional[np.ndarray]:
+    def attach(self, ring: FrameRing) -> None:
+        """
+        Follow a capture ring directly instead of being fed by set_input().
+        Call before start().
+        """
+        try:
+            self.source = ring
+            logging.info("VisionPreprocessor attached to frame ring.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _acquire_frame(self) -> Optional[Frame]:
+        """Pin the newest available input frame (ring or set_input())."""
+        if self.source is not None:
+            return self.source.latest()
+        with self.lock:
+            return None if self.input_frame is None else self.input_frame.retain()
+
+    def get_mask(self) -> Optional[BinaryMask]:
+        """
+        Latest single-channel mask, pinned for the caller (no copy).
+        Release it when done.
+        """
         try:
             with self.lock:
-                return None if self.output_frame is None else self.output_frame.copy()
+                return None if self.output_mask is None else self.output_mask.retain()
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_output(self) -> Optional[np.ndarray]:
+        """Legacy accessor: latest mask rendered as a new BGR image. Prefer get_mask()."""
+        try:
+            return self.get_output_with_seq()[1]
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_output_with_seq(self) -> Tuple[int, Optional[np.ndarray]]:
+        """Same as get_output(), plus the sequence id of the source frame."""
+        try:
+            mask = self.get_mask()
+            if mask is None:
+                return self.output_seq, None
+            with mask:
+                return mask.source_seq, mask.render()
         except Exception as e:
             raise CustomException(e, sys) from e
 
-    def process_frame(self, img: np.ndarray) -> np.ndarray:
+    def _apply_roi(self, img: np.ndarray) -> Tuple[np.ndarray, Optional[Tuple[int, int, int, int]]]:
+        """ROI view of `img` (no copy) and the ROI used; also recorded in `active_roi`."""
+        roi = self._resolve_roi(img)
+        self.active_roi = roi
+        if roi is None:
+            return img, None
+        x, y, w, h = roi
+        return img[y:y + h, x:x + w], roi
+
+    def _run_plan(
+        self,
+        img: np.ndarray,
+        roi: Optional[Tuple[int, int, int, int]],
+        derived: Optional[DerivedFrame],
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Run the compiled plan on an ROI view, recompiling it if a setting changed."""
+        cfg = self.filter_settings
+        plan = self._plan
+        if plan is None or plan.version != cfg.version:
+            plan = self._plan = FilterPlan(cfg)
+
+        hsv = derived.cached("hsv", roi) if derived is not None else None
+        return plan.run(img, hsv, out)
+
+    def process_frame(self, img: np.ndarray, derived: Optional[DerivedFrame] = None) -> np.ndarray:
         """
         HSV + threshold preprocessing.
 
+        Runs the FilterPlan compiled from `filter_settings` (recompiled only
+        when a setting changed) on preallocated buffers. `derived` is the
+        frame's shared DerivedFrame (img must be its image); an HSV conversion
+        some other stage already made is reused from it.
+
         Steps:
         1) Apply ROI
         2) Convert to HSV
@@ -136,145 +316,96 @@ class VisionPreprocessor:
         6) Median blur + brightness/contrast + histogram equalization
         7) Threshold (adaptive or manual)
         8) Morphological open/close
-        9) Return binary BGR image (0/255)
+        9) Return the single-channel binary mask (0/255), owned by the plan
+           (valid until the next-but-one call)
         """
         try:
-            cfg = self.filter_settings
-
-            if self.roi_enabled and self.roi_w > 0 and self.roi_h > 0:
-                x1, y1 = self.roi_x, self.roi_y
-                x2, y2 = x1 + self.roi_w, y1 + self.roi_h
-                h, w = img.shape[:2]
-
-                x1 = max(0, min(x1, w))
-                x2 = max(0, min(x2, w))
-                y1 = max(0, min(y1, h))
-                y2 = max(0, min(y2, h))
-
-                if x2 > x1 and y2 > y1:
-                    img = img[y1:y2, x1:x2]
-
-            hsv = cv.cvtColor(img, cv.COLOR_BGR2HSV)
-            h_ch, s_ch, v_ch = cv.split(hsv)
-
-            h_min = int(np.clip(cfg.h_min, 0, 179))
-            h_max = int(np.clip(cfg.h_max, 0, 179))
-            s_min = int(np.clip(cfg.s_min, 0, 255))
-            s_max = int(np.clip(cfg.s_max, 0, 255))
-            v_min = int(np.clip(cfg.v_min, 0, 255))
-            v_max = int(np.clip(cfg.v_max, 0, 255))
-
-            lower = np.array([h_min, s_min, v_min], dtype=np.uint8)
-            upper = np.array([h_max, s_max, v_max], dtype=np.uint8)
-
-            hsv_mask = cv.inRange(hsv, lower, upper)
-
-            mode = int(getattr(cfg, "hsv_channel", 2))  
-
-            if mode == 0:
-                base_gray = h_ch
-            elif mode == 1:
-                base_gray = s_ch
-            elif mode == 2:
-                base_gray = v_ch
-            else:
-                base_gray = cv.addWeighted(s_ch, 0.4, v_ch, 0.6, 0)
-
-            gray = cv.bitwise_and(base_gray, base_gray, mask=hsv_mask)
-
-            k = max(1, cfg.gaussian)
-            if k % 2 == 0:
-                k += 1 
-            if k >= 3:
-                gray = cv.medianBlur(gray, k)
-
-            brightness = int(np.clip(cfg.brightness, 0, 100))
-            alpha = 1.0 + (cfg.contrast / 50.0) 
-            gray = cv.convertScaleAbs(gray, alpha=alpha, beta=brightness)
-
-            gray = cv.equalizeHist(gray)
-
-            if cfg.use_adaptive:
-                mask = cv.adaptiveThreshold(
-                    gray,
-                    255,
-                    cv.ADAPTIVE_THRESH_GAUSSIAN_C,
-                    cv.THRESH_BINARY,
-                    31,  
-                    2
-                )
-            else:
-                t_min = int(np.clip(cfg.thresh_min, 0, 255))
-                _, mask = cv.threshold(gray, t_min, 255, cv.THRESH_BINARY)
+            img, roi = self._apply_roi(img)
+            return self._run_plan(img, roi, derived)
+        except Exception as e:
+            raise CustomException(e, sys) from e
 
-            ksz = max(1, cfg.kernel_size)
-            kernel = np.ones((ksz, ksz), np.uint8)
+    def _process_to_ring(self, frame: Frame) -> Optional[BinaryMask]:
+        """process_frame() written directly into a mask ring slot; None if every slot is pinned."""
+        img, roi = self._apply_roi(frame.image)
+        claimed = self.mask_ring.claim(img.shape[:2], np.uint8)
+        if claimed is None:
+            logging.debug("VisionPreprocessor mask ring full; mask dropped.")
+            return None
 
-            mask = cv.morphologyEx(mask, cv.MORPH_OPEN, kernel, iterations=max(1, cfg.erosion_iterations))
-            mask = cv.morphologyEx(mask, cv.MORPH_CLOSE, kernel, iterations=max(1, cfg.dilation_iterations))
+        slot, buf = claimed
+        try:
+            self._run_plan(img, roi, frame.derived, out=buf)
+        except Exception:
+            self.mask_ring.abort(slot)
+            raise
+        self.mask_ring.commit(slot, frame.timestamp)
 
-            processed_bgr = cv.cvtColor(mask, cv.COLOR_GRAY2BGR)
-            return processed_bgr
+        # this thread is the ring's only writer, so the newest slot is ours
+        return BinaryMask(self.mask_ring.latest(), frame.seq, roi)
 
+    def skip_stats(self) -> Dict[str, int]:
+        """Frames masked, skipped because the ROI was unchanged, and skipped as blank."""
+        try:
+            return self.change_gate.stats()
         except Exception as e:
             raise CustomException(e, sys) from e
 
-    def detect_arrow_contours(self, processed_bgr: np.ndarray):
+    def extract_arrows(self, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
-        processed_bgr: output from process_frame (ROI, grayscale as 3-channel)
+        Arrow boxes (N, 4) and their (N, S, S) normalized crop batch from a
+        single-channel mask (see ArrowExtractor; the batch is reused per call).
+        """
+        try:
+            return self.arrow_extractor.extract(mask)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def detect_arrow_contours(self, mask: np.ndarray, debug: bool = False):
+        """
+        mask: single-channel binary mask from process_frame / get_mask().image
+              (a 3-channel image is converted for backwards compatibility)
         Returns:
             boxes: list of (x, y, w, h) for each arrow, sorted left->right
-            debug_img: copy of processed_bgr with rectangles drawn
+            debug_img: render_arrow_debug(mask, boxes) if debug, else None
         """
         try:
-            gray = cv.cvtColor(processed_bgr, cv.COLOR_BGR2GRAY)
-
-            edges = cv.Canny(gray, 50, 150)
-
-            kernel = np.ones((3, 3), np.uint8)
-            edges = cv.dilate(edges, kernel, iterations=1)
-
-            contours, _ = cv.findContours(edges, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-
-            boxes = []
-            for cnt in contours:
-                area = cv.contourArea(cnt)
-                if area < 50: 
-                    continue
-
-                x, y, w, h = cv.boundingRect(cnt)
+            gray = mask if mask.ndim == 2 else cv.cvtColor(mask, cv.COLOR_BGR2GRAY)
+            boxes = [tuple(b) for b in self.arrow_extractor.candidates(gray).tolist()]
 
-                aspect = w / float(h)
-                if not (0.5 <= aspect <= 2.0):
-                    continue
-                if not (10 <= w <= 200 and 10 <= h <= 200):
-                    continue
-
-                boxes.append((x, y, w, h))
+            debug_img = self.render_arrow_debug(gray, boxes) if debug else None
+            return boxes, debug_img
 
-            boxes.sort(key=lambda b: b[0])
+        except Exception as e:
+            raise CustomException(e, sys) from e
 
-            debug_img = processed_bgr.copy()
-            for idx, (x, y, w, h) in enumerate(boxes):
+    def render_arrow_debug(self, mask: np.ndarray, boxes, labels: Optional[List[str]] = None) -> np.ndarray:
+        """
+        BGR view of the mask with numbered arrow boxes (and classified
+        directions, if given); only built when a viewer wants it.
+        """
+        try:
+            debug_img = cv.cvtColor(mask, cv.COLOR_GRAY2BGR) if mask.ndim == 2 else mask.copy()
+            for idx, (x, y, w, h) in enumerate(np.asarray(boxes, dtype=np.int32).reshape(-1, 4).tolist()):
+                text = str(idx + 1) if labels is None else f"{idx + 1}:{labels[idx]}"
                 cv.rectangle(debug_img, (x, y), (x + w, y + h), (0, 255, 0), 1)
                 cv.putText(
                     debug_img,
-                    str(idx + 1),
+                    text,
                     (x, y - 5),
                     cv.FONT_HERSHEY_SIMPLEX,
                     0.4,
                     (0, 255, 0),
                     1,
                 )
-
-            return boxes, debug_img
-
+            return debug_img
         except Exception as e:
             raise CustomException(e, sys) from e
 
     def start(self) -> None:
         try:
             self.stopped = False
+            self.input_signal.reopen()
             t = Thread(target=self._run, daemon=True)
             t.start()
             logging.info("VisionPreprocessor thread started.")
@@ -285,22 +416,60 @@ class VisionPreprocessor:
     def stop(self) -> None:
         try:
             self.stopped = True
+            self.input_signal.close()
             logging.info("VisionPreprocessor thread stop requested.")
         except Exception as e:
             raise CustomException(e, sys) from e
 
     def _run(self) -> None:
         try:
+            signal = self.source.signal if self.source is not None else self.input_signal
+
             while not self.stopped:
-                frame_to_process: Optional[np.ndarray] = None
+                # Block until an unseen frame arrives or the settings change
+                seq = signal.wait_for(self.last_seq, timeout=self.wait_timeout)
+                if self.stopped or seq <= self.last_seq:
+                    continue
+
+                frame_to_process = self._acquire_frame()
+                if frame_to_process is None:
+                    continue
                 with self.lock:
-                    if self.input_frame is not None:
-                        frame_to_process = self.input_frame.copy()
-                if frame_to_process is not None:
-                    processed = self.process_frame(frame_to_process)
+                    if frame_to_process.seq <= self.last_seq:
+                        frame_to_process.release()
+                        continue
+                    self.last_seq = frame_to_process.seq
+
+                try:
+                    change = frame_to_process.change
+                    decision = self.change_gate.check(change, self._resolve_roi(frame_to_process.image))
+                    mask = None
+                    if decision == ChangeGate.REUSE:
+                        # ROI unchanged since the current mask: keep it, but let
+                        # consumers count this frame as another sighting of it
+                        publish = False
+                        with self.lock:
+                            if self.output_mask is not None:
+                                self.output_mask.confirm(frame_to_process.seq, frame_to_process.timestamp)
+                    elif decision == ChangeGate.BLANK:
+                        # black / loading screen: nothing to extract, drop the stale mask
+                        publish = self.output_mask is not None
+                    else:
+                        mask = self._process_to_ring(frame_to_process)
+                        publish = mask is not None
+                        if publish:
+                            self.change_gate.processed(change)
+                finally:
+                    frame_to_process.release()
+
+                if publish:
                     with self.lock:
-                        self.output_frame = processed
-                time.sleep(0.01)
+                        previous, self.output_mask = self.output_mask, mask
+                        self.output_seq = frame_to_process.seq
+                    if previous is not None:
+                        previous.release()
+                    self.output_signal.publish(frame_to_process.seq)
+                self.done_signal.publish(frame_to_process.seq)
         except Exception as e:
             logging.error(f"VisionPreprocessor error: {e}")
             raise CustomException(e, sys) from e
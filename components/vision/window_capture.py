@@ -1,7 +1,7 @@
 import sys
 import time
 import ctypes
-from threading import Thread, Lock
+from threading import Event, Thread, Lock
 from typing import Optional, Tuple
 
 import win32gui # type: ignore
@@ -9,6 +9,8 @@ import win32ui # type: ignore
 import win32con # type: ignore
 import numpy as np
 
+from components.vision.change_detector import ChangeDetector
+from components.vision.frame_buffer import FrameRing
 from configs import constants
 from exception import CustomException
 from logger import logging
@@ -17,10 +19,15 @@ from logger import logging
 class WindowCapture:
     """
     Handles capturing screenshots of a specific window using Win32 APIs.
-    Thread-safe access to the latest screenshot via `self.screenshot`.
+    Captured frames are published into `self.ring` (FrameRing); consumers
+    read them with `ring.latest()` instead of copying a shared screenshot.
+
+    With `detect_changes` (default) every frame also gets a FrameChange
+    (frame.change): unchanged / changed per region and a blank flag for
+    black or loading screens, so downstream stages can skip work.
     """
 
-    def __init__(self, window_name: Optional[str] = None) -> None:
+    def __init__(self, window_name: Optional[str] = None, ring_slots: int = 8, detect_changes: bool = True) -> None:
         try:
             # config
             self.window_name: str = window_name
@@ -29,7 +36,9 @@ class WindowCapture:
             # threading / shared state
             self.lock: Lock = Lock()
             self.stopped: bool = True
-            self.screenshot: Optional[np.ndarray] = None
+            self._stop_event: Event = Event()
+            self.change_detector: Optional[ChangeDetector] = ChangeDetector() if detect_changes else None
+            self.ring: FrameRing = FrameRing(slots=ring_slots, change_detector=self.change_detector)
 
             # window / geometry
             self.hwnd: Optional[int] = None
@@ -139,7 +148,17 @@ class WindowCapture:
     def get_screenshot(self) -> np.ndarray:
         """
         Capture a screenshot of the target window's client area.
-        Returns a BGR numpy array (h, w, 3).
+        Returns a contiguous BGR numpy array (h, w, 3).
+        """
+        try:
+            return np.ascontiguousarray(self._grab_frame())
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _grab_frame(self) -> np.ndarray:
+        """
+        Capture the client area and return a BGR view over the raw BGRA bitmap.
+        No copy is made here; the caller decides where the pixels end up.
         """
         try:
             if not self.hwnd:
@@ -175,11 +194,8 @@ class WindowCapture:
             win32gui.ReleaseDC(self.hwnd, wdc)
             win32gui.DeleteObject(data_bitmap.GetHandle())
 
-            # Drop alpha channel -> BGR
-            img = img[..., :3]
-            img = np.ascontiguousarray(img)
-
-            return img
+            # Drop alpha channel -> BGR (strided view, no copy)
+            return img[..., :3]
 
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -220,7 +236,7 @@ class WindowCapture:
 
     def start(self, interval_sec: float = 0.01) -> None:
         """
-        Start a background thread that keeps updating `self.screenshot`.
+        Start a background thread that keeps publishing frames into `self.ring`.
         """
         try:
             if not self.stopped:
@@ -228,6 +244,7 @@ class WindowCapture:
                 return
 
             self.stopped = False
+            self._stop_event.clear()
             thread = Thread(target=self._run, args=(interval_sec,), daemon=True)
             thread.start()
             logging.info("WindowCapture thread started.")
@@ -239,6 +256,7 @@ class WindowCapture:
         """Signal the capture thread to stop."""
         try:
             self.stopped = True
+            self._stop_event.set()
             logging.info("WindowCapture thread stop requested.")
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -246,7 +264,7 @@ class WindowCapture:
     def _run(self, interval_sec: float) -> None:
         """
         Internal thread loop: grabs screenshots at the given interval
-        and stores them in `self.screenshot` (thread-safe).
+        and writes them into the frame ring (the single copy per frame).
         """
         try:
             while not self.stopped:
@@ -256,11 +274,11 @@ class WindowCapture:
                     self.stopped = True
                     break
 
-                img = self.get_screenshot()
-                with self.lock:
-                    self.screenshot = img
+                captured_at = time.perf_counter()
+                self.ring.write(self._grab_frame(), timestamp=captured_at)
 
-                time.sleep(interval_sec)
+                # Paces the capture; returns immediately when stop() is called
+                self._stop_event.wait(interval_sec)
         except Exception as e:
             # log and wrap
             logging.error(f"Error in WindowCapture thread: {e}")
@@ -0,0 +1,482 @@
+import os
+import sys
+import time
+from collections import deque
+from threading import Thread, Lock
+from types import MappingProxyType
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from components.vision.change_detector import ChangeGate
+from components.vision.derived_frame import DerivedFrame
+from components.vision.detections import EMPTY_DETECTIONS, Detections
+from components.vision.frame_buffer import Frame, FrameRing
+from components.vision.postprocess import decode_yolo, nms_boxes_batched
+from components.vision.region_registry import RegionRegistry
+from components.vision.stage_signal import StageSignal
+from components.vision.tile_cache import TileCache
+from exception import CustomException
+from logger import logging
+
+
+class YoloDetector:
+    """
+    Darknet YOLO detector (cv.dnn, CPU) running in a background thread.
+
+    Port of Junk_Remove's ImageProcessor. The model is loaded with
+    cv.dnn.readNet: Darknet .weights + .cfg as before (OpenCV 4.x only;
+    OpenCV 5 removed the Darknet importer, hence opencv-python<5 in
+    requirements.txt), or an ONNX export of the same model (model_file
+    "obj.onnx", no config_file) on any OpenCV; the outputs must stay
+    Darknet-style (N, 5 + C) rows. Each frame is resized
+    straight into a preallocated (1, 3, H, W) float32 blob at a configurable
+    `input_size` (single-channel inputs, e.g. masks, are broadcast to three
+    channels instead of merged). Post-processing is array ops only: score filter on
+    every head, box decode of the survivors and class-wise NMS (see
+    postprocess.decode_yolo / nms_boxes_batched).
+
+    Results are published per class name, like MultiTemplateDetector.
+
+    Optional tiled, change-driven inference (off by default):
+        tile_size:        (w, h) tiles in image pixels, each resized to `input_size`
+        tile_overlap:     pixels shared by neighbouring tiles
+        change_threshold: fraction of a tile's thumbnail that must change to re-run it
+        max_tile_age:     re-run a tile after this many frames regardless (0 = never)
+    Unchanged tiles reuse their cached detections; all tiles are merged by
+    one class-wise NMS. Reuse ratio and per-frame cost: inference_stats().
+
+    In the background loop, frames whose detection area did not change since
+    the last inferred frame (frame.change) reuse the previous results and
+    blank frames give empty results; see skip_stats().
+
+    Same threading interface as ObjectDetector:
+
+    Usage:
+        detector = YoloDetector("yolov4-tiny/obj.weights", "yolov4-tiny/obj.cfg",
+                                names_file="yolov4-tiny/obj.names", input_size=(320, 320))
+        detector.attach(wincap.ring)
+        detector.start()
+
+        # or: only re-run 416x416 tiles whose content changed
+        detector = YoloDetector(..., tile_size=(416, 416))
+
+        dets = detector.get_detections()             # read-only {class_name: Detections}, no copy
+        rune = dets["rune"].best()
+        coords = detector.get_coordinates("rune")    # legacy List[Dict]
+
+        # synchronous use
+        dets = detector.detect(img_bgr)
+
+        # a net loaded elsewhere (anything with setInput / forward / getUnconnectedOutLayersNames)
+        detector = YoloDetector("obj.onnx", net=my_net, class_names=names)
+    """
+
+    def __init__(
+        self,
+        model_file: str,
+        config_file: str = "",
+        names_file: Optional[str] = None,
+        class_names: Optional[Sequence[str]] = None,
+        input_size: Tuple[int, int] = (416, 416),
+        score_threshold: float = 0.3,
+        nms_iou: float = 0.2,
+        max_results: Optional[int] = None,
+        swap_rb: bool = True,
+        preprocess: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        sleep_interval: float = 0.1,
+        regions: Optional[RegionRegistry] = None,
+        region: Optional[str] = None,
+        tile_size: Optional[Tuple[int, int]] = None,
+        tile_overlap: int = 32,
+        change_threshold: float = 0.002,
+        max_tile_age: int = 60,
+        net: Optional[Any] = None,
+    ) -> None:
+        try:
+            self.lock: Lock = Lock()
+            self.stopped: bool = True
+
+            self.input_signal: StageSignal = StageSignal("yolo-input")
+            self.result_signal: StageSignal = StageSignal("yolo-results")
+            self._source: Optional[FrameRing] = None
+
+            self.score_threshold: float = score_threshold
+            self.nms_iou: float = nms_iou
+            self.max_results: Optional[int] = max_results
+            self.swap_rb: bool = swap_rb
+            # optional image -> uint8 image (1 or 3 channels) step before the blob, e.g. a color mask
+            self.preprocess: Optional[Callable[[np.ndarray], np.ndarray]] = preprocess
+            # max time the worker blocks waiting for a new frame before re-checking `stopped`
+            self.sleep_interval: float = sleep_interval
+
+            if net is None:
+                self.net = self._read_net(model_file, config_file)
+                self.net.setPreferableBackend(cv.dnn.DNN_BACKEND_OPENCV)
+                self.net.setPreferableTarget(cv.dnn.DNN_TARGET_CPU)
+            else:
+                # already loaded (and configured) by the caller; model_file only names it in logs
+                self.net = net
+            self.out_names: List[str] = list(self.net.getUnconnectedOutLayersNames())
+
+            if class_names is None and names_file is not None:
+                with open(names_file, "r") as file:
+                    class_names = [line.strip() for line in file if line.strip()]
+            self.class_names: Tuple[str, ...] = tuple(class_names or ())
+
+            self.input_size: Tuple[int, int] = (0, 0)
+            self.set_input_size(input_size)
+
+            self.regions: Optional[RegionRegistry] = None
+            self.region: Optional[str] = None
+            if region is not None:
+                self.bind_region(regions, region)
+
+            self._frame: Optional[Frame] = None
+            # published snapshot; replaced (never mutated) on every frame
+            self._detections: Mapping[str, Detections] = MappingProxyType(
+                {name: EMPTY_DETECTIONS for name in self.class_names}
+            )
+            self._last_seq: int = 0
+            self._coords_seq: int = 0
+            self.change_gate: ChangeGate = ChangeGate("yolo-detector")
+
+            # tiled, change-driven inference (off when tile_size is None)
+            self.tiles: Optional[TileCache] = None
+            if tile_size is not None:
+                self.tiles = TileCache(tile_size, tile_overlap, change_threshold, max_age=max_tile_age)
+                self._thumb_level: int = self.tiles.thumb_scale.bit_length() - 1
+
+            self._stats: Dict[str, float] = {
+                "frames": 0, "tiles": 0, "tiles_inferred": 0, "inference_time": 0.0, "change_time": 0.0,
+            }
+            # per-frame inference cost (s) of the last frames
+            self._frame_costs: Deque[float] = deque(maxlen=1000)
+
+            logging.info(
+                f"YoloDetector initialized with {model_file} ({len(self.class_names)} classes, "
+                f"input {self.input_size[0]}x{self.input_size[1]}, outputs {self.out_names})."
+            )
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def _read_net(model_file: str, config_file: str = "") -> "cv.dnn.Net":
+        """cv.dnn.readNet, with an actionable error for missing files and Darknet models on OpenCV 5."""
+        for path in (model_file, config_file):
+            if path and not os.path.exists(path):
+                raise FileNotFoundError(f"YOLO model file not found: {path}")
+        try:
+            return cv.dnn.readNet(model_file, config_file)
+        except cv.error as e:
+            darknet = model_file.lower().endswith((".weights", ".cfg")) or config_file.lower().endswith(".cfg")
+            if darknet and int(cv.__version__.split(".")[0]) >= 5:
+                raise RuntimeError(
+                    f"OpenCV {cv.__version__} cannot load Darknet models ({model_file}): its Darknet importer "
+                    f"was removed in 5.0. Install opencv-python<5 (as pinned in requirements.txt), or export "
+                    f"the model to ONNX and pass the .onnx file as model_file without a config_file."
+                ) from e
+            raise
+
+    def set_input_size(self, input_size: Tuple[int, int]) -> None:
+        """Network input (width, height), multiples of 32; reallocates the blob buffers."""
+        try:
+            width, height = int(input_size[0]), int(input_size[1])
+            if width <= 0 or height <= 0 or width % 32 or height % 32:
+                raise ValueError(f"input_size must be positive multiples of 32, got {input_size}")
+            self.input_size = (width, height)
+            # reused per frame: resize targets and the network input blob
+            self._resized_bgr: np.ndarray = np.empty((height, width, 3), dtype=np.uint8)
+            self._resized_gray: np.ndarray = np.empty((height, width), dtype=np.uint8)
+            self._blob: np.ndarray = np.empty((1, 3, height, width), dtype=np.float32)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def bind_region(self, regions: Optional[RegionRegistry], name: str) -> None:
+        """Detect only inside the named region (resolved once per window geometry)."""
+        try:
+            if regions is None:
+                raise ValueError(f"Region '{name}' given but no RegionRegistry")
+            if name not in regions.specs:
+                raise KeyError(f"Unknown region: {name}")
+            self.regions = regions
+            self.region = name
+            logging.info(f"YoloDetector bound to region '{name}'.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _fill_blob(self, img: np.ndarray) -> np.ndarray:
+        """Resize `img` into the reused blob, scaled to [0, 1] (like blobFromImage, without allocations)."""
+        width, height = self.input_size
+        scale = np.float32(1.0 / 255.0)
+        if img.ndim == 2 or img.shape[2] == 1:
+            cv.resize(img, (width, height), dst=self._resized_gray, interpolation=cv.INTER_LINEAR)
+            np.multiply(self._resized_gray, scale, out=self._blob[0])
+        else:
+            cv.resize(img, (width, height), dst=self._resized_bgr, interpolation=cv.INTER_LINEAR)
+            planes = self._resized_bgr.transpose(2, 0, 1)
+            if self.swap_rb:
+                planes = planes[::-1]
+            np.multiply(planes, scale, out=self._blob[0])
+        return self._blob
+
+    def _class_name(self, class_id: int) -> str:
+        return self.class_names[class_id] if class_id < len(self.class_names) else str(class_id)
+
+    def _infer(self, img: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """One forward pass on `img` (after preprocess); decoded boxes in `img` coordinates, before NMS."""
+        if self.preprocess is not None:
+            img = self.preprocess(img)
+        self.net.setInput(self._fill_blob(img))
+        outputs = self.net.forward(self.out_names)
+        return decode_yolo(outputs, self.score_threshold, img.shape[1], img.shape[0])
+
+    def _thumbnail(self, img: np.ndarray, derived: Optional[DerivedFrame], rect) -> np.ndarray:
+        """Grayscale thumbnail for change detection (shared pyramid level when a DerivedFrame is given)."""
+        if derived is not None:
+            return derived.level(self._thumb_level, rect)
+        gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        s = self.tiles.thumb_scale
+        return cv.resize(gray, (max(1, gray.shape[1] // s), max(1, gray.shape[0] // s)), interpolation=cv.INTER_AREA)
+
+    def _detect_tiled(
+        self, img: np.ndarray, derived: Optional[DerivedFrame], rect
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Re-run only the tiles that changed, reuse the rest; boxes in `img` coordinates, before NMS."""
+        start = time.perf_counter()
+        h, w = img.shape[:2]
+        dirty = self.tiles.update(self._thumbnail(img, derived, rect), w, h)
+        self._stats["change_time"] += time.perf_counter() - start
+
+        for i in dirty.tolist():
+            x, y, tw, th = self.tiles.rects[i].tolist()
+            boxes, scores, class_ids = self._infer(img[y:y + th, x:x + tw])
+            boxes[:, 0] += x
+            boxes[:, 1] += y
+            self.tiles.store(i, boxes, scores, class_ids)
+
+        self._stats["tiles"] += len(self.tiles)
+        self._stats["tiles_inferred"] += len(dirty)
+        return self.tiles.merged()
+
+    def detect(
+        self, img_bgr: np.ndarray, frame_seq: int = 0, derived: Optional[DerivedFrame] = None
+    ) -> Mapping[str, Detections]:
+        """
+        Run the network on one BGR image (`derived` is its frame's DerivedFrame,
+        if any); read-only {class_name: Detections} in image coordinates.
+        With tiling, only changed tiles are inferred and all tiles' detections
+        are merged by one class-wise NMS.
+        """
+        try:
+            x0, y0 = 0, 0
+            rect = None
+            img = img_bgr
+            if self.region is not None:
+                h, w = img_bgr.shape[:2]
+                rect = self._search_rect(w, h)
+                x0, y0, rw, rh = rect
+                img = img_bgr[y0:y0 + rh, x0:x0 + rw]
+
+            start = time.perf_counter()
+            if self.tiles is not None:
+                boxes, scores, class_ids = self._detect_tiled(img, derived, rect)
+            else:
+                boxes, scores, class_ids = self._infer(img)
+                self._stats["tiles"] += 1
+                self._stats["tiles_inferred"] += 1
+            keep = nms_boxes_batched(boxes, scores, class_ids, self.nms_iou, self.max_results)
+            elapsed = time.perf_counter() - start
+            self._stats["frames"] += 1
+            self._stats["inference_time"] += elapsed
+            self._frame_costs.append(elapsed)
+
+            boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+            boxes[:, 0] += x0
+            boxes[:, 1] += y0
+
+            results: Dict[str, Detections] = {name: EMPTY_DETECTIONS for name in self.class_names}
+            for class_id in np.unique(class_ids).tolist():
+                rows = class_ids == class_id
+                results[self._class_name(class_id)] = Detections.from_boxes(boxes[rows], scores[rows], frame_seq)
+            return MappingProxyType(results)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _search_rect(self, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """Area detected in a width x height frame (the bound region's rect, else the whole frame)."""
+        if self.region is None:
+            return None
+        return self.regions.get(self.region, width, height).rect
+
+    def skip_stats(self) -> Dict[str, int]:
+        """Frames inferred, reused (detection area unchanged) and skipped as blank."""
+        try:
+            return self.change_gate.stats()
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def inference_stats(self) -> Dict[str, float]:
+        """
+        Frames, tiles per frame, tile reuse ratio (cached tiles / all tiles) and
+        per-frame cost in ms (mean / p95 over the last frames, change detection included).
+        """
+        try:
+            s = self._stats
+            frames = max(1, s["frames"])
+            costs = np.asarray(self._frame_costs) * 1000.0
+            return {
+                "frames": s["frames"],
+                "tiles_per_frame": s["tiles"] / frames,
+                "tiles_inferred_per_frame": s["tiles_inferred"] / frames,
+                "reuse_ratio": 1.0 - s["tiles_inferred"] / max(1, s["tiles"]),
+                "frame_ms": 1000.0 * s["inference_time"] / frames,
+                "frame_ms_p95": float(np.percentile(costs, 95)) if len(costs) else float("nan"),
+                "change_ms": 1000.0 * s["change_time"] / frames,
+            }
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def update(self, frame: Frame) -> None:
+        """
+        Update the latest frame (pinned BGR Frame from the capture ring).
+        This is thread-safe.
+        """
+        try:
+            with self.lock:
+                if self._frame is not None and frame.seq <= self._frame.seq:
+                    return
+                previous, self._frame = self._frame, frame.retain()
+            self.input_signal.publish(frame.seq)
+            if previous is not None:
+                previous.release()
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def attach(self, ring: FrameRing) -> None:
+        """Follow a capture ring directly instead of update(). Call before start()."""
+        try:
+            self._source = ring
+            logging.info("YoloDetector attached to frame ring.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _acquire_frame(self) -> Optional[Frame]:
+        """Pin the newest available input frame (ring or update())."""
+        if self._source is not None:
+            return self._source.latest()
+        with self.lock:
+            return None if self._frame is None else self._frame.retain()
+
+    def get_detections(self) -> Mapping[str, Detections]:
+        """
+        Latest results as a read-only {class_name: Detections} mapping.
+        No copy is made; a new snapshot is published per frame.
+        """
+        try:
+            with self.lock:
+                return self._detections
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_coordinates(self, name: Optional[str] = None):
+        """
+        Legacy accessor: results for one class (List[Dict]) or, without a
+        name, for all classes (Dict[name, List[Dict]]).
+        """
+        try:
+            detections = self.get_detections()
+            if name is not None:
+                return detections.get(name, EMPTY_DETECTIONS).as_dicts()
+            return {k: v.as_dicts() for k, v in detections.items()}
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_coordinates_with_seq(self) -> Tuple[int, Dict[str, List[Dict[str, int]]]]:
+        """All results (legacy form) plus the sequence id of the frame they came from."""
+        try:
+            with self.lock:
+                seq, detections = self._coords_seq, self._detections
+            return seq, {k: v.as_dicts() for k, v in detections.items()}
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def start(self) -> None:
+        try:
+            with self.lock:
+                if not self.stopped:
+                    logging.warning("YoloDetector is already running.")
+                    return
+                self.stopped = False
+            self.input_signal.reopen()
+
+            t = Thread(target=self.run, daemon=True)
+            t.start()
+            logging.info("YoloDetector thread started.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def stop(self) -> None:
+        try:
+            self.stopped = True
+            self.input_signal.close()
+            logging.info("YoloDetector stop requested.")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def run(self) -> None:
+        """
+        Background loop:
+        - Blocks until a frame newer than the last processed one is announced,
+        - Reuses the previous results if the detection area did not change since
+          the last inferred frame (empty results on blank frames),
+        - Otherwise runs the network on the pinned frame (no copy; with tiling, only on changed tiles),
+        - Updates results keyed by class name and publishes `result_signal`.
+        """
+        try:
+            signal = self._source.signal if self._source is not None else self.input_signal
+
+            while not self.stopped:
+                seq = signal.wait_for(self._last_seq, timeout=self.sleep_interval)
+                if self.stopped or seq <= self._last_seq:
+                    continue
+
+                local_frame = self._acquire_frame()
+                if local_frame is None:
+                    continue
+                if local_frame.seq <= self._last_seq:
+                    local_frame.release()
+                    continue
+                self._last_seq = local_frame.seq
+
+                try:
+                    h, w = local_frame.shape[:2]
+                    decision = self.change_gate.check(local_frame.change, self._search_rect(w, h))
+                    if decision == ChangeGate.PROCESS:
+                        detections = self.detect(local_frame.image, local_frame.seq, local_frame.derived)
+                        self.change_gate.processed(local_frame.change)
+                    elif decision == ChangeGate.BLANK:
+                        detections = MappingProxyType({name: EMPTY_DETECTIONS for name in self.class_names})
+                    else:
+                        detections = self._detections
+
+                    with self.lock:
+                        self._detections = detections
+                        self._coords_seq = local_frame.seq
+                    self.result_signal.publish(local_frame.seq)
+
+                except Exception as inner_e:
+                    logging.error(f"Error during YOLO detection: {inner_e}")
+                finally:
+                    local_frame.release()
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+        finally:
+            self.stopped = True
+            with self.lock:
+                held, self._frame = self._frame, None
+            if held is not None:
+                held.release()
+            logging.info("YoloDetector thread finished.")
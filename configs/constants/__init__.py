@@ -12,20 +12,33 @@ WINDOW_NAME: str = f"{desktop_name} - Remote Desktop Connection"
 PROJECT_ROOT: Path = Path(__file__).resolve().parents[2]
 CONFIG_DIR: Path = PROJECT_ROOT / "configs" / "bot_configs"
 MACRO_CONFIG_DIR: Path = PROJECT_ROOT / "artifacts" / "macros"
+VISION_CONFIG_DIR: Path = PROJECT_ROOT / "configs" / "vision_configs"
 
 MACRO_SAVE_DIR: str = str(MACRO_CONFIG_DIR)
+# recorded capture sessions (frames + detections) for offline replay
+SESSION_SAVE_DIR: str = str(PROJECT_ROOT / "artifacts" / "sessions")
 MACRO_CONFIG_PATH: Path = MACRO_CONFIG_DIR / os.getenv("MACRO_CONFIG_FILENAME", "")
 MACRO_CONFIG_PATH: str = str(MACRO_CONFIG_PATH)
+# format of new macro recordings, by extension: ".mbin" (binary, memory-mapped on load) or ".yaml"
+MACRO_FILE_EXT: str = os.getenv("MACRO_FILE_EXT", ".mbin")
 
 TEMPLATE_DIR: Path = PROJECT_ROOT / "configs" / "detector_configs" / "templates"
 RUNE_TEMPLATE_PATH: str = str(TEMPLATE_DIR / "rune.jpg")
 PLAYER_TEMPLATE_PATH: str = str(TEMPLATE_DIR / "player.jpg")
 
+REGION_CONFIG_PATH: str = str(VISION_CONFIG_DIR / "region_config.yaml")
+# optional; arrow templates are rendered procedurally when the file is missing
+ARROW_TEMPLATE_PATH: str = str(VISION_CONFIG_DIR / "arrow_templates.npz")
+
 # bot configs
 MACRO_PLAYER_START: str = "f9"
 MACRO_PLAYER_STOP: str = "f10"
 MACRO_RECORD_START: str = "f7"
 MACRO_RECORD_STOP: str = "f8"
+SESSION_RECORD_START: str = "f5"
+SESSION_RECORD_STOP: str = "f6"
+# raw | zlib | delta | delta+zlib (see SessionRecorder)
+SESSION_CODEC: str = os.getenv("SESSION_CODEC", "delta+zlib")
 
 BOT_SPEED: float = 13.82
 BOT_OFFSET: float = 0.1
\ No newline at end of file
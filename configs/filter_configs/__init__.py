@@ -1,9 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 @dataclass
 class FilterConfig:
     h_min: int = 0
-    h_max: int = 179 
+    h_max: int = 179
 
     s_min: int = 0
     s_max: int = 255
@@ -24,3 +24,12 @@ class FilterConfig:
     kernel_size: int = 3
     dilation_iterations: int = 1
     erosion_iterations: int = 1
+
+    # bumped on every setting change; compiled filter plans rebuild when it moves
+    version: int = field(default=0, compare=False)
+
+    def __setattr__(self, name: str, value) -> None:
+        changed = name != "version" and self.__dict__.get(name, value) != value
+        object.__setattr__(self, name, value)
+        if changed:
+            object.__setattr__(self, "version", self.__dict__.get("version", 0) + 1)
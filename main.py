@@ -1,24 +1,42 @@
+import argparse
+import os
 import time
 import sys
-from typing import Dict, List, Optional
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple
 import numpy as np
 import cv2
-import keyboard
 
 from configs import constants
 from exception import CustomException
 from logger import logging
 
-from components.vision.window_capture import WindowCapture
+from components.vision.arrow_classifier import ArrowClassifier
+from components.vision.arrow_voter import ArrowSequence, ArrowSequenceVoter
+from components.vision.binary_mask import BinaryMask
+from components.vision.detections import EMPTY_DETECTIONS, Detections
+from components.vision.frame_buffer import Frame
 from components.vision.vision_preprocessor import VisionPreprocessor
-from components.vision.object_detector import ObjectDetector
-
-from components.bot.macro_player import MacroPlayer
-from components.bot.macro_recorder import MacroRecorder
+from components.vision.multi_template_detector import MultiTemplateDetector
+from components.vision.region_registry import RegionRegistry
+from components.vision.replay_runner import ReplayRunner
+from components.vision.replay_source import ReplayFrameSource
+from components.vision.session_recorder import SessionRecorder
+
+if TYPE_CHECKING:
+    # Windows-only (Win32 capture, input hooks); imported where they are used
+    from components.vision.window_capture import WindowCapture
+    from components.bot.macro_player import MacroPlayer
+    from components.bot.macro_recorder import MacroRecorder
 
 class RunTasks():
-    def __init__(self):
+    def __init__(self, source=None):
+        """
+        `source` is any frame source with the WindowCapture interface
+        (ReplayFrameSource, SyntheticFrameSource, ...); None captures the game window.
+        """
         try:
+            self.source = source
             self.window_name: str = constants.WINDOW_NAME
             self.macro_save_dir: str = constants.MACRO_SAVE_DIR
             self.macro_config_path: str = constants.MACRO_CONFIG_PATH
@@ -27,48 +45,90 @@ class RunTasks():
             self.macro_player_stop: str = constants.MACRO_PLAYER_STOP
             self.macro_record_start: str = constants.MACRO_RECORD_START
             self.macro_record_stop: str = constants.MACRO_RECORD_STOP
+            self.session_record_start: str = constants.SESSION_RECORD_START
+            self.session_record_stop: str = constants.SESSION_RECORD_STOP
+            self.session_save_dir: str = constants.SESSION_SAVE_DIR
 
             self.rune_template_path: str = constants.RUNE_TEMPLATE_PATH
             self.player_template_path: str = constants.PLAYER_TEMPLATE_PATH
+            # named screen regions (minimap, rune arrows, ...) shared by all stages
+            self.regions: RegionRegistry = RegionRegistry.from_yaml(constants.REGION_CONFIG_PATH)
+
             self.template_config_list: List[Dict] = [
                 {
                     "name": "rune",
                     "path": self.rune_template_path,
                     "threshold": 0.95,
-                    "draw_color": (0, 255, 0)
+                    "draw_color": (0, 255, 0),
+                    "region": "minimap",
                 },
                 {
                     "name": "player",
                     "path": self.player_template_path,
                     "threshold": 0.95,
-                    "draw_color": (0, 255, 0)
+                    "draw_color": (0, 255, 0),
+                    "region": "minimap",
+                    # player moves a few px per frame: search around the last hit
+                    "tracking": True,
+                    "full_scan_every": 30,
                 },
             ]
 
             self.is_running: bool = True
+            # max time the main loop blocks waiting for a new frame before re-checking hotkeys
+            self.frame_wait_timeout: float = 0.1
             self.loop_start_time: float = 0.0
             self.loop_end_time: float = 0.0
 
-            self.wc: WindowCapture = None
+            # frame source: WindowCapture, or the source given to __init__
+            self.wc: "WindowCapture" = None
             self.p: VisionPreprocessor = None
-            self.bmp: MacroPlayer = None
-            self.bmr: MacroRecorder = None
+            self.bmp: "MacroPlayer" = None
+            self.bmr: "MacroRecorder" = None
+            # capture session recorder (frames + detections, for offline replay)
+            self.session_recorder: SessionRecorder = None
+            self.last_recorded_detection_seq: int = 0
             
-            # detector
-            self.rune_d: ObjectDetector = None
-            self.player_d: ObjectDetector = None
+            # detector (one worker for every template in template_config_list)
+            self.detector: MultiTemplateDetector = None
+            self.detector_workers: int = 2
+
+            # rune arrow direction classifier (batched, CPU)
+            self.arrow_template_path: str = constants.ARROW_TEMPLATE_PATH
+            self.arrow_classifier: ArrowClassifier = None
+            # multi-frame consensus on the classified arrows
+            self.arrow_voter: ArrowSequenceVoter = None
+            self.arrow_sequence: Optional[ArrowSequence] = None
+            self.arrow_boxes: np.ndarray = np.empty((0, 4), dtype=np.int32)
+            self.arrow_labels: List[str] = []
+            # classifier output of the current mask, re-voted for every frame that reuses it
+            self.arrow_votes: Tuple[np.ndarray, np.ndarray] = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+            self.last_mask_seq: int = 0
+            # newest captured frame already voted (processed, reused or blank)
+            self.last_vote_seq: int = 0
 
         except Exception as e:
             raise CustomException(e, sys) from e
 
-    def run_vision(self, window_name: str):
+    def run_vision(self, window_name: str, control_panel: bool = True, start_source: bool = True):
         try:
             logging.info("Starting vision thread...")
-            self.wc: WindowCapture = WindowCapture(window_name=window_name)
+            if self.source is not None:
+                self.wc = self.source
+            else:
+                from components.vision.window_capture import WindowCapture  # Win32 only
+                self.wc = WindowCapture(window_name=window_name)
             self.p = VisionPreprocessor()
-            self.p.init_control_panel()
+            self.p.bind_region(self.regions, "rune_arrows")
+            if control_panel:
+                self.p.init_control_panel()
+            self.p.attach(self.wc.ring)
 
-            self.wc.start()
+            self.session_recorder = SessionRecorder(codec=constants.SESSION_CODEC)
+
+            # a replay runner publishes frames itself instead of the capture thread
+            if start_source:
+                self.wc.start()
             self.p.start()
         
         except Exception as e:
@@ -77,7 +137,8 @@ class RunTasks():
     def run_bot(self, window_name: str, recorder_filename: str):
         try:
             logging.info("Starting AutoBot thread...")
-            self.bmp: MacroPlayer = MacroPlayer(window_name=window_name)
+            from components.bot.macro_player import MacroPlayer  # Win32 only
+            self.bmp = MacroPlayer(window_name=window_name)
             self.bmp.load(recorder_filename)
 
         except Exception as e:
@@ -85,51 +146,189 @@ class RunTasks():
         
     def run_object_detector(self):
         try:
-            logging.info("Starting Object Detector thread(s)...")
-
-            for obj in self.template_config_list:
-                name = obj["name"]
-                path = obj["path"]
-                threshold = obj.get("threshold", 0.8)
-                draw_color = obj.get("draw_color", (0, 255, 0))
-
-                if name == "rune":
-                    self.rune_d = ObjectDetector(
-                        template_path=path,
-                        threshold=threshold,
-                        draw_color=draw_color,
-                    )
-                    self.rune_d.start()
-                    logging.info(f"Rune detector started with template: {path}")
-
-                elif name == "player":
-                    self.player_d = ObjectDetector(
-                        template_path=path,
-                        threshold=threshold,
-                        draw_color=draw_color,
-                    )
-                    self.player_d.start()
-                    logging.info(f"Player detector started with template: {path}")
-            
+            logging.info("Starting Object Detector thread...")
+
+            self.detector = MultiTemplateDetector(
+                template_config_list=self.template_config_list,
+                max_workers=self.detector_workers,
+                regions=self.regions,
+            )
+            self.detector.attach(self.wc.ring)
+            self.detector.start()
+            logging.info(f"Detector started with templates: {list(self.detector.matchers)}")
+
         except Exception as e:
             raise CustomException(e, sys) from e
         
+    def start_session_recording(self) -> None:
+        """Record every captured frame and the detector's results into a new session directory."""
+        try:
+            directory = os.path.join(self.session_save_dir, datetime.now().strftime("%Y%m%d_%H%M%S"))
+            offset_x, offset_y = self.wc.get_screen_position((0, 0))
+            self.session_recorder.start(
+                directory,
+                metadata={"window_name": self.window_name, "screen_offset": [offset_x, offset_y]},
+            )
+            self.session_recorder.attach(self.wc.ring)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def stop_session_recording(self) -> None:
+        try:
+            self.session_recorder.detach()
+            directory = self.session_recorder.stop()
+            logging.info(f"Session saved to '{directory}': {self.session_recorder.stats()}")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     def macro_record(self,dir_name:str):
         try:
-            keys: List[str] = [self.macro_player_start, self.macro_player_stop, self.macro_record_start, self.macro_record_stop]
-            self.bmr: MacroRecorder = MacroRecorder(dir_name=dir_name,
-                                                    keys=keys
-                                                )
+            keys: List[str] = [
+                self.macro_player_start, self.macro_player_stop, self.macro_record_start, self.macro_record_stop,
+                self.session_record_start, self.session_record_stop,
+            ]
+            from components.bot.macro_recorder import MacroRecorder  # keyboard hooks
+            # recordings interrupted by a crash are still on disk as journals
+            MacroRecorder.recover_journals(dir_name)
+            self.bmr = MacroRecorder(dir_name=dir_name, keys=keys, file_ext=constants.MACRO_FILE_EXT)
 
         except Exception as e:
             raise CustomException(e, sys) from e
 
     def run_ai(self):
-        print("ai logic running...")
-        # TODO
+        try:
+            logging.info("Loading arrow classifier...")
+            self.arrow_classifier = ArrowClassifier.load(
+                self.arrow_template_path,
+                crop_size=self.p.arrow_extractor.crop_size,
+            )
+            self.arrow_voter = ArrowSequenceVoter()
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def classify_arrows(self, arrow_crops: np.ndarray, timestamp: float) -> Optional[ArrowSequence]:
+        """
+        Classify one mask's batch of arrow crops (left to right) and vote it
+        into the current sequence. Returns the sequence on the frame it commits.
+        """
+        try:
+            labels, confidences = self.arrow_classifier.classify(arrow_crops)
+            self.arrow_votes = (labels, confidences)
+            self.arrow_labels = self.arrow_classifier.names(labels)
+            logging.debug(f"Arrows: {list(zip(self.arrow_labels, np.round(confidences, 3).tolist()))}")
+            return self.arrow_voter.update(labels, confidences, timestamp)
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def update_arrows(self, mask: Optional[BinaryMask]) -> None:
+        """
+        Vote the preprocessor's result once per captured frame it stands for.
+        A new mask is classified; a mask the preprocessor reused for newer,
+        unchanged frames re-votes its cached classification without
+        re-classifying; a blank screen (no mask) votes "no arrows".
+        """
+        try:
+            committed = None
+            if mask is None:
+                seq = self.p.done_signal.seq
+                if seq > self.last_vote_seq:
+                    self.last_vote_seq = seq
+                    self.arrow_boxes = np.empty((0, 4), dtype=np.int32)
+                    self.arrow_labels = []
+                    self.arrow_votes = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+                    committed = self.arrow_voter.update(*self.arrow_votes)
+            elif mask.source_seq != self.last_mask_seq:
+                self.last_mask_seq = mask.source_seq
+                self.last_vote_seq = mask.confirmed_seq
+                # (N, 4) boxes + (N, S, S) normalized crops, ready for the arrow classifier
+                self.arrow_boxes, arrow_crops = self.p.extract_arrows(mask.image)
+                committed = self.classify_arrows(arrow_crops, mask.confirmed_ts)
+            elif mask.confirmed_seq > self.last_vote_seq:
+                self.last_vote_seq = mask.confirmed_seq
+                committed = self.arrow_voter.update(*self.arrow_votes, mask.confirmed_ts)
+            if committed is not None:
+                self.arrow_sequence = committed
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def replay(self, realtime: bool = False, speed: float = 1.0, max_frames: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run the vision / decision pipeline on `self.source` without the game
+        window, keyboard or bot: lockstep (as fast as possible, every stage
+        sees every frame) or realtime (paced to the source's timestamps).
+        Returns the ReplayRunner report (FPS, per-stage latency).
+        """
+        try:
+            logging.info("Starting replay...")
+            if self.source is None:
+                raise ValueError("replay() needs a frame source, e.g. RunTasks(source=ReplayFrameSource(path))")
+            self.run_vision(window_name=self.window_name, control_panel=False, start_source=False)
+            self.run_object_detector()
+            self.run_ai()
+
+            def step(frame: Frame) -> None:
+                mask: Optional[BinaryMask] = self.p.get_mask()
+                try:
+                    self.update_arrows(mask)
+                finally:
+                    if mask is not None:
+                        mask.release()
+
+            runner = ReplayRunner(
+                self.wc,
+                {"preprocessor": self.p.done_signal, "detector": self.detector.result_signal},
+                on_frame=step,
+                realtime=realtime,
+                speed=speed,
+                max_frames=max_frames,
+            )
+            self.loop_start_time = time.time()
+            report = runner.run()
+            logging.info(ReplayRunner.format_report(report))
+            if self.arrow_sequence is not None:
+                logging.info(f"Last committed arrow sequence: {self.arrow_sequence}")
+            self.stop_program(start_time=self.loop_start_time)
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def poll_hotkeys(self, keyboard: Any) -> None:
+        """Macro play / record and session recording hotkeys; polled with or without a new frame."""
+        try:
+            # Play
+            if self.bmp.stopped and (not self.bmr.is_recording) and keyboard.is_pressed(self.macro_player_start):
+                self.bmp.start()
+
+            # Stop play
+            if (not self.bmp.stopped) and keyboard.is_pressed(self.macro_player_stop):
+                self.bmp.stop()
+
+            # Start record
+            if self.bmp.stopped and (not self.bmr.is_recording) and keyboard.is_pressed(self.macro_record_start):
+                self.bmr.start()
+
+            # Stop record
+            if self.bmr.is_recording and keyboard.is_pressed(self.macro_record_stop):
+                self.bmr.stop_and_save()
+
+            # Session recording (frames + detections for offline replay)
+            if (not self.session_recorder.is_recording) and keyboard.is_pressed(self.session_record_start):
+                self.start_session_recording()
+
+            if self.session_recorder.is_recording and keyboard.is_pressed(self.session_record_stop):
+                self.stop_session_recording()
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
 
     def start_program(self, debug: True):
         try:
+            import keyboard  # global input hooks; live play only
+
             logging.info("Starting program...")
             self.macro_record(dir_name=self.macro_save_dir)
 
@@ -144,111 +343,105 @@ class RunTasks():
 
             logging.info("Starting loop")
             self.loop_start_time: float = time.time()
+            last_seq: int = 0
 
             while self.is_running:
-                screenshot: Optional[np.ndarray] = self.wc.screenshot
-
                 if self.wc is None:
                     logging.error("WindowCapture is not initialized.")
                     break
 
-                with self.wc.lock:
-                    screenshot: Optional[np.ndarray] = (
-                        None if self.wc.screenshot is None
-                        else self.wc.screenshot.copy()
-                    )
-
-                if screenshot is None: 
-                    print('no detected image')
-                    time.sleep(0.01)
+                # Wake as soon as the capture thread publishes a new frame
+                seq = self.wc.ring.signal.wait_for(last_seq, timeout=self.frame_wait_timeout)
+                if seq == last_seq:
+                    # no new frame (window minimized, occluded, ...): hotkeys must still work
+                    self.poll_hotkeys(keyboard)
+                    if keyboard.is_pressed('q') or self.wc.track_window_closed():
+                        self.stop_program(start_time=self.loop_start_time)
+                        break
                     continue
 
-                if self.rune_d:
-                    self.rune_d.update(screenshot)
-                    coor_rune = self.rune_d.get_coordinates()
-                if self.player_d:
-                    self.player_d.update(screenshot)
-                    coor_player = self.player_d.get_coordinates()
+                # Pinned read-only view of the newest capture; no copy here
+                frame: Optional[Frame] = self.wc.ring.latest()
 
-                # Play
-                if self.bmp.stopped and (not self.bmr.is_recording) and keyboard.is_pressed(self.macro_player_start):
-                    self.bmp.start()
+                if frame is None: 
+                    print('no detected image')
+                    continue
+                last_seq = frame.seq
 
-                # Stop play
-                if (not self.bmp.stopped) and keyboard.is_pressed(self.macro_player_stop):
-                    self.bmp.stop()
+                # Detector and preprocessor follow the ring on their own threads
+                # Immutable per-frame snapshots; reading them needs no copy
+                detections: Mapping[str, Detections] = self.detector.get_detections()
+                coor_rune: Detections = detections.get("rune", EMPTY_DETECTIONS)
+                coor_player: Detections = detections.get("player", EMPTY_DETECTIONS)
 
-                # Start record
-                if self.bmp.stopped and (not self.bmr.is_recording) and keyboard.is_pressed(self.macro_record_start):
-                    self.bmr.start()
+                self.poll_hotkeys(keyboard)
 
-                # Stop record
-                if self.bmr.is_recording and keyboard.is_pressed(self.macro_record_stop):
-                    self.bmr.stop_and_save()
+                if self.session_recorder.is_recording:
+                    detection_seq, recorded = self.detector.get_detections_with_seq()
+                    if detection_seq != self.last_recorded_detection_seq:
+                        self.last_recorded_detection_seq = detection_seq
+                        self.session_recorder.record_detections("detector", detection_seq, recorded)
 
                 # img_path = r"C:\Users\User\Desktop\bot\MapleStoryBot\data\images\arrows.jpg"
                 # static_image = cv2.imread(img_path)
 
-                self.p.set_input(screenshot)
-                processed: Optional[np.ndarray] = self.p.get_output()
+                # Pinned single-channel mask; read in place, no copy or conversion
+                mask: Optional[BinaryMask] = self.p.get_mask()
 
-                arrow_boxes = []
-                arrow_debug = None
-
-                if processed is not None:
-                    arrow_boxes, arrow_debug = self.p.detect_arrow_contours(processed)
-
-                    # Example: crop each arrow for AI later
-                    arrow_crops = []
-                    for (x, y, w, h) in arrow_boxes:
-                        arrow_crops.append(processed[y:y+h, x:x+w])
+                # Classified once per mask, voted once per capture frame it stands for
+                self.update_arrows(mask)
 
                 if debug:
-                    if self.p.roi_enabled and screenshot is not None:
-                        x = self.p.roi_x
-                        y = self.p.roi_y
-                        w = self.p.roi_w
-                        h = self.p.roi_h
+                    # The only frame copy in the loop: the ring view is read-only
+                    screenshot: np.ndarray = frame.image.copy()
+
+                    if self.p.active_roi is not None:
+                        x, y, w, h = self.p.active_roi
                         cv2.rectangle(screenshot, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
 
-                    if coor_rune and len(coor_rune) > 0:       # SAFE check
-                        r = coor_rune[0]                       # first match only
+                    if coor_rune:                              # SAFE check
+                        r = coor_rune.best()                   # best match only
+                        x, y, w, h = int(r["x"]), int(r["y"]), int(r["w"]), int(r["h"])
                         cv2.rectangle(
                             screenshot,
-                            (r["x"], r["y"]),
-                            (r["x"] + r["w"], r["y"] + r["h"]),
+                            (x, y),
+                            (x + w, y + h),
                             (0, 255, 0),
                             2
                         )
-                        cv2.putText(screenshot, "Rune", (r["x"], r["y"] - 5),
+                        cv2.putText(screenshot, "Rune", (x, y - 5),
                                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
 
                     # =========================
                     # Draw Player Detection Box
                     # =========================
-                    if coor_player and len(coor_player) > 0:   # SAFE check
-                        p = coor_player[0]
+                    if coor_player:                            # SAFE check
+                        p = coor_player.best()
+                        x, y, w, h = int(p["x"]), int(p["y"]), int(p["w"]), int(p["h"])
                         cv2.rectangle(
                             screenshot,
-                            (p["x"], p["y"]),
-                            (p["x"] + p["w"], p["y"] + p["h"]),
+                            (x, y),
+                            (x + w, y + h),
                             (255, 0, 0),
                             2
                         )
-                        cv2.putText(screenshot, "Player", (p["x"], p["y"] - 5),
+                        cv2.putText(screenshot, "Player", (x, y - 5),
                                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255,0,0), 1)
 
 
                     cv2.imshow("Tracking Image", screenshot)
-                    if processed is not None:
-                        cv2.imshow("Preprocessed Image", processed)
-
-                    if arrow_debug is not None:
-                        cv2.imshow("Arrow Debug", arrow_debug)
+                    if mask is not None:
+                        # debug renderings are only built here, when they are shown
+                        cv2.imshow("Preprocessed Image", mask.image)
+                        cv2.imshow("Arrow Debug", self.p.render_arrow_debug(mask.image, self.arrow_boxes, self.arrow_labels))
 
                     cv2.waitKey(1)
 
+                if mask is not None:
+                    mask.release()
+                frame.release()
+
                 if keyboard.is_pressed('q') or self.wc.track_window_closed():
                     self.stop_program(start_time=self.loop_start_time)
                     break
@@ -260,13 +453,31 @@ class RunTasks():
         try:
             logging.info("Stopping program...")
             self.is_running = False
+            if self.session_recorder is not None and self.session_recorder.is_recording:
+                self.stop_session_recording()
             self.wc.stop()
             self.p.stop()
-            self.bmp.stop()
-            self.rune_d.stop()
-            self.player_d.stop()
-
-            cv2.destroyAllWindows()
+            if self.bmp is not None:
+                self.bmp.stop()
+            self.detector.stop()
+
+            for name, stats in self.detector.tracking_stats().items():
+                logging.info(f"Tracking stats for '{name}': {stats}")
+            # misses per kind should equal the frames that needed it (one conversion per frame)
+            logging.info(f"Derived image cache stats: {self.wc.ring.derived_cache.stats()}")
+            logging.info(f"Arrow voting stats: {self.arrow_voter.stats()}")
+            # frames each stage skipped because its area was unchanged or the screen was blank
+            if self.wc.change_detector is not None:
+                logging.info(f"Frame change stats: {self.wc.change_detector.stats()}")
+            for name, stats in self.detector.skip_stats().items():
+                logging.info(f"Skip stats for '{name}': {stats}")
+            logging.info(f"Preprocessor skip stats: {self.p.skip_stats()}")
+
+            # headless OpenCV builds (replays on CI) have no HighGUI; nothing to close there
+            try:
+                cv2.destroyAllWindows()
+            except cv2.error as e:
+                logging.debug(f"cv2.destroyAllWindows unavailable: {e}")
 
             loop_duration: float = time.time() - start_time
             logging.info(f"Program stopped. Ran for {loop_duration:.2f}s")
@@ -276,6 +487,19 @@ class RunTasks():
 
 if __name__ == "__main__":
     try:
+        parser = argparse.ArgumentParser(description="MapleStory bot; --replay runs the vision pipeline offline.")
+        parser.add_argument("--replay", help="session directory, image folder or video file to replay")
+        parser.add_argument("--realtime", action="store_true", help="pace the replay to the recorded timestamps")
+        parser.add_argument("--speed", type=float, default=1.0, help="realtime replay speed factor")
+        parser.add_argument("--frames", type=int, default=None, help="stop after this many frames")
+        parser.add_argument("--loop", action="store_true", help="replay the source in a loop (use with --frames)")
+        args = parser.parse_args()
+
+        if args.replay:
+            entry_point = RunTasks(source=ReplayFrameSource(args.replay, loop=args.loop))
+            print(ReplayRunner.format_report(entry_point.replay(args.realtime, args.speed, args.frames)))
+            sys.exit(0)
+
         print("quit - press 'q'")
         time.sleep(2)
 
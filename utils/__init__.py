@@ -1,5 +1,4 @@
 import random
-import win32gui  # type: ignore
 import sys
 import yaml
 import os
@@ -10,6 +9,8 @@ def random_num(lb, ub) -> float:
     return float(f"{random.uniform(lb, ub):.3f}")
 
 def find_window_by_title(keyword: str):
+    import win32gui  # type: ignore  # Windows-only; keep utils importable elsewhere
+
     result = []
 
     def enum_handler(hwnd, _):
@@ -22,10 +23,14 @@ def find_window_by_title(keyword: str):
     win32gui.EnumWindows(enum_handler, None)
     return result[0] if result else None
 
+# libyaml's C loader / dumper when PyYAML was built with it (same safe subset, several times faster)
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 def read_yaml_file(file_path: str) -> dict:
     try:
         with open(file_path, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f)
+            return yaml.load(f, Loader=_YAML_LOADER)
 
     except Exception as e:
         raise CustomException(e, sys) from e
@@ -48,7 +53,7 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
             os.remove(file_path)
 
         with open(file_path, "w", encoding="utf-8") as f:
-            yaml.safe_dump(content, f, sort_keys=False)
+            yaml.dump(content, f, Dumper=_YAML_DUMPER, sort_keys=False)
 
     except Exception as e:
         raise CustomException(e, sys) from e
\ No newline at end of file